@@ -2,14 +2,16 @@ import os
 from datetime import timedelta
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate, upgrade
+from flask_migrate import Migrate
 from dotenv import load_dotenv
 
+from app.db_routing import RoutingSession
+
 # Load environment variables (override=True ensures .env values take precedence)
 load_dotenv(override=True)
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 
 
@@ -39,6 +41,15 @@ def create_app(config_name=None):
         app.config['SQLALCHEMY_DATABASE_URI'] = app.config['SQLALCHEMY_DATABASE_URI'].replace(
             'postgres://', 'postgresql://', 1
         )
+
+    # Connection pool sizing, pre-ping, recycle and server-side timeouts
+    from app.db_config import get_engine_options
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+
+    # Optional read replica for @read_replica views (DATABASE_REPLICA_URL)
+    from app.db_routing import get_replica_binds, init_replica_routing
+    app.config['SQLALCHEMY_BINDS'] = get_replica_binds()
+    init_replica_routing(app)
     
     # Initialize extensions with app
     db.init_app(app)
@@ -58,13 +69,28 @@ def create_app(config_name=None):
     app.register_blueprint(member_bp)
     app.register_blueprint(secretary_bp)
     # app.register_blueprint(gallery_bp)
+
+    # Static asset manifest (service worker cache versioning)
+    from app.assets import init_assets
+    init_assets(app)
     
     # Import models so they're known to Flask-Migrate
     from app import models
+
+    # Version stamp listeners (cache invalidation on writes)
+    from app.services import cache_service  # noqa: F401
+    # Debounced location_stats refresh after writes to locations/lunches/ratings
+    from app.services import location_stats  # noqa: F401
     
-    # Auto-run migrations in production (Railway)
-    if os.environ.get('RAILWAY_ENVIRONMENT'):
+    # CLI commands (flask release, etc.)
+    from app.cli import register_commands
+    register_commands(app)
+
+    # Migrations run once per deploy via `flask release` (see Procfile).
+    # Workers only verify the schema revision matches the code.
+    if os.environ.get('RAILWAY_ENVIRONMENT') and not os.environ.get('SKIP_SCHEMA_CHECK'):
+        from app.release import check_schema_revision
         with app.app_context():
-            upgrade()
+            check_schema_revision()
     
     return app
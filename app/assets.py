@@ -0,0 +1,344 @@
+"""
+Static asset pipeline: fingerprinting, precompression and image variants.
+
+Build step (`flask --app run:app build-assets`, run at deploy build time):
+- Copies css/, img/, favicon.ico, manifest.json and the footer logo into
+  app/static/dist/ under content-hashed names
+  (grass_bg.png -> grass_bg.3f2a9c1b7d4e.png)
+- Downsizes images listed in RESIZED_IMAGES to 2x their displayed size
+- Rewrites url(...) references inside CSS, and icon URLs in the web app
+  manifest, to the hashed names
+- Writes .gz (and .br if Brotli is installed) next to text assets
+- Writes .webp (and .avif if Pillow supports it) next to PNG/JPG images,
+  kept only when smaller than the original
+- Records everything in app/static/dist/asset-manifest.json
+
+Runtime:
+- `asset_url('css/stadium-theme.css')` in templates returns the hashed
+  /assets/... URL, or falls back to url_for('static', ...) when no build exists
+- /assets/<path> serves the best variant the browser accepts (AVIF/WebP,
+  br/gzip) with one-year immutable cache headers
+
+The service worker (service_worker.js) precaches the "shell" assets. Its cache
+name is a hash of those files, so any deploy that changes one of them ships a
+new service worker, which precaches the new files and deletes the old cache.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+DIST_DIRNAME = 'dist'
+MANIFEST_FILENAME = 'asset-manifest.json'
+
+# What the build step fingerprints (relative to app/static)
+BUILD_SOURCES = ['css', 'img', 'favicon.ico', 'manifest.json', 'emails/Ai_guy_transparent.png']
+
+# Images shown much smaller than their source -> widest displayed size (px).
+# The originals stay in app/static (emails fall back to them).
+RESIZED_IMAGES = {
+    'emails/Ai_guy_transparent.png': 32,  # footer logo (h-8 w-8)
+}
+
+WEB_MANIFEST = 'manifest.json'
+
+# Static files precached by the service worker (relative to app/static)
+SHELL_ASSETS = [
+    'css/stadium-theme.css',
+    'manifest.json',
+    'favicon.ico',
+    'img/grass_bg.png',
+    'img/wood_texture.jpg',
+    'img/metal_texture.jpg',
+    'img/player_silhouette.png',
+    'img/icons/icon-72x72.png',
+    'img/icons/icon-96x96.png',
+    'img/icons/icon-152x152.png',
+    'img/icons/icon-192x192.png',
+    'img/icons/icon-512x512.png',
+    'emails/Ai_guy_transparent.png',
+]
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.ico', '.txt'}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+
+# Preferred first when the browser accepts several
+IMAGE_FORMATS = [('image/avif', 'AVIF', '.avif'), ('image/webp', 'WEBP', '.webp')]
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+IMMUTABLE_MAX_AGE = 31536000  # one year
+
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def hash_file(path: str) -> str:
+    """Short content hash of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def build_asset_manifest(static_folder: str) -> dict:
+    """
+    Hash the service worker shell assets.
+
+    Returns:
+        dict with 'version' (combined hash) and 'files' (path -> hash)
+    """
+    files = {}
+    for rel_path in SHELL_ASSETS:
+        full_path = os.path.join(static_folder, rel_path)
+        if os.path.exists(full_path):
+            files[rel_path] = hash_file(full_path)
+
+    combined = hashlib.sha256(
+        '|'.join(f'{path}:{digest}' for path, digest in sorted(files.items())).encode('utf-8')
+    ).hexdigest()[:12]
+
+    return {'version': combined, 'files': files}
+
+
+# ============== BUILD STEP ==============
+
+def _hashed_name(rel_path: str, digest: str) -> str:
+    root, ext = os.path.splitext(rel_path)
+    return f'{root}.{digest}{ext}'
+
+
+def _list_sources(static_folder: str) -> list:
+    """Source files to fingerprint, as paths relative to static_folder (forward slashes)."""
+    sources = []
+    for entry in BUILD_SOURCES:
+        full_path = os.path.join(static_folder, entry)
+        if os.path.isfile(full_path):
+            sources.append(entry)
+            continue
+        for dirpath, _, filenames in os.walk(full_path):
+            for filename in filenames:
+                rel_path = os.path.relpath(os.path.join(dirpath, filename), static_folder)
+                sources.append(rel_path.replace(os.sep, '/'))
+    return sorted(sources)
+
+
+def _rewrite_css_urls(css: str, css_path: str, files: dict) -> str:
+    """Point url(...) references in a stylesheet at the fingerprinted files."""
+    css_dir = os.path.dirname(css_path)
+
+    def replace(match):
+        quote, url = match.group(1), match.group(2)
+        if url.startswith(('data:', 'http:', 'https:', '//', '/')):
+            return match.group(0)
+        target = os.path.normpath(os.path.join(css_dir, url)).replace(os.sep, '/')
+        if target not in files:
+            return match.group(0)
+        new_url = os.path.relpath(files[target], css_dir or '.').replace(os.sep, '/')
+        return f'url({quote}{new_url}{quote})'
+
+    return CSS_URL_PATTERN.sub(replace, css)
+
+
+def _rewrite_manifest_icons(manifest_json: str, files: dict) -> str:
+    """Point the web app manifest's /static/ icon URLs at the fingerprinted files."""
+    web_manifest = json.loads(manifest_json)
+    for icon in web_manifest.get('icons', []):
+        src = icon.get('src', '')
+        if src.startswith('/static/') and src[len('/static/'):] in files:
+            icon['src'] = f"/assets/{files[src[len('/static/'):]]}"
+    return json.dumps(web_manifest, indent=2)
+
+
+def _write_compressed(path: str) -> dict:
+    """Write .gz/.br siblings of a text asset. Returns encoding -> filename for those that help."""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    variants = {}
+    compressed = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+        compressed['br'] = brotli.compress(data, quality=11)
+    except ImportError:
+        pass
+
+    for encoding, suffix in ENCODINGS:
+        body = compressed.get(encoding)
+        if body is None or len(body) >= len(data):
+            continue
+        with open(path + suffix, 'wb') as f:
+            f.write(body)
+        variants[encoding] = os.path.basename(path) + suffix
+    return variants
+
+
+def _write_image_variants(path: str) -> dict:
+    """Write AVIF/WebP siblings of an image. Returns mimetype -> filename for those that are smaller."""
+    from PIL import Image, features
+
+    variants = {}
+    original_size = os.path.getsize(path)
+    root = os.path.splitext(path)[0]
+
+    with Image.open(path) as image:
+        for mimetype, pil_format, suffix in IMAGE_FORMATS:
+            if not features.check(pil_format.lower()):
+                continue
+            out_path = root + suffix
+            image.save(out_path, pil_format, quality=80)
+            if os.path.getsize(out_path) < original_size:
+                variants[mimetype] = os.path.basename(out_path)
+            else:
+                os.remove(out_path)
+    return variants
+
+
+def build_static_assets(static_folder: str) -> dict:
+    """
+    Build fingerprinted, precompressed copies of the static assets into static/dist.
+
+    Args:
+        static_folder: The app's static folder
+
+    Returns:
+        The manifest that was written
+    """
+    dist_folder = os.path.join(static_folder, DIST_DIRNAME)
+    if os.path.isdir(dist_folder):
+        shutil.rmtree(dist_folder)
+    os.makedirs(dist_folder)
+
+    from app.services.email_assets import optimize_email_image
+
+    sources = _list_sources(static_folder)
+    # Stylesheets and the web manifest last, so their references can point at hashed images
+    sources.sort(key=lambda rel_path: rel_path.endswith('.css') or rel_path == WEB_MANIFEST)
+
+    files = {}
+    variants = {}
+    for rel_path in sources:
+        src_path = os.path.join(static_folder, rel_path)
+        if rel_path.endswith('.css'):
+            with open(src_path, encoding='utf-8') as f:
+                data = _rewrite_css_urls(f.read(), rel_path, files).encode('utf-8')
+        elif rel_path == WEB_MANIFEST:
+            with open(src_path, encoding='utf-8') as f:
+                data = _rewrite_manifest_icons(f.read(), files).encode('utf-8')
+        elif rel_path in RESIZED_IMAGES:
+            data, _ = optimize_email_image(src_path, RESIZED_IMAGES[rel_path])
+        else:
+            with open(src_path, 'rb') as f:
+                data = f.read()
+
+        hashed = _hashed_name(rel_path, hashlib.sha256(data).hexdigest()[:12])
+        out_path = os.path.join(dist_folder, hashed)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, 'wb') as f:
+            f.write(data)
+        files[rel_path] = hashed
+
+        ext = os.path.splitext(rel_path)[1].lower()
+        if ext in COMPRESSIBLE_EXTENSIONS:
+            found = _write_compressed(out_path)
+        elif ext in IMAGE_EXTENSIONS:
+            found = _write_image_variants(out_path)
+        else:
+            found = {}
+        if found:
+            prefix = os.path.dirname(hashed)
+            variants[hashed] = {key: f'{prefix}/{name}' if prefix else name for key, name in found.items()}
+
+    version = hashlib.sha256(
+        '|'.join(sorted(files.values())).encode('utf-8')
+    ).hexdigest()[:12]
+    manifest = {'version': version, 'files': files, 'variants': variants}
+
+    with open(os.path.join(dist_folder, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return manifest
+
+
+def load_build_manifest(static_folder: str) -> dict:
+    """Load the build manifest, or None if the build step hasn't been run."""
+    path = os.path.join(static_folder, DIST_DIRNAME, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# ============== RUNTIME ==============
+
+def asset_url(filename: str) -> str:
+    """
+    URL for a static asset - fingerprinted if the build step has run.
+
+    Use in templates instead of url_for('static', filename=...).
+    """
+    from flask import current_app, url_for
+
+    build = current_app.extensions['asset_build']
+    if build and filename in build['files']:
+        return url_for('asset', filename=build['files'][filename])
+    return url_for('static', filename=filename)
+
+
+def _pick_variant(options: dict, accepted) -> str:
+    for key in accepted:
+        if key in options:
+            return key
+    return None
+
+
+def serve_asset(filename):
+    """Serve a fingerprinted asset, negotiating image format and encoding."""
+    from flask import abort, current_app, request, send_from_directory
+
+    build = current_app.extensions['asset_build']
+    if not build:
+        abort(404)
+    dist_folder = os.path.join(current_app.static_folder, DIST_DIRNAME)
+    options = build['variants'].get(filename, {})
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    path = filename
+    encoding = None
+
+    # Exact matches only - '*/*' alone doesn't mean the browser can decode AVIF
+    explicit = {value for value, quality in request.accept_mimetypes if quality > 0}
+    accepted_types = [m for m, _, _ in IMAGE_FORMATS if m in explicit]
+    image_type = _pick_variant(options, accepted_types)
+    if image_type:
+        path, mimetype = options[image_type], image_type
+    else:
+        accepted_encodings = [e for e, _ in ENCODINGS if e in request.headers.get('Accept-Encoding', '')]
+        encoding = _pick_variant(options, accepted_encodings)
+        if encoding:
+            path = options[encoding]
+
+    response = send_from_directory(dist_folder, path, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if options:
+        response.vary.add('Accept' if any('/' in key for key in options) else 'Accept-Encoding')
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+
+def init_assets(app):
+    """Load the asset manifests once per process and expose asset_url() to templates."""
+    manifest = build_asset_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+    app.extensions['asset_build'] = load_build_manifest(app.static_folder)
+
+    app.add_url_rule('/assets/<path:filename>', 'asset', serve_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.context_processor
+    def inject_asset_version():
+        return {'asset_version': manifest['version']}
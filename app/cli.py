@@ -0,0 +1,179 @@
+"""
+Flask CLI commands for deploy and maintenance tasks.
+
+Usage:
+    flask --app run:app release
+    flask --app run:app build-assets
+    flask --app run:app publish-email-assets
+    flask --app run:app flush-email-events
+    flask --app run:app replay-email-events events.json
+    flask --app run:app create-email-log-partitions
+    flask --app run:app run-email-job maintenance
+    flask --app run:app prune-email-logs --keep-months 12 --archive r2
+    flask --app run:app import-csv members members.csv
+    flask --app run:app import-csv history history.csv --batch-size 1000
+    flask --app run:app reconcile-counters --apply
+    flask --app run:app refresh-location-stats
+    flask --app run:app refresh-location-scores
+    flask --app run:app evaluate-recommendations --last 52
+"""
+
+import click
+
+
+def register_commands(app):
+    """Register custom CLI commands on the app."""
+
+    @app.cli.command('release')
+    def release():
+        """Apply database migrations once per deploy (advisory-lock guarded)."""
+        from app.release import run_release_migrations
+
+        result = run_release_migrations()
+        before = ', '.join(sorted(result['before'])) or 'empty'
+        after = ', '.join(sorted(result['after'])) or 'empty'
+        if result['before'] == result['after']:
+            click.echo(f"Schema already up to date ({after})")
+        else:
+            click.echo(f"Migrated {before} -> {after}")
+
+    @app.cli.command('build-assets')
+    def build_assets():
+        """Fingerprint, precompress and convert static assets into static/dist."""
+        from app.assets import build_static_assets
+
+        manifest = build_static_assets(app.static_folder)
+        click.echo(
+            f"Built {len(manifest['files'])} assets "
+            f"({len(manifest['variants'])} with compressed/image variants), version {manifest['version']}"
+        )
+
+    @app.cli.command('publish-email-assets')
+    def publish_email_assets_command():
+        """Optimize email images and upload changed ones to R2 (immutable, versioned keys)."""
+        from app.services.email_assets import publish_email_assets, get_email_byte_budget
+
+        result = publish_email_assets()
+        if not result['success']:
+            # Not fatal: emails fall back to the /static/emails/ originals
+            click.echo(f"Skipped: {result['message']}")
+            return
+
+        total = 0
+        for param, asset in result['assets'].items():
+            total += asset['bytes']
+            status = 'uploaded' if asset['uploaded'] else 'unchanged'
+            click.echo(f"{param}: {asset['key']} ({asset['bytes']:,} bytes, {status})")
+
+        budget = get_email_byte_budget()
+        if budget and total > budget:
+            click.echo(f"Warning: email images total {total:,} bytes, over the {budget:,} byte budget")
+
+    @app.cli.command('flush-email-events')
+    def flush_email_events():
+        """Apply staged Brevo webhook events to email_logs."""
+        from app.services.email_events import apply_staged_events
+
+        click.echo(apply_staged_events()['message'])
+
+    @app.cli.command('replay-email-events')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    def replay_email_events(path):
+        """Stage and apply Brevo events from a JSON/JSON Lines fixture file."""
+        from app.services.email_events import replay_event_file
+
+        click.echo(replay_event_file(path)['message'])
+
+    @app.cli.command('create-email-log-partitions')
+    @click.option('--months-ahead', default=3, show_default=True, help='Months after this one to pre-create.')
+    def create_email_log_partitions(months_ahead):
+        """Pre-create monthly email_logs partitions (PostgreSQL)."""
+        from app.services.email_log_retention import ensure_partitions
+
+        click.echo(ensure_partitions(months_ahead)['message'])
+
+    @app.cli.command('run-email-job')
+    @click.argument('job_name')
+    @click.option('--dry-run', is_flag=True, help="Don't send emails.")
+    @click.option('--resend', is_flag=True, help='Also send to recipients who already received this lunch email.')
+    def run_email_job_command(job_name, dry_run, resend):
+        """Run a scheduled job by name (for cron), e.g. announcement or maintenance."""
+        from app.services.email_jobs import run_email_job
+
+        click.echo(run_email_job(job_name, dry_run=dry_run, resend=resend)['message'])
+
+    @app.cli.command('prune-email-logs')
+    @click.option('--keep-months', default=12, show_default=True, help='Months of logs to keep, including this one.')
+    @click.option('--archive', type=click.Choice(['local', 'r2', 'none']), default='local', show_default=True)
+    @click.option('--format', 'file_format', type=click.Choice(['csv', 'parquet']), default='csv', show_default=True)
+    @click.option('--dry-run', is_flag=True, help='Only report which months would be removed.')
+    def prune_email_logs_command(keep_months, archive, file_format, dry_run):
+        """Archive and drop email_logs months older than the retention window."""
+        from app.services.email_log_retention import prune_email_logs
+
+        result = prune_email_logs(keep_months, archive, file_format, dry_run)
+        for entry in result['months']:
+            if entry['archive']:
+                click.echo(f"{entry['month']}: archived to {entry['archive']}")
+        click.echo(result['message'])
+
+    @app.cli.command('import-csv')
+    @click.argument('kind', type=click.Choice(['members', 'history']))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', type=int, default=None, help='Rows per batch (default: IMPORT_BATCH_SIZE or 500).')
+    def import_csv(kind, path, batch_size):
+        """Import members or lunch history from a CSV file in upsert batches."""
+        from app.services.csv_import import import_members_csv, import_history_csv
+
+        importer = import_history_csv if kind == 'history' else import_members_csv
+
+        def progress(stats):
+            click.echo(f"Batch {stats['batches']}: {stats['rows']:,} rows read, "
+                       f"{stats['added']:,} added, {stats['updated']:,} updated, {stats['error_count']:,} errors")
+
+        with open(path, 'rb') as stream:
+            result = importer(stream, batch_size=batch_size, progress=progress)
+        for error in result['errors']:
+            click.echo(error)
+        click.echo(result['message'])
+
+    @app.cli.command('reconcile-counters')
+    @click.option('--apply', is_flag=True, help='Write the recomputed counters (default: only report drift).')
+    def reconcile_counters(apply):
+        """Rebuild member hosting counters from attendance history."""
+        from app.services.counter_reconciliation import reconcile_counters as run_reconciliation
+
+        result = run_reconciliation(apply=apply)
+        for entry in result['drift']:
+            changes = ', '.join(
+                f"{counter} {stored} -> {expected}" for counter, (stored, expected) in entry['changes'].items()
+            )
+            click.echo(f"{entry['name']}: {changes}")
+        click.echo(result['message'])
+
+    @app.cli.command('refresh-location-stats')
+    def refresh_location_stats():
+        """Refresh location_stats and the recommendation scores now (normally debounced after writes)."""
+        from app.services.location_stats import refresh_location_stats as refresh
+
+        click.echo(refresh()['message'])
+
+    @app.cli.command('refresh-location-scores')
+    def refresh_location_scores():
+        """Recompute the host recommendation scores from the current location_stats."""
+        from app.services.location_recommendations import refresh_location_scores as refresh
+
+        click.echo(refresh()['message'])
+
+    @app.cli.command('evaluate-recommendations')
+    @click.option('--last', type=int, default=None, help='Only report on the last N lunches (default: all).')
+    def evaluate_recommendations(last):
+        """Rank locations before each past lunch and report how the hosts' picks ranked."""
+        from app.services.location_recommendations import evaluate_recommendations as evaluate
+
+        result = evaluate(last=last)
+        if result['lunches']:
+            for name in ('recommended', 'baseline'):
+                metrics = ', '.join(f"{metric} {value}" for metric, value in result[name].items())
+                click.echo(f"{name}: {metrics}")
+        click.echo(result['message'])
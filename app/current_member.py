@@ -0,0 +1,62 @@
+"""
+Request-scoped current member, shared by the member, secretary and api blueprints.
+
+The session only stores member_id. get_current_member() loads the Member at
+most once per request and keeps it on flask.g, so decorators, views and
+helpers can all ask for it without re-querying. It is loaded lazily, so
+views answered with a 304 by @conditional_get never touch the members table.
+
+Views that only need who is logged in (id, name, email...) can use
+get_current_member_profile() instead: a plain dict cached per worker for
+PROFILE_TTL_SECONDS, so it usually costs no query at all.
+"""
+
+import time
+
+from flask import g, session
+
+from app import db
+from app.models import Member
+
+PROFILE_TTL_SECONDS = 60
+
+PROFILE_FIELDS = ('id', 'name', 'email', 'member_type', 'profile_picture_url')
+
+
+def get_current_member():
+    """The logged-in Member (loaded once per request), or None."""
+    if '_current_member' not in g:
+        member_id = session.get('member_id')
+        g._current_member = db.session.get(Member, member_id) if member_id else None
+    return g._current_member
+
+
+def set_current_member(member):
+    """Use an already-loaded Member as the current member for this request (after login)."""
+    g._current_member = member
+
+
+def _load_profile(member_id: int):
+    member = db.session.get(Member, member_id)
+    if not member:
+        return None
+    return {field: getattr(member, field) for field in PROFILE_FIELDS}
+
+
+def get_current_member_profile():
+    """
+    The logged-in member's basic fields (PROFILE_FIELDS), or None.
+
+    Reuses the request's Member if it's already loaded, otherwise a per-worker
+    copy that is at most PROFILE_TTL_SECONDS old - don't use it for
+    authorization decisions that must see changes immediately.
+    """
+    member_id = session.get('member_id')
+    if not member_id:
+        return None
+    if g.get('_current_member') is not None:
+        return {field: getattr(g._current_member, field) for field in PROFILE_FIELDS}
+
+    from app.services.cache_service import local_cache
+    key = ('member_profile', member_id, int(time.time() // PROFILE_TTL_SECONDS))
+    return local_cache.get_or_set(key, lambda: _load_profile(member_id))
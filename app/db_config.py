@@ -0,0 +1,135 @@
+"""
+SQLAlchemy engine and connection pool configuration.
+
+All settings are environment-driven so they can be tuned per Railway
+service without a code change. Pool size defaults are derived from the
+gunicorn worker/thread count so the total number of connections stays
+inside the database's connection budget:
+
+    connections = WEB_CONCURRENCY * (pool_size + max_overflow)
+
+Environment variables (all optional):
+    WEB_CONCURRENCY               gunicorn workers (default 1)
+    GUNICORN_THREADS              threads per worker (default 1)
+    EMAIL_DISPATCH_WORKERS        background email threads per worker (default 2)
+    DB_MAX_CONNECTIONS            total connection budget for this service (default 20)
+    DB_POOL_SIZE                  override computed pool size
+    DB_MAX_OVERFLOW               override computed overflow
+    DB_POOL_TIMEOUT               seconds to wait for a pooled connection (default 10)
+    DB_POOL_RECYCLE               seconds before a connection is recycled (default 1800)
+    DB_POOL_PRE_PING              '0' to disable pre-ping (default on)
+    DB_STATEMENT_TIMEOUT_MS       statement_timeout (default 15000, 0 = off)
+    DB_IDLE_TX_TIMEOUT_MS         idle_in_transaction_session_timeout (default 60000, 0 = off)
+    DB_PGBOUNCER                  '1' when connecting through PgBouncer in transaction mode
+"""
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer environment variable, falling back on bad input."""
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    """Read a boolean environment variable ('1', 'true', 'yes' = True)."""
+    value = os.environ.get(name, '').strip().lower()
+    if not value:
+        return default
+    return value in ('1', 'true', 'yes', 'on')
+
+
+def get_pool_sizing() -> dict:
+    """
+    Compute per-worker pool size and overflow.
+
+    Each gunicorn thread (and each background email dispatch thread, see
+    email_dispatch.py) needs at most one connection at a time, so the pool
+    is sized to the thread count, capped so every worker fits in the budget.
+    """
+    workers = max(1, _env_int('WEB_CONCURRENCY', 1))
+    threads = max(1, _env_int('GUNICORN_THREADS', 1)) + max(0, _env_int('EMAIL_DISPATCH_WORKERS', 2))
+    budget = max(1, _env_int('DB_MAX_CONNECTIONS', 20))
+
+    per_worker = max(1, budget // workers)
+    pool_size = min(threads, per_worker)
+    max_overflow = max(0, min(threads, per_worker - pool_size))
+
+    return {
+        'workers': workers,
+        'threads': threads,
+        'pool_size': _env_int('DB_POOL_SIZE', pool_size),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', max_overflow),
+    }
+
+
+def get_engine_options(database_uri: str) -> dict:
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for the given database URI.
+
+    SQLite (local dev) gets SQLAlchemy defaults; pool and timeout tuning
+    only applies to PostgreSQL.
+    """
+    if not database_uri.startswith('postgresql'):
+        return {}
+
+    sizing = get_pool_sizing()
+    options = {
+        'pool_size': sizing['pool_size'],
+        'max_overflow': sizing['max_overflow'],
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 10),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', True),
+    }
+
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 15000)
+    idle_tx_timeout = _env_int('DB_IDLE_TX_TIMEOUT_MS', 60000)
+
+    connect_args = {}
+    if _env_flag('DB_PGBOUNCER', False):
+        # PgBouncer (transaction mode) rejects startup 'options' and cannot
+        # carry server-side prepared statements across transactions.
+        # Timeouts should be set on the role instead:
+        #   ALTER ROLE app SET statement_timeout = '15s';
+        # psycopg2 never prepares server-side; psycopg 3 needs it disabled.
+        if database_uri.startswith('postgresql+psycopg://'):
+            connect_args['prepare_threshold'] = None
+    else:
+        server_options = []
+        if statement_timeout > 0:
+            server_options.append(f'-c statement_timeout={statement_timeout}')
+        if idle_tx_timeout > 0:
+            server_options.append(f'-c idle_in_transaction_session_timeout={idle_tx_timeout}')
+        if server_options:
+            connect_args['options'] = ' '.join(server_options)
+
+    if connect_args:
+        options['connect_args'] = connect_args
+
+    return options
+
+
+def get_pool_stats(engine) -> dict:
+    """
+    Snapshot of connection pool usage for instrumentation.
+
+    Returns an empty dict for pools that don't track checkouts (e.g. SQLite's
+    SingletonThreadPool).
+    """
+    pool = engine.pool
+    if not all(hasattr(pool, attr) for attr in ('size', 'checkedin', 'checkedout', 'overflow')):
+        return {}
+
+    return {
+        'pool_class': type(pool).__name__,
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+    }
@@ -0,0 +1,100 @@
+"""
+Read-replica routing for read-heavy member pages.
+
+When DATABASE_REPLICA_URL is set, it is registered as the 'replica' bind in
+SQLALCHEMY_BINDS. Views marked with @read_replica send their SELECTs to the
+replica; everything else uses the primary.
+
+Writes always go to the primary:
+- Any flush inside a request switches the rest of that request to the primary.
+- After a request that wrote, the member's session sticks to the primary for
+  REPLICA_STICKY_SECONDS so they see their own change (read-after-write)
+  instead of a lagging replica.
+
+For local testing, a SQLite copy of the dev database works as a replica:
+    DATABASE_REPLICA_URL=sqlite:///replica.db
+"""
+
+import os
+import time
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND_KEY = 'replica'
+
+# How long after a write this browser session keeps reading from the primary
+# (app.config['REPLICA_STICKY_SECONDS'], from the environment in init_replica_routing)
+DEFAULT_REPLICA_STICKY_SECONDS = 10
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that can route read-only requests to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._should_use_replica(clause):
+            return self._db.engines[REPLICA_BIND_KEY]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _should_use_replica(self, clause) -> bool:
+        if not has_request_context() or not g.get('db_read_replica'):
+            return False
+        if g.get('db_force_primary') or self._flushing:
+            return False
+        if isinstance(clause, sa.UpdateBase):
+            return False
+        return REPLICA_BIND_KEY in self._db.engines
+
+
+def read_replica(f):
+    """Decorator to mark a view as read-only so its queries may use the replica."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@sa.event.listens_for(RoutingSession, 'after_flush')
+def _mark_request_wrote(db_session, flush_context):
+    """Pin the rest of the request (and the next few) to the primary after a write."""
+    if has_request_context():
+        g.db_force_primary = True
+        g.db_wrote = True
+
+
+def get_replica_binds() -> dict:
+    """Build SQLALCHEMY_BINDS entries for the read replica, if configured."""
+    from app.db_config import get_engine_options
+
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if not replica_url:
+        return {}
+    if replica_url.startswith('postgres://'):
+        replica_url = replica_url.replace('postgres://', 'postgresql://', 1)
+
+    # Binds don't inherit SQLALCHEMY_ENGINE_OPTIONS, so pass pool settings explicitly
+    return {REPLICA_BIND_KEY: {'url': replica_url, **get_engine_options(replica_url)}}
+
+
+def init_replica_routing(app):
+    """Register request hooks that implement read-after-write stickiness."""
+    # Read here rather than at import time, after create_app() has loaded .env
+    app.config.setdefault(
+        'REPLICA_STICKY_SECONDS',
+        int(os.environ.get('REPLICA_STICKY_SECONDS', DEFAULT_REPLICA_STICKY_SECONDS))
+    )
+
+    @app.before_request
+    def check_primary_stickiness():
+        sticky_until = session.get('db_primary_until')
+        if sticky_until and sticky_until > time.time():
+            g.db_force_primary = True
+
+    @app.after_request
+    def remember_recent_write(response):
+        if g.get('db_wrote'):
+            session['db_primary_until'] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+        return response
@@ -0,0 +1,97 @@
+"""
+Conditional GET (ETag / Last-Modified) support for member pages and JSON APIs.
+
+ETags are derived from version stamps (see app/services/cache_service.py),
+never from the rendered body, so a matching If-None-Match is answered with
+304 Not Modified before the view runs a single query or renders a template.
+
+Usage:
+    @member_bp.route('/lineup')
+    @member_required
+    @conditional_get()
+    def lineup(): ...
+
+    @api_bp.route('/locations/<int:location_id>/details')
+    @conditional_get(per_member=False, max_age=60)
+    def get_location_details(location_id): ...
+"""
+
+import hashlib
+import os
+from datetime import date
+from functools import wraps
+
+from flask import request, session, make_response
+
+# Changes on every deploy so template/code changes invalidate old ETags
+DEPLOY_VERSION = os.environ.get('RAILWAY_GIT_COMMIT_SHA', 'dev')[:12]
+
+
+def build_etag(stamps: dict, per_member: bool, extra: tuple = ()) -> str:
+    """Hash everything a cacheable response depends on into an ETag."""
+    parts = [
+        DEPLOY_VERSION,
+        request.endpoint or '',
+        request.full_path,
+        date.today().isoformat(),  # "next Tuesday" etc. roll over daily
+    ]
+    parts.extend(f'{name}={version}' for name, (version, _) in sorted(stamps.items()))
+    parts.extend(str(part) for part in extra)
+    if per_member:
+        parts.append(f"member={session.get('member_id')}")
+        parts.append(f"secretary={session.get('is_secretary')}")
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+
+
+def conditional_get(*stamp_names, per_member: bool = True, max_age: int = 0, etag_parts: tuple = ()):
+    """
+    Decorator adding ETag/Last-Modified validation and Cache-Control to a view.
+
+    Args:
+        stamp_names: Version stamps the view depends on (default: 'data')
+        per_member: Whether the response varies by logged-in member. Per-member
+            responses are 'private' and only validated by ETag.
+        max_age: Seconds the browser may reuse the response without revalidating
+        etag_parts: Callables whose results also go into the ETag, for inputs
+            that have no version stamp (e.g. get_forecast_token)
+    """
+    stamp_names = stamp_names or ('data',)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Pending flash messages are rendered into the page - never cache those
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            from app.services.cache_service import get_versions
+            stamps = get_versions(*stamp_names)
+            etag = build_etag(stamps, per_member, tuple(part() for part in etag_parts))
+            timestamps = [updated_at for _, updated_at in stamps.values() if updated_at]
+            last_modified = max(timestamps).replace(microsecond=0) if timestamps else None
+
+            cache_control = f"{'private' if per_member else 'public'}, max-age={max_age}, must-revalidate"
+
+            not_modified = etag in request.if_none_match
+            if (not per_member and not request.if_none_match
+                    and last_modified and request.if_modified_since):
+                not_modified = request.if_modified_since.replace(tzinfo=None) >= last_modified
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = cache_control
+            if per_member:
+                response.vary.add('Cookie')
+                # The service worker keys its page cache by member (service_worker.js)
+                response.headers['X-Member-Id'] = str(session.get('member_id'))
+            return response
+        return decorated_function
+    return decorator
@@ -6,7 +6,14 @@ from app.models.attendance import Attendance
 from app.models.rating import Rating
 from app.models.photo import Photo, PhotoTag
 from app.models.email_log import EmailLog
+from app.models.email_event import EmailEvent
+from app.models.email_send_key import EmailSendKey
+from app.models.job_run import JobRun
 from app.models.setting import Setting
 from app.models.rate_limit import RateLimit
+from app.models.used_magic_link import UsedMagicLink
+from app.models.skip_week import SkipWeek
+from app.models.location_score import LocationScore
+from app.models.location_stats import LocationStats
 
-__all__ = ['Member', 'Location', 'Lunch', 'Attendance', 'Rating', 'Photo', 'PhotoTag', 'EmailLog', 'Setting', 'RateLimit']
+__all__ = ['Member', 'Location', 'Lunch', 'Attendance', 'Rating', 'Photo', 'PhotoTag', 'EmailLog', 'EmailEvent', 'EmailSendKey', 'JobRun', 'Setting', 'RateLimit', 'UsedMagicLink', 'SkipWeek', 'LocationScore', 'LocationStats']
@@ -0,0 +1,21 @@
+from datetime import datetime
+from app import db
+
+
+class EmailEvent(db.Model):
+    """
+    Staging table for Brevo webhook events.
+
+    The webhook only appends rows here; app/services/email_events.py applies
+    them to email_logs in bulk and deletes them.
+    """
+    __tablename__ = 'email_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    brevo_message_id = db.Column(db.String(100), nullable=False)
+    event = db.Column(db.String(30), nullable=False)  # Brevo event name (delivered, opened, click, hard_bounce...)
+    occurred_at = db.Column(db.DateTime, nullable=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<EmailEvent {self.event} {self.brevo_message_id}>'
@@ -16,18 +16,33 @@ class EmailLog(db.Model):
     lunch_id = db.Column(db.Integer, db.ForeignKey('lunches.id'), nullable=True)
 
     # Brevo tracking
-    brevo_message_id = db.Column(db.String(100), nullable=True)
+    brevo_message_id = db.Column(db.String(100), nullable=True, index=True)
 
     # Status tracking
     status = db.Column(db.String(20), default='sent')  # sent, delivered, opened, clicked, bounced, failed
     error_message = db.Column(db.Text, nullable=True)
 
-    # Timestamps
-    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Timestamps (sent_at is the partition key on PostgreSQL - monthly partitions)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship
     lunch = db.relationship('Lunch', backref=db.backref('email_logs', lazy='dynamic'))
 
+    # Keyset pagination on (sent_at, id), alone and behind each log viewer filter
+    __table_args__ = (
+        db.Index('ix_email_logs_sent_at_id', 'sent_at', 'id'),
+        db.Index('ix_email_logs_type_sent_at', 'email_type', 'sent_at', 'id'),
+        db.Index('ix_email_logs_status_sent_at', 'status', 'sent_at', 'id'),
+        db.Index('ix_email_logs_lunch_sent_at', 'lunch_id', 'sent_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<EmailLog {self.email_type} to {self.recipient_email}>'
+
+
+# The recipient filter matches case-insensitively on lower(recipient_email)
+db.Index(
+    'ix_email_logs_recipient_lower_sent_at',
+    db.func.lower(EmailLog.recipient_email), EmailLog.sent_at, EmailLog.id
+)
@@ -0,0 +1,20 @@
+from datetime import datetime
+from app import db
+
+
+class EmailSendKey(db.Model):
+    """
+    Idempotency keys for email sends (one row per job + lunch + recipient).
+
+    Kept apart from email_logs because that table is partitioned by sent_at,
+    which rules out a unique constraint on the key alone.
+    """
+    __tablename__ = 'email_send_keys'
+
+    key = db.Column(db.String(255), primary_key=True)  # e.g. host_reminder_at_bat:42:bob@example.com
+    status = db.Column(db.String(20), nullable=False, default='claimed')  # claimed, sent, failed
+    claimed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    email_log_id = db.Column(db.Integer, nullable=True)
+
+    def __repr__(self):
+        return f'<EmailSendKey {self.key} {self.status}>'
@@ -0,0 +1,40 @@
+from datetime import datetime
+from app import db
+
+
+class JobRun(db.Model):
+    """
+    Ledger of email job invocations (one row per run).
+
+    Written by record_job_run() in app/services/email_jobs.py. Phase timings
+    are summed over the whole run, in milliseconds.
+    """
+    __tablename__ = 'job_runs'
+    __table_args__ = (
+        db.Index('ix_job_runs_job_name_started_at', 'job_name', 'started_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(50), nullable=False)  # host_reminders, secretary_reminder, announcement, rating_request
+    dry_run = db.Column(db.Boolean, default=False, nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_ms = db.Column(db.Integer, nullable=True)
+    success = db.Column(db.Boolean, default=False, nullable=False)
+
+    # Phase timings (ms)
+    prefetch_ms = db.Column(db.Integer, default=0, nullable=False)   # DB reads before sending
+    render_ms = db.Column(db.Integer, default=0, nullable=False)     # template read + substitution
+    send_ms = db.Column(db.Integer, default=0, nullable=False)       # Brevo API calls
+    log_write_ms = db.Column(db.Integer, default=0, nullable=False)  # email_logs / send key writes
+
+    # Recipient counts
+    sent_count = db.Column(db.Integer, default=0, nullable=False)
+    failed_count = db.Column(db.Integer, default=0, nullable=False)
+    skipped_count = db.Column(db.Integer, default=0, nullable=False)
+
+    message = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f'<JobRun {self.job_name} {self.started_at}>'
@@ -0,0 +1,30 @@
+from datetime import datetime
+from app import db
+
+
+class LocationScore(db.Model):
+    """Precomputed recommendation score for a location (see services/location_recommendations.py)."""
+    __tablename__ = 'location_scores'
+
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)  # Weighted sum of the components below, 0-1
+
+    # Score components, each 0-1 (higher = more recommended)
+    rating_score = db.Column(db.Float, nullable=False)     # avg_group_rating
+    recency_score = db.Column(db.Float, nullable=False)    # Time since last visit
+    visit_score = db.Column(db.Float, nullable=False)      # visit_count (proven favourites)
+    price_score = db.Column(db.Float, nullable=False)      # price_level (cheaper = higher)
+    diversity_score = db.Column(db.Float, nullable=False)  # Cuisine not eaten at recent lunches
+    google_score = db.Column(db.Float, nullable=False)     # google_rating
+
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    location = db.relationship('Location')
+
+    __table_args__ = (
+        # Recommendations are read best-first
+        db.Index('ix_location_scores_score', 'score'),
+    )
+
+    def __repr__(self):
+        return f'<LocationScore location={self.location_id} score={self.score:.3f}>'
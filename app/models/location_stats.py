@@ -0,0 +1,45 @@
+from app import db
+
+# location_stats is created by its migration (c4e9a1d7b352), not from the model:
+# keeping it out of db.metadata means db.create_all() never makes a plain table
+# where PostgreSQL needs the materialized view. Tables here are marked
+# info={'is_view': True} and left out of autogenerate (migrations/env.py).
+view_metadata = db.MetaData()
+
+
+class LocationStats(db.Model):
+    """
+    Visit and rating statistics per location (see services/location_stats.py).
+
+    A materialized view on PostgreSQL (refreshed CONCURRENTLY), a table kept
+    up to date by the same refresh elsewhere. Read-only for the app.
+    """
+    __tablename__ = 'location_stats'
+    __table_args__ = {'info': {'is_view': True}}
+    metadata = view_metadata
+
+    location_id = db.Column(db.Integer, primary_key=True)  # locations.id
+
+    # Completed lunches at this location
+    visit_count = db.Column(db.Integer, nullable=False, default=0)
+    last_visited = db.Column(db.Date, nullable=True)
+    total_attendance = db.Column(db.Integer, nullable=False, default=0)
+    avg_attendance = db.Column(db.Float, nullable=True)  # Attendance per visit
+
+    # Submitted ratings for those lunches
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    avg_rating = db.Column(db.Float, nullable=True)
+    rating_1 = db.Column(db.Integer, nullable=False, default=0)
+    rating_2 = db.Column(db.Integer, nullable=False, default=0)
+    rating_3 = db.Column(db.Integer, nullable=False, default=0)
+    rating_4 = db.Column(db.Integer, nullable=False, default=0)
+    rating_5 = db.Column(db.Integer, nullable=False, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def rating_histogram(self) -> dict:
+        """Number of ratings per star (1-5)."""
+        return {stars: getattr(self, f'rating_{stars}') for stars in range(1, 6)}
+
+    def __repr__(self):
+        return f'<LocationStats location={self.location_id} visits={self.visit_count}>'
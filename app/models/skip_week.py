@@ -0,0 +1,14 @@
+from datetime import datetime
+from app import db
+
+
+class SkipWeek(db.Model):
+    """A lunch day with no lunch (holiday, venue closure...)."""
+    __tablename__ = 'skip_weeks'
+
+    date = db.Column(db.Date, primary_key=True)  # The skipped lunch day (a Tuesday)
+    reason = db.Column(db.String(200), nullable=True)  # e.g. "Christmas"
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SkipWeek {self.date}>'
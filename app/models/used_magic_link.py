@@ -0,0 +1,56 @@
+"""
+Used-token store for signed magic links.
+
+Signed magic links (app/services/magic_link.py) carry everything needed to
+verify them, so the only state is which ones have already been used. Rows
+only need to live until the link would have expired anyway, so the table
+stays tiny: expired rows are swept by the scheduled maintenance job
+(cleanup_expired(), via the expires_at index).
+"""
+
+from datetime import datetime
+from app import db
+
+
+class UsedMagicLink(db.Model):
+    """Nonce of a signed magic link that has been used (kept until it expires)."""
+    __tablename__ = 'used_magic_links'
+
+    nonce = db.Column(db.String(32), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    @classmethod
+    def claim(cls, nonce, expires_at):
+        """
+        Mark a link as used, atomically.
+
+        A single INSERT ... ON CONFLICT DO NOTHING RETURNING, so two
+        concurrent clicks on the same link can't both succeed.
+
+        Returns:
+            bool: True if this is the first use of the link
+        """
+        if db.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        statement = insert(cls.__table__).values(nonce=nonce, expires_at=expires_at)
+        statement = statement.on_conflict_do_nothing(index_elements=['nonce']).returning(cls.__table__.c.nonce)
+        claimed = db.session.execute(statement).scalar() is not None
+        db.session.commit()
+        return claimed
+
+    @classmethod
+    def cleanup_expired(cls):
+        """
+        Delete the rows of links that have expired (they can't be used again anyway).
+
+        Called by the maintenance job (app/services/email_jobs.py).
+        """
+        deleted = cls.query.filter(cls.expires_at < datetime.utcnow()).delete()
+        db.session.commit()
+        return deleted
+
+    def __repr__(self):
+        return f'<UsedMagicLink {self.nonce}>'
@@ -0,0 +1,106 @@
+"""
+Release-phase database migrations.
+
+Migrations used to run inside create_app() on every gunicorn worker boot,
+which meant every worker connected to the database, checked Alembic state,
+and raced the others to apply the same migration.
+
+Now:
+- `flask release` (run once per deploy, see Procfile) applies migrations
+  while holding a Postgres advisory lock, so concurrent release runs
+  serialize instead of colliding.
+- create_app() only calls check_schema_revision(), a single SELECT against
+  alembic_version that logs loudly if the database is behind the code.
+"""
+
+from flask import current_app
+from sqlalchemy import text
+
+from app import db
+
+# Arbitrary but fixed key for pg_advisory_lock - any process running the
+# release step must use the same value.
+MIGRATION_LOCK_KEY = 7_204_151_226
+
+
+def get_code_heads() -> set:
+    """Get the Alembic head revision(s) shipped with this code."""
+    from alembic.script import ScriptDirectory
+
+    config = current_app.extensions['migrate'].migrate.get_config()
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def get_database_heads() -> set:
+    """Get the Alembic revision(s) currently stamped in the database."""
+    from alembic.runtime.migration import MigrationContext
+
+    with db.engine.connect() as connection:
+        return set(MigrationContext.configure(connection).get_current_heads())
+
+
+def check_schema_revision() -> bool:
+    """
+    Fast-path boot check: verify the database schema matches the code.
+
+    Does NOT migrate. Logs an error if the database is behind (the release
+    step did not run or failed) so the deploy logs make the problem obvious.
+
+    Returns:
+        True if the database revision matches the code head(s)
+    """
+    try:
+        code_heads = get_code_heads()
+        db_heads = get_database_heads()
+    except Exception as e:
+        current_app.logger.error(f"Schema revision check failed: {e}")
+        return False
+
+    if code_heads != db_heads:
+        current_app.logger.error(
+            f"Database schema is at {sorted(db_heads) or 'no revision'} but code expects "
+            f"{sorted(code_heads)}. Run `flask release` to apply migrations."
+        )
+        return False
+
+    return True
+
+
+def run_release_migrations() -> dict:
+    """
+    Apply pending migrations, guarded by a Postgres advisory lock.
+
+    Only one process can hold the lock at a time; others block until it is
+    released, then find nothing left to do. On SQLite (local dev) the lock
+    is skipped.
+
+    Returns:
+        dict with 'before', 'after' (sets of revisions) and 'locked' (bool)
+    """
+    from flask_migrate import upgrade
+
+    result = {
+        'before': get_database_heads(),
+        'after': None,
+        'locked': False,
+    }
+
+    if db.engine.dialect.name != 'postgresql':
+        upgrade()
+        result['after'] = get_database_heads()
+        return result
+
+    # Session-level advisory lock on a dedicated connection; held until unlock
+    with db.engine.connect() as lock_conn:
+        current_app.logger.info("Waiting for migration advisory lock...")
+        lock_conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+        lock_conn.commit()
+        result['locked'] = True
+        try:
+            upgrade()
+        finally:
+            lock_conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+            lock_conn.commit()
+
+    result['after'] = get_database_heads()
+    return result
@@ -1,15 +1,15 @@
 from functools import wraps
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, jsonify, Response
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, jsonify, Response, stream_with_context
 from markupsafe import Markup
-from datetime import date, timedelta, datetime
-import csv
-import io
+from datetime import date, datetime
 import secrets
 import os
 from app import db
 from app.models import Member, Location, Lunch, Attendance, Setting, Photo
 from app.services.storage_service import storage_service
 from app.services.email_jobs import get_hosting_queue
+from app.services.lunch_calendar import get_next_lunch_date
+from app.services.location_stats import get_location_stats
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -50,33 +50,23 @@ def logout():
 @admin_required
 def dashboard():
     """Main admin dashboard."""
-    # Get or create this week's lunch (next Tuesday)
-    today = date.today()
-    days_until_tuesday = (1 - today.weekday()) % 7  # Tuesday is weekday 1
-    if days_until_tuesday == 0 and today.weekday() == 1:
-        next_tuesday = today  # It's Tuesday
-    else:
-        next_tuesday = today + timedelta(days=days_until_tuesday)
-    
-    current_lunch = Lunch.query.filter_by(date=next_tuesday).first()
+    from app.services.admin_dashboard import get_admin_dashboard
+
+    # This week's lunch (the next lunch date, skip weeks excluded)
+    next_tuesday = get_next_lunch_date()
+
+    # Lunches, queue and stats from the cached read model (3 queries on a miss)
+    dashboard_data = get_admin_dashboard(next_tuesday)
+    stats = dashboard_data['stats']
 
-    # Get hosting queue (top 5) - uses queue_position override if set
-    hosting_queue = get_hosting_queue(limit=5)
-    
-    # Get recent lunches
-    recent_lunches = Lunch.query.order_by(Lunch.date.desc()).limit(5).all()
-    
-    # Get member stats
-    total_members = Member.query.filter_by(member_type='regular').count()
-    total_guests = Member.query.filter_by(member_type='guest').count()
-    
     return render_template('admin/dashboard.html',
-                           current_lunch=current_lunch,
+                           current_lunch=dashboard_data['current_lunch'],
                            next_tuesday=next_tuesday,
-                           hosting_queue=hosting_queue,
-                           recent_lunches=recent_lunches,
-                           total_members=total_members,
-                           total_guests=total_guests)
+                           hosting_queue=dashboard_data['hosting_queue'],
+                           recent_lunches=dashboard_data['recent_lunches'],
+                           total_members=stats['total_members'],
+                           total_guests=stats['total_guests'],
+                           stats=stats)
 
 
 @admin_bp.route('/attendance', methods=['GET', 'POST'])
@@ -94,12 +84,7 @@ def attendance():
     if lunch_date_str:
         lunch_date = date.fromisoformat(lunch_date_str)
     else:
-        today = date.today()
-        days_until_tuesday = (1 - today.weekday()) % 7
-        if days_until_tuesday == 0 and today.weekday() == 1:
-            lunch_date = today
-        else:
-            lunch_date = today + timedelta(days=days_until_tuesday)
+        lunch_date = get_next_lunch_date()
 
     # Get or create lunch record
     lunch = Lunch.query.filter_by(date=lunch_date).first()
@@ -465,58 +450,60 @@ def setup():
 @admin_required
 def export_member_template():
     """Export CSV template with current members for data entry."""
-    members = Member.query.order_by(Member.name).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header row
-    writer.writerow([
-        'name',
-        'email', 
-        'member_type',
-        'attendance_since_hosting',
-        'last_hosted_date',
-        'total_hosting_count',
-        'first_attended'
-    ])
-    
-    # Data rows (existing members or empty template)
-    if members:
-        for m in members:
-            writer.writerow([
-                m.name,
-                m.email,
-                m.member_type,
-                m.attendance_since_hosting or 0,
-                m.last_hosted_date.strftime('%Y-%m-%d') if m.last_hosted_date else '',
-                m.total_hosting_count or 0,
-                m.first_attended.strftime('%Y-%m-%d') if m.first_attended else ''
-            ])
-    else:
-        # Example row
-        writer.writerow([
-            'John Doe',
-            'john@example.com',
-            'regular',
-            '3',
-            '2024-11-15',
-            '5',
-            '2020-01-01'
-        ])
-    
-    output.seek(0)
+    return export_response(preset='member_template')
+
+
+# ============== DATA EXPORTS ==============
+
+def export_response(**export_args):
+    """Stream an export (see app/services/data_export.py) as a file download."""
+    from app.services.data_export import prepare_export
+
+    export = prepare_export(**export_args)
     return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=members_template.csv'}
+        stream_with_context(export['chunks']),
+        mimetype=export['mimetype'],
+        headers={'Content-Disposition': f"attachment; filename={export['filename']}"}
     )
 
 
+@admin_bp.route('/export')
+@admin_required
+def data_export():
+    """Export page: pick a table, columns, date range and format."""
+    from app.services.data_export import EXPORTS, get_export_columns, parquet_available
+
+    tables = {name: {'columns': get_export_columns(name), 'date_column': date_column}
+              for name, (_, date_column) in EXPORTS.items()}
+    return render_template('admin/export.html',
+                           tables=tables,
+                           parquet_available=parquet_available())
+
+
+@admin_bp.route('/export/download')
+@admin_required
+def download_export():
+    """Stream an export. Query params: table, columns (comma-separated), from, to, format."""
+    from app.services.data_export import ExportError
+
+    columns = [column.strip() for column in request.args.get('columns', '').split(',') if column.strip()]
+    try:
+        return export_response(
+            name=request.args.get('table', ''),
+            columns=columns or None,
+            date_from=request.args.get('from') or None,
+            date_to=request.args.get('to') or None,
+            file_format=request.args.get('format', 'csv'),
+        )
+    except ExportError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin.data_export'))
+
+
 @admin_bp.route('/setup/import', methods=['GET', 'POST'])
 @admin_required
 def import_members():
-    """Import members and historical data from CSV."""
+    """Import members, or past lunches and attendance, from a CSV (streamed in batches)."""
     if request.method == 'GET':
         return render_template('admin/import.html')
     
@@ -534,104 +521,32 @@ def import_members():
         flash('File must be a CSV', 'error')
         return redirect(url_for('admin.import_members'))
     
-    try:
-        # Read CSV
-        stream = io.StringIO(file.stream.read().decode('utf-8-sig'))  # utf-8-sig handles BOM
-        reader = csv.DictReader(stream)
-        
-        results = {'added': 0, 'updated': 0, 'errors': []}
-        
-        for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
-            try:
-                email = row.get('email', '').strip().lower()
-                if not email:
-                    results['errors'].append(f"Row {row_num}: Missing email")
-                    continue
-                
-                name = row.get('name', '').strip()
-                if not name:
-                    results['errors'].append(f"Row {row_num}: Missing name")
-                    continue
-                
-                # Parse optional fields
-                member_type = row.get('member_type', 'regular').strip() or 'regular'
-                if member_type not in ('regular', 'guest', 'inactive'):
-                    member_type = 'regular'
-                
-                attendance = int(row.get('attendance_since_hosting', 0) or 0)
-                hosting_count = int(row.get('total_hosting_count', 0) or 0)
-                
-                last_hosted = None
-                if row.get('last_hosted_date', '').strip():
-                    try:
-                        last_hosted = datetime.strptime(row['last_hosted_date'].strip(), '%Y-%m-%d')
-                    except ValueError:
-                        results['errors'].append(f"Row {row_num}: Invalid last_hosted_date format (use YYYY-MM-DD)")
-                
-                first_attended = None
-                if row.get('first_attended', '').strip():
-                    try:
-                        first_attended = datetime.strptime(row['first_attended'].strip(), '%Y-%m-%d').date()
-                    except ValueError:
-                        results['errors'].append(f"Row {row_num}: Invalid first_attended format (use YYYY-MM-DD)")
-                
-                # Find or create member
-                member = Member.query.filter_by(email=email).first()
-                if member:
-                    # Update existing
-                    member.name = name
-                    member.member_type = member_type
-                    member.attendance_since_hosting = attendance
-                    member.total_hosting_count = hosting_count
-                    member.last_hosted_date = last_hosted
-                    member.first_attended = first_attended
-                    results['updated'] += 1
-                else:
-                    # Create new
-                    member = Member(
-                        name=name,
-                        email=email,
-                        member_type=member_type,
-                        attendance_since_hosting=attendance,
-                        total_hosting_count=hosting_count,
-                        last_hosted_date=last_hosted,
-                        first_attended=first_attended
-                    )
-                    db.session.add(member)
-                    results['added'] += 1
-                    
-            except Exception as e:
-                results['errors'].append(f"Row {row_num}: {str(e)}")
-
-        db.session.commit()
-
-        # Build flash message
-        msg = f"Import complete: {results['added']} added, {results['updated']} updated"
-        if results['errors']:
-            msg += f", {len(results['errors'])} errors"
-            for err in results['errors'][:5]:  # Show first 5 errors
-                flash(err, 'error')
-            if len(results['errors']) > 5:
-                flash(f"...and {len(results['errors']) - 5} more errors", 'error')
+    from app.services.csv_import import import_members_csv, import_history_csv
+
+    import_type = request.form.get('import_type', 'members')
+    importer = import_history_csv if import_type == 'history' else import_members_csv
+    result = importer(
+        file.stream,
+        progress=lambda stats: current_app.logger.info(
+            f"CSV import ({import_type}): {stats['rows']} rows, {stats['batches']} batches"
+        )
+    )
 
-        flash(msg, 'success')
-        return redirect(url_for('admin.setup'))
+    if not result['success']:
+        flash(f"Error processing CSV: {result['message']}", 'error')
+    for err in result['errors'][:5]:  # Show first 5 errors
+        flash(err, 'error')
+    if result['error_count'] > 5:
+        flash(f"...and {result['error_count'] - 5} more errors", 'error')
 
-    except Exception as e:
-        flash(f'Error processing CSV: {str(e)}', 'error')
+    if not result['success']:
         return redirect(url_for('admin.import_members'))
 
+    flash(result['message'], 'success')
+    return redirect(url_for('admin.setup'))
 
-# ============== EMAIL PREVIEW ROUTES ==============
-
-def get_next_tuesday():
-    """Get the next Tuesday date."""
-    today = date.today()
-    days_until_tuesday = (1 - today.weekday()) % 7
-    if days_until_tuesday == 0 and today.weekday() == 1:
-        return today
-    return today + timedelta(days=days_until_tuesday)
 
+# ============== EMAIL PREVIEW ROUTES ==============
 
 def substitute_brevo_params(html_content, params):
     """Replace Brevo {{ params.X }} placeholders with actual values for preview."""
@@ -658,7 +573,7 @@ def preview_email(email_type):
     Templates use Brevo syntax {{ params.VARIABLE_NAME }}.
     For preview, we substitute sample values from the database.
     """
-    next_tuesday = get_next_tuesday()
+    next_tuesday = get_next_lunch_date()
     app_url = current_app.config.get('APP_URL', 'http://localhost:5000')
 
     # Get sample data from database (uses queue_position override if set)
@@ -816,7 +731,7 @@ def live_preview_email(email_type):
     from app.models import Lunch, Rating
     import os
 
-    next_tuesday = get_next_tuesday()
+    next_tuesday = get_next_lunch_date()
     app_url = current_app.config.get('APP_URL', request.url_root.rstrip('/'))
 
     # Get the next host (uses queue_position override if set)
@@ -1087,28 +1002,30 @@ def email_jobs():
     """Email job management page - view and trigger email jobs."""
     from app.models import EmailLog, Lunch
 
-    # Get next Tuesday info
-    today = date.today()
-    days_until_tuesday = (1 - today.weekday()) % 7
-    if days_until_tuesday == 0 and today.weekday() == 1:
-        next_tuesday = today
-    else:
-        next_tuesday = today + timedelta(days=days_until_tuesday)
+    # Get next lunch date info
+    next_tuesday = get_next_lunch_date()
 
     # Get lunch for next Tuesday
     next_lunch = Lunch.query.filter_by(date=next_tuesday).first()
 
     # Get recent email logs
-    recent_emails = EmailLog.query.order_by(EmailLog.sent_at.desc()).limit(20).all()
+    from app.services.email_log_query import get_recent_email_logs
+    recent_emails = get_recent_email_logs(limit=20)
 
     # Get hosting queue (uses queue_position override if set)
     hosting_queue = get_hosting_queue(limit=3)
 
+    # Run durations from the job_runs ledger
+    from app.services.email_jobs import get_job_run_stats, JOB_PHASES
+    job_stats = get_job_run_stats()
+
     return render_template('admin/email_jobs.html',
                            next_tuesday=next_tuesday,
                            next_lunch=next_lunch,
                            recent_emails=recent_emails,
-                           hosting_queue=hosting_queue)
+                           hosting_queue=hosting_queue,
+                           job_stats=job_stats,
+                           job_phases=JOB_PHASES)
 
 
 @admin_bp.route('/emails/trigger/<job_name>', methods=['POST'])
@@ -1119,10 +1036,15 @@ def trigger_email_job(job_name):
 
     # Check for dry_run parameter
     dry_run = request.form.get('dry_run', 'false').lower() == 'true'
+    # Resend: also send to recipients who already received this lunch's email
+    resend = request.form.get('resend', 'false').lower() == 'true'
 
-    result = run_email_job(job_name, dry_run=dry_run)
+    result = run_email_job(job_name, dry_run=dry_run, resend=resend)
 
-    if result['success']:
+    if result.get('skipped_count'):
+        flash(f"Job '{job_name}': {result.get('message')}. Those recipients were not emailed again - "
+              f"use Resend to send it to everyone.", 'warning')
+    elif result['success']:
         flash(f"Job '{job_name}' completed: {result.get('message', 'Success')}", 'success')
     else:
         flash(f"Job '{job_name}' failed: {result.get('message', 'Unknown error')}", 'error')
@@ -1133,17 +1055,32 @@ def trigger_email_job(job_name):
 @admin_bp.route('/emails/logs')
 @admin_required
 def email_logs():
-    """View all email logs."""
-    from app.models import EmailLog
+    """View email logs (keyset-paginated, filterable by type, status, lunch and recipient)."""
+    from app.services.email_log_query import (
+        parse_filters, get_email_log_page, count_email_logs, EMAIL_TYPES, EMAIL_STATUSES
+    )
 
-    page = request.args.get('page', 1, type=int)
     per_page = 50
-
-    logs = EmailLog.query.order_by(EmailLog.sent_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    filters = parse_filters(request.args)
+    page = get_email_log_page(
+        filters,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=per_page
     )
+    total = count_email_logs(filters, exact=request.args.get('count') == 'exact')
+
+    recent_lunches = Lunch.query.order_by(Lunch.date.desc()).limit(20).all()
 
-    return render_template('admin/email_logs.html', logs=logs)
+    return render_template('admin/email_logs.html',
+                           logs=page['items'],
+                           next_cursor=page['next_cursor'],
+                           prev_cursor=page['prev_cursor'],
+                           total=total,
+                           filters=filters,
+                           email_types=EMAIL_TYPES,
+                           email_statuses=EMAIL_STATUSES,
+                           recent_lunches=recent_lunches)
 
 
 # ============== SETTINGS ==============
@@ -1160,14 +1097,52 @@ def settings():
     secretary_id = Setting.get('secretary_member_id')
     secretary = Member.query.get(int(secretary_id)) if secretary_id else None
 
+    from app.services.lunch_calendar import get_skip_weeks, get_upcoming_lunch_dates
+
     return render_template('admin/settings.html',
                            members=members,
-                           secretary=secretary)
+                           secretary=secretary,
+                           skip_weeks=get_skip_weeks(),
+                           upcoming_lunch_dates=get_upcoming_lunch_dates(4))
 
 
 # Secretary assignment moved to /admin/members/set-secretary
 
 
+@admin_bp.route('/settings/skip-weeks', methods=['POST'])
+@admin_required
+def add_skip_week():
+    """Mark a Tuesday as having no lunch (holiday, closure...)."""
+    from app.services.lunch_calendar import add_skip_week as skip_lunch_date
+
+    try:
+        lunch_date = date.fromisoformat(request.form.get('date', ''))
+    except ValueError:
+        flash('Please choose a valid date.', 'error')
+        return redirect(url_for('admin.settings'))
+
+    result = skip_lunch_date(lunch_date, request.form.get('reason'))
+    flash(result['message'], 'success' if result['success'] else 'error')
+    return redirect(url_for('admin.settings'))
+
+
+@admin_bp.route('/settings/skip-weeks/<skip_date>/delete', methods=['POST'])
+@admin_required
+def delete_skip_week(skip_date):
+    """Put a skipped Tuesday back on the calendar."""
+    from app.services.lunch_calendar import remove_skip_week
+
+    try:
+        lunch_date = date.fromisoformat(skip_date)
+    except ValueError:
+        flash('Invalid date.', 'error')
+        return redirect(url_for('admin.settings'))
+
+    result = remove_skip_week(lunch_date)
+    flash(result['message'], 'success' if result['success'] else 'error')
+    return redirect(url_for('admin.settings'))
+
+
 # ============== LOCATIONS MANAGEMENT ==============
 
 @admin_bp.route('/locations')
@@ -1175,7 +1150,9 @@ def settings():
 def locations():
     """Location management page."""
     all_locations = Location.query.order_by(Location.name).all()
-    return render_template('admin/locations.html', locations=all_locations)
+    return render_template('admin/locations.html',
+                           locations=all_locations,
+                           location_stats=get_location_stats())
 
 
 @admin_bp.route('/locations/add', methods=['POST'])
@@ -1247,7 +1224,9 @@ def edit_location(location_id):
         flash(f'Updated {location.name}.', 'success')
         return redirect(url_for('admin.locations'))
 
-    return render_template('admin/edit_location.html', location=location)
+    return render_template('admin/edit_location.html',
+                           location=location,
+                           stats=get_location_stats([location.id]).get(location.id))
 
 
 @admin_bp.route('/locations/<int:location_id>/delete', methods=['POST'])
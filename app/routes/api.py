@@ -6,12 +6,18 @@ Includes:
 - Place details lookup
 - Location details with member comments
 - Profile picture upload
+- Brevo webhook (email delivery/open/click events)
 """
 
 from flask import Blueprint, request, jsonify, session, current_app
+from sqlalchemy.orm import joinedload
 from app.services.places_service import places_service
-from app.models import Location, Lunch, Rating, Member
+from app.models import Location, Lunch, Rating
 from app import db
+from app.current_member import get_current_member
+from app.db_routing import read_replica
+from app.http_cache import conditional_get
+from app.services.location_stats import get_location_stats
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -64,19 +70,20 @@ def places_status():
 
 
 @api_bp.route('/locations/<int:location_id>/details')
+@read_replica
+@conditional_get('data', 'location_stats', per_member=False, max_age=60)
 def get_location_details(location_id):
     """
     Get detailed location info including member comments.
 
-    Returns location details, visit history, and member ratings with comments.
+    Returns location details, visit and rating statistics (from location_stats)
+    and the latest member ratings with comments.
     """
     location = Location.query.get_or_404(location_id)
+    stats = get_location_stats([location_id]).get(location_id)
 
-    # Get visit history
-    visits = Lunch.query.filter_by(location_id=location_id).order_by(Lunch.date.desc()).all()
-
-    # Get all ratings with comments for this location
-    ratings_with_comments = Rating.query.join(Lunch).filter(
+    # Latest ratings with comments for this location
+    ratings_with_comments = Rating.query.options(joinedload(Rating.member)).join(Lunch).filter(
         Lunch.location_id == location_id,
         Rating.comment.isnot(None),
         Rating.comment != ''
@@ -91,6 +98,12 @@ def get_location_details(location_id):
             'date': rating.created_at.strftime('%b %d, %Y') if rating.created_at else None
         })
 
+    # Ratings-based average, or the one entered by hand for locations without ratings
+    if stats and stats.rating_count:
+        avg_group_rating = round(stats.avg_rating, 1)
+    else:
+        avg_group_rating = float(location.avg_group_rating) if location.avg_group_rating is not None else None
+
     return jsonify({
         'success': True,
         'location': {
@@ -99,11 +112,15 @@ def get_location_details(location_id):
             'address': location.address,
             'phone': location.phone,
             'google_rating': location.google_rating,
-            'avg_group_rating': location.avg_group_rating,
+            'avg_group_rating': avg_group_rating,
             'price_level': location.price_level,
             'cuisine_type': location.cuisine_type,
-            'visit_count': len(visits),
-            'last_visited': visits[0].date.strftime('%b %d, %Y') if visits else None,
+            'visit_count': stats.visit_count if stats else 0,
+            'last_visited': stats.last_visited.strftime('%b %d, %Y') if stats and stats.last_visited else None,
+            'avg_attendance': round(stats.avg_attendance, 1) if stats and stats.avg_attendance is not None else None,
+            'rating_count': stats.rating_count if stats else 0,
+            'rating_histogram': stats.rating_histogram if stats else {stars: 0 for stars in range(1, 6)},
+            'comment_count': stats.comment_count if stats else 0,
             'comments': comments
         }
     })
@@ -122,7 +139,7 @@ def upload_profile_picture():
     if not member_id:
         return jsonify({'success': False, 'error': 'Not logged in'}), 401
 
-    member = Member.query.get(member_id)
+    member = get_current_member()
     if not member:
         return jsonify({'success': False, 'error': 'Member not found'}), 404
 
@@ -174,3 +191,29 @@ def upload_profile_picture():
         import traceback
         current_app.logger.error(traceback.format_exc())
         return jsonify({'success': False, 'error': f'Upload error: {str(e)}'}), 500
+
+
+@api_bp.route('/webhooks/brevo', methods=['POST'])
+def brevo_webhook():
+    """
+    Receive Brevo transactional email events.
+
+    Only verifies and stages the events (one INSERT); they're applied to
+    email_logs in bulk a few seconds later (see app/services/email_events.py).
+    """
+    from app.services.email_events import (
+        verify_webhook_request, parse_brevo_events, stage_events, schedule_flush
+    )
+
+    if not verify_webhook_request(request):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return jsonify({'success': False, 'error': 'Invalid JSON'}), 400
+
+    staged = stage_events(parse_brevo_events(payload))
+
+    if staged:
+        schedule_flush()
+    return jsonify({'success': True, 'staged': staged})
@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, make_response
 from app import db
 from app.models import Lunch, Location, Member, Rating
+from app.services.location_recommendations import get_recommended_locations
 
 main_bp = Blueprint('main', __name__)
 
@@ -16,8 +17,32 @@ def index():
 
 @main_bp.route('/health')
 def health():
-    """Health check endpoint for Railway."""
-    return {'status': 'healthy', 'app': 'Tuesday Lunch Scheduler'}
+    """Health check endpoint for Railway (includes DB pool stats for monitoring)."""
+    from app.db_config import get_pool_stats
+    return {'status': 'healthy', 'app': 'Tuesday Lunch Scheduler', 'db_pool': get_pool_stats(db.engine)}
+
+
+@main_bp.route('/service-worker.js')
+def service_worker():
+    """
+    PWA service worker, served from the root so its scope covers the whole app.
+
+    The script embeds the asset version, so it changes (and browsers install
+    the new worker and drop the old cache) whenever a shell asset changes.
+    """
+    from app.assets import asset_url
+    manifest = current_app.extensions['asset_manifest']
+    precache_urls = [asset_url(path) for path in manifest['files']]
+
+    response = make_response(render_template(
+        'service_worker.js',
+        asset_version=manifest['version'],
+        precache_urls=precache_urls,
+    ))
+    response.mimetype = 'application/javascript'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Service-Worker-Allowed'] = '/'
+    return response
 
 
 # ============== HOST CONFIRMATION FLOW ==============
@@ -42,15 +67,13 @@ def confirm_host(token):
     # Get the host
     host = Member.query.get(lunch.host_id) if lunch.host_id else None
 
-    # Get recent locations for selection
-    recent_locations = Location.query.filter_by(group_friendly=True).order_by(
-        Location.last_visited.desc()
-    ).limit(10).all()
+    # Best-scoring locations for selection (precomputed in location_scores)
+    recommended_locations = get_recommended_locations()
 
     return render_template('public/confirm_host.html',
                            lunch=lunch,
                            host=host,
-                           recent_locations=recent_locations,
+                           recommended_locations=recommended_locations,
                            token=token)
 
 
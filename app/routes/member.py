@@ -6,11 +6,16 @@ Uses magic link authentication - members receive a login link via email.
 
 from functools import wraps
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
-from datetime import date, datetime, timedelta
-import secrets
+from markupsafe import Markup
+import re
 
 from app import db
+from app.current_member import get_current_member, get_current_member_profile, set_current_member
+from app.db_routing import read_replica
+from app.http_cache import conditional_get
 from app.models import Member, Lunch, Attendance, Location, Rating, Setting, RateLimit
+from app.services.lunch_calendar import get_next_lunch_date, get_upcoming_lunch_dates, estimate_lunch_date
+from app.services.hosting_forecast import get_forecast_token, get_hosting_forecast
 
 # Rate limit settings for magic link emails
 MAGIC_LINK_MAX_REQUESTS = 2  # Maximum requests allowed
@@ -47,19 +52,12 @@ def member_required(f):
     return decorated_function
 
 
-def get_current_member():
-    """Get the currently logged-in member."""
-    member_id = session.get('member_id')
-    if member_id:
-        return Member.query.get(member_id)
-    return None
-
-
 def set_member_session(member):
     """Set session variables for a logged-in member."""
     session['member_id'] = member.id
     session['member_name'] = member.name
     session.permanent = True
+    set_current_member(member)
 
     # Check if this member is the secretary
     secretary_id = Setting.get('secretary_member_id')
@@ -123,18 +121,17 @@ def login():
         # Record this request for rate limiting
         RateLimit.record_request(key=email, action='magic_link')
 
-        # Generate magic link token and store on member
-        token = secrets.token_urlsafe(32)
-        member.magic_link_token = token
-        member.magic_link_expires = datetime.utcnow() + timedelta(minutes=15)
-        db.session.commit()
+        # Generate magic link token (stored on the member unless signed tokens are enabled)
+        from app.services.magic_link import issue_magic_link_token, MAGIC_LINK_MINUTES
+        token = issue_magic_link_token(member)
 
-        # Send magic link email
-        from app.services.email_service import email_service
+        # Queue the magic link email (commits the token with the pending log);
+        # Brevo is called in the background so the response doesn't wait on it
+        from app.services.email_dispatch import dispatch_email
         app_url = current_app.config.get('APP_URL', 'http://localhost:5000')
         magic_link_url = f"{app_url}/member/auth/{token}"
 
-        result = email_service.send_email(
+        result = dispatch_email(
             to_email=member.email,
             to_name=member.name,
             subject="Your Tuesday Lunch Login Link",
@@ -142,17 +139,15 @@ def login():
             params={
                 'MEMBER_NAME': member.name,
                 'MAGIC_LINK_URL': magic_link_url,
-                'EXPIRES_MINUTES': '15',
+                'EXPIRES_MINUTES': str(MAGIC_LINK_MINUTES),
             },
-            email_type='magic_link',
-            dry_run=False
+            email_type='magic_link'
         )
 
-        if result['success']:
-            flash('Check your email! A login link has been sent.', 'success')
+        if result['queued'] or result.get('sent'):
+            flash('Check your email! A login link is on its way.', 'success')
         else:
             flash('If that email is registered, you will receive a login link shortly.', 'success')
-            current_app.logger.error(f"Failed to send magic link to {email}: {result.get('error')}")
 
         return redirect(url_for('main.index'))
 
@@ -163,30 +158,22 @@ def login():
 @member_bp.route('/auth/<token>')
 def authenticate(token):
     """Validate magic link token and log in member."""
-    # Look up member by token
-    member = Member.query.filter_by(magic_link_token=token).first()
+    from app.services.magic_link import verify_magic_link_token
 
-    if not member:
-        flash('This login link is invalid or has expired. Please request a new one.', 'error')
-        return redirect(url_for('member.login'))
+    # Validates and uses up the token (single-use)
+    member, error = verify_magic_link_token(token)
 
-    # Check if token has expired
-    if member.magic_link_expires and datetime.utcnow() > member.magic_link_expires:
-        # Token expired - clean it up
-        member.magic_link_token = None
-        member.magic_link_expires = None
-        db.session.commit()
+    if error == 'expired':
         flash('This login link has expired. Please request a new one.', 'error')
         return redirect(url_for('member.login'))
 
+    if not member:
+        flash('This login link is invalid or has expired. Please request a new one.', 'error')
+        return redirect(url_for('member.login'))
+
     # Success! Log in the member
     set_member_session(member)
 
-    # Clean up used token (single-use)
-    member.magic_link_token = None
-    member.magic_link_expires = None
-    db.session.commit()
-
     flash(f'Welcome back, {member.name}!', 'success')
 
     # Redirect to secretary dashboard if they're the secretary, otherwise member dashboard
@@ -242,13 +229,18 @@ def dev_login():
 
 # ============== MEMBER DASHBOARD ==============
 
-def get_next_tuesday():
-    """Get the next Tuesday date."""
-    today = date.today()
-    days_until_tuesday = (1 - today.weekday()) % 7
-    if days_until_tuesday == 0 and today.weekday() == 1:
-        return today
-    return today + timedelta(days=days_until_tuesday)
+def get_queue_ids():
+    """
+    Get hosting queue member IDs in order, cached per queue version.
+
+    Returns:
+        list of member IDs (index 0 = at bat)
+    """
+    from app.services.email_jobs import get_hosting_queue
+    from app.services.cache_service import get_version, local_cache
+
+    key = ('queue_ids', get_version('queue'))
+    return local_cache.get_or_set(key, lambda: [m.id for m in get_hosting_queue(limit=100)])
 
 
 def calculate_hosting_position(member):
@@ -256,30 +248,21 @@ def calculate_hosting_position(member):
     Calculate member's position in the hosting queue.
     Returns (position, total_in_queue).
     """
-    from app.services.email_jobs import get_hosting_queue
-    queue = get_hosting_queue(limit=100)
+    queue_ids = get_queue_ids()
 
-    for i, m in enumerate(queue):
-        if m.id == member.id:
-            return (i + 1, len(queue))
+    if member.id in queue_ids:
+        return (queue_ids.index(member.id) + 1, len(queue_ids))
 
-    return (None, len(queue))
+    return (None, len(queue_ids))
 
 
 def estimate_hosting_date(member, position):
     """
     Estimate when member will host based on queue position.
-    Assumes weekly lunches on Tuesday.
+    One host per lunch, skipping weeks with no lunch (see lunch_calendar).
+    The simulated range is in get_hosting_forecast().
     """
-    if position is None or position <= 0:
-        return None
-
-    next_tuesday = get_next_tuesday()
-    # Position 1 = this Tuesday (or next Tuesday if already passed today)
-    weeks_until_hosting = position - 1
-    estimated_date = next_tuesday + timedelta(weeks=weeks_until_hosting)
-
-    return estimated_date
+    return estimate_lunch_date(position)
 
 
 def get_baseball_lineup():
@@ -300,8 +283,90 @@ def get_baseball_lineup():
     return lineup
 
 
+def get_lineup_with_dates():
+    """Build the full batting order with estimated hosting dates."""
+    lineup = get_baseball_lineup()
+
+    ordered = [
+        (lineup['at_bat'], 'at_bat'),
+        (lineup['on_deck'], 'on_deck'),
+        (lineup['in_hole'], 'in_hole'),
+    ] + [(m, 'dugout') for m in lineup['dugout']]
+
+    lunch_dates = get_upcoming_lunch_dates(len(ordered))
+    forecast = get_hosting_forecast()['members']
+
+    lineup_with_dates = []
+    for position, (m, status) in enumerate(ordered, start=1):
+        if m is None:
+            continue
+        lineup_with_dates.append({
+            'member': m,
+            'position': position,
+            'status': status,
+            'estimated_date': lunch_dates[position - 1],
+            'forecast': forecast.get(m.id),
+        })
+
+    return lineup_with_dates
+
+
+def get_lineup_html():
+    """
+    Get the rendered batting order rows, cached per worker.
+
+    Keyed on everything the rows show: the queue (members and counters), the
+    calendar and next lunch date (estimated dates) and the hosting forecast
+    this worker has built so far.
+
+    The fragment is member-neutral; use apply_lineup_highlight() to mark
+    the viewing member.
+    """
+    from app.services.cache_service import get_versions, local_cache
+
+    versions = get_versions('queue', 'calendar')
+    key = ('lineup_html', versions['queue'][0], versions['calendar'][0], get_next_lunch_date(),
+           get_forecast_token())
+    return local_cache.get_or_set(key, lambda: render_template(
+        'member/_lineup_rows.html',
+        lineup_with_dates=get_lineup_with_dates()
+    ))
+
+
+# "You are here" markup substituted into the cached lineup fragment
+LINEUP_HIGHLIGHTS = {
+    'ROW': 'bg-blue-50',
+    'NAME': 'text-blue-700',
+    'YOU': '<span class="font-handwriting text-sm text-blue-600 transform -rotate-3">(You)</span>',
+}
+LINEUP_HIGHLIGHT_TOKEN = re.compile(r'__HL_(ROW|NAME|YOU)_(\d+)__')
+
+
+def apply_lineup_highlight(html, member_id):
+    """Fill in the highlight tokens for member_id and strip all others."""
+    def replace(match):
+        if int(match.group(2)) == member_id:
+            return LINEUP_HIGHLIGHTS[match.group(1)]
+        return ''
+    return Markup(LINEUP_HIGHLIGHT_TOKEN.sub(replace, html))
+
+
+def get_scoreboard_html(at_bat_location=None):
+    """Get the rendered dashboard scoreboard (top 3 hosts), cached per queue version."""
+    from app.services.cache_service import get_version, local_cache
+
+    key = ('scoreboard_html', get_version('queue'), at_bat_location)
+    return local_cache.get_or_set(key, lambda: Markup(render_template(
+        'member/_scoreboard_lineup.html',
+        lineup=get_baseball_lineup(),
+        at_bat_location=at_bat_location
+    )))
+
+
 @member_bp.route('/')
 @member_required
+@read_replica
+@conditional_get(etag_parts=(get_forecast_token,))
 def dashboard():
     """Member portal dashboard."""
     member = get_current_member()
@@ -311,25 +376,19 @@ def dashboard():
     # Get hosting position and estimate
     position, total_members = calculate_hosting_position(member)
     estimated_hosting_date = estimate_hosting_date(member, position)
-
-    # Get baseball lineup
-    lineup = get_baseball_lineup()
+    hosting_forecast = get_hosting_forecast()['members'].get(member.id) if position else None
 
     # Determine member's status in the lineup
-    member_status = None
-    if lineup['at_bat'] and lineup['at_bat'].id == member.id:
-        member_status = 'at_bat'
-    elif lineup['on_deck'] and lineup['on_deck'].id == member.id:
-        member_status = 'on_deck'
-    elif lineup['in_hole'] and lineup['in_hole'].id == member.id:
-        member_status = 'in_hole'
-    else:
-        member_status = 'dugout'
+    member_status = {1: 'at_bat', 2: 'on_deck', 3: 'in_hole'}.get(position, 'dugout')
 
     # Get next/upcoming lunch info
-    next_tuesday = get_next_tuesday()
+    next_tuesday = get_next_lunch_date()
     upcoming_lunch = Lunch.query.filter_by(date=next_tuesday).first()
 
+    # Scoreboard lineup (cached fragment)
+    at_bat_location = upcoming_lunch.location.name if upcoming_lunch and upcoming_lunch.location else None
+    scoreboard_html = get_scoreboard_html(at_bat_location)
+
     # Get member's recent attendance history
     recent_attendances = Attendance.query.filter_by(member_id=member.id).join(
         Lunch
@@ -360,7 +419,8 @@ def dashboard():
                            position=position,
                            total_members=total_members,
                            estimated_hosting_date=estimated_hosting_date,
-                           lineup=lineup,
+                           hosting_forecast=hosting_forecast,
+                           scoreboard_html=scoreboard_html,
                            member_status=member_status,
                            upcoming_lunch=upcoming_lunch,
                            next_tuesday=next_tuesday,
@@ -372,63 +432,27 @@ def dashboard():
 
 @member_bp.route('/lineup')
 @member_required
+@read_replica
+@conditional_get(etag_parts=(get_forecast_token,))
 def lineup():
     """Full hosting lineup page."""
-    member = get_current_member()
+    # Only the member's id is needed here, so the cached profile saves a query
+    member = get_current_member_profile()
     if not member:
         return redirect(url_for('member.login'))
 
-    lineup = get_baseball_lineup()
-
-    # Calculate estimated dates for everyone
-    next_tuesday = get_next_tuesday()
-    lineup_with_dates = []
-
-    # At bat
-    if lineup['at_bat']:
-        lineup_with_dates.append({
-            'member': lineup['at_bat'],
-            'position': 1,
-            'status': 'at_bat',
-            'estimated_date': next_tuesday,
-        })
-
-    # On deck
-    if lineup['on_deck']:
-        lineup_with_dates.append({
-            'member': lineup['on_deck'],
-            'position': 2,
-            'status': 'on_deck',
-            'estimated_date': next_tuesday + timedelta(weeks=1),
-        })
-
-    # In the hole
-    if lineup['in_hole']:
-        lineup_with_dates.append({
-            'member': lineup['in_hole'],
-            'position': 3,
-            'status': 'in_hole',
-            'estimated_date': next_tuesday + timedelta(weeks=2),
-        })
-
-    # Dugout
-    for i, m in enumerate(lineup['dugout']):
-        position = 4 + i
-        lineup_with_dates.append({
-            'member': m,
-            'position': position,
-            'status': 'dugout',
-            'estimated_date': next_tuesday + timedelta(weeks=position - 1),
-        })
+    # Rendered rows are cached (see get_lineup_html); only the highlight is per-member
+    lineup_html = apply_lineup_highlight(get_lineup_html(), member['id'])
 
     return render_template('member/lineup.html',
                            member=member,
-                           lineup=lineup,
-                           lineup_with_dates=lineup_with_dates)
+                           lineup_html=lineup_html)
 
 
 @member_bp.route('/history')
 @member_required
+@read_replica
+@conditional_get()
 def history():
     """Member's lunch attendance history."""
     member = get_current_member()
@@ -477,6 +501,8 @@ def my_profile():
 
 @member_bp.route('/profile/<int:member_id>')
 @member_required
+@read_replica
+@conditional_get()
 def view_profile(member_id):
     """View a member's profile."""
     current_member = get_current_member()
@@ -588,7 +614,13 @@ def rate_lunch(lunch_id):
         member_id=member.id
     ).first()
 
+    # Ratings queued offline are replayed by the service worker: answer it with
+    # status codes (2xx saved, 4xx rejected for good - it tells the member)
+    is_replay = request.method == 'POST' and request.headers.get('X-Rating-Replay') == '1'
+
     if not attendance:
+        if is_replay:
+            return '', 403
         flash("You can only rate lunches you attended.", 'error')
         return redirect(url_for('member.dashboard'))
 
@@ -603,6 +635,8 @@ def rate_lunch(lunch_id):
         comment = request.form.get('comment', '').strip() or None
 
         if not rating_value or rating_value < 1 or rating_value > 5:
+            if is_replay:
+                return '', 400
             flash('Please select a rating between 1 and 5 stars.', 'error')
             return render_template('member/rate_lunch.html',
                                    member=member,
@@ -633,6 +667,8 @@ def rate_lunch(lunch_id):
                 location.avg_group_rating = round(avg, 2)
 
         db.session.commit()
+        if is_replay:
+            return '', 204
         flash('Thanks for your rating!', 'success')
         return redirect(url_for('member.dashboard'))
 
@@ -9,9 +9,11 @@ The secretary needs:
 
 from functools import wraps
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from datetime import date, timedelta
+from datetime import date
 from app import db
+from app.current_member import get_current_member
 from app.models import Member, Location, Lunch, Attendance, Setting
+from app.services.lunch_calendar import get_next_lunch_date, get_previous_lunch_date
 
 secretary_bp = Blueprint('secretary', __name__, url_prefix='/secretary')
 
@@ -20,8 +22,10 @@ def secretary_required(f):
     """Decorator to require secretary authentication via member login."""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Must be logged in as a member
-        if not session.get('member_id'):
+        # Must be logged in as a member that still exists and is active - read
+        # per request, not from the TTL-cached profile, since this is authorization
+        member = get_current_member()
+        if not member or member.member_type == 'inactive':
             flash('Please log in to access the secretary portal.', 'error')
             return redirect(url_for('member.login'))
 
@@ -35,61 +39,27 @@ def secretary_required(f):
     return decorated_function
 
 
-def get_next_tuesday():
-    """Get the next Tuesday date (or today if it's Tuesday)."""
-    today = date.today()
-    days_until_tuesday = (1 - today.weekday()) % 7
-    if days_until_tuesday == 0 and today.weekday() == 1:
-        return today
-    return today + timedelta(days=days_until_tuesday)
-
-
 def get_upcoming_host_statuses():
     """Get status of the next 3 hosts (At Bat, On Deck, In the Hole)."""
-    from app.services.email_jobs import get_hosting_queue, get_upcoming_tuesdays
-
-    tuesdays = get_upcoming_tuesdays()
-    queue = get_hosting_queue(limit=3)
-
-    statuses = []
-    tiers = [
-        ('at_bat', 'At Bat', tuesdays['at_bat']),
-        ('on_deck', 'On Deck', tuesdays['on_deck']),
-        ('in_hole', 'In the Hole', tuesdays['in_hole']),
-    ]
-
-    for i, (tier_key, tier_label, lunch_date) in enumerate(tiers):
-        host = queue[i] if i < len(queue) else None
-        lunch = Lunch.query.filter_by(date=lunch_date).first()
-        location = Location.query.get(lunch.location_id) if lunch and lunch.location_id else None
-
-        statuses.append({
-            'tier': tier_key,
-            'tier_label': tier_label,
-            'lunch_date': lunch_date,
-            'host': host,
-            'host_confirmed': lunch.host_confirmed if lunch else False,
-            'location': location,
-            'location_selected': lunch.location_id is not None if lunch else False,
-        })
-
-    return statuses
+    from app.services.lunch_schedule import get_upcoming_host_schedule
+    return get_upcoming_host_schedule(weeks=3)
 
 
 @secretary_bp.route('/')
 @secretary_required
 def dashboard():
     """Secretary dashboard - simple overview with 3-host status tracker."""
-    next_tuesday = get_next_tuesday()
+    next_tuesday = get_next_lunch_date()
 
-    # Get or create this week's lunch
-    lunch = Lunch.query.filter_by(date=next_tuesday).first()
-    location = Location.query.get(lunch.location_id) if lunch and lunch.location_id else None
-    host = Member.query.get(lunch.host_id) if lunch and lunch.host_id else None
+    # This week's and the previous lunch (with location and host) in one query
+    from app.services.lunch_schedule import get_lunches_for_dates
+    last_tuesday = get_previous_lunch_date(next_tuesday)
+    lunches = get_lunches_for_dates([next_tuesday, last_tuesday])
 
-    # Get last week's lunch for reference
-    last_tuesday = next_tuesday - timedelta(days=7)
-    last_lunch = Lunch.query.filter_by(date=last_tuesday).first()
+    lunch = lunches.get(next_tuesday)
+    location = lunch.location if lunch else None
+    host = lunch.host if lunch else None
+    last_lunch = lunches.get(last_tuesday)
 
     # Get 3-host status tracker
     host_statuses = get_upcoming_host_statuses()
@@ -112,7 +82,7 @@ def attendance():
     if lunch_date_str:
         lunch_date = date.fromisoformat(lunch_date_str)
     else:
-        lunch_date = get_next_tuesday()
+        lunch_date = get_next_lunch_date()
 
     # Get or create lunch record
     lunch = Lunch.query.filter_by(date=lunch_date).first()
@@ -160,7 +130,7 @@ def save_attendance():
     - Properly handling host changes
     """
     lunch_date_str = request.form.get('lunch_date')
-    lunch_date = date.fromisoformat(lunch_date_str) if lunch_date_str else get_next_tuesday()
+    lunch_date = date.fromisoformat(lunch_date_str) if lunch_date_str else get_next_lunch_date()
 
     lunch = Lunch.query.filter_by(date=lunch_date).first()
     if not lunch:
@@ -348,7 +318,7 @@ def change_location():
     """
     import secrets
 
-    next_tuesday = get_next_tuesday()
+    next_tuesday = get_next_lunch_date()
 
     # Get or create this week's lunch
     lunch = Lunch.query.filter_by(date=next_tuesday).first()
@@ -0,0 +1,137 @@
+"""
+Read model for the admin dashboard.
+
+get_admin_dashboard() returns everything the dashboard shows in three
+queries, however many lunches are listed:
+
+1. This week's lunch and the 5 most recent ones, with location and host
+   eager-loaded (one joined query)
+2. The top of the hosting queue
+3. Every count and average in one SELECT: member counts by type with
+   COUNT(*) FILTER (WHERE ...), plus scalar subqueries for average
+   attendance, pending ratings and recent email failures
+
+The result is plain dicts (safe to share between requests), cached per
+worker for DASHBOARD_TTL_SECONDS and keyed by the 'data' version stamp, so
+member/lunch/attendance/rating writes show up immediately and email
+failures within the TTL.
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import Member, Lunch, Rating, EmailLog
+
+DASHBOARD_TTL_SECONDS = 30
+
+RECENT_LUNCHES = 5
+QUEUE_PREVIEW = 5
+
+# Windows for the dashboard metrics
+ATTENDANCE_WEEKS = 12      # Average attendance over completed lunches in this window
+PENDING_RATING_DAYS = 28   # Rating requests still unanswered for lunches in this window
+EMAIL_FAILURE_DAYS = 7     # Failed/bounced emails in this window
+
+EMAIL_FAILURE_STATUSES = ('failed', 'bounced')
+
+
+def _lunch_dict(lunch):
+    if lunch is None:
+        return None
+    return {
+        'id': lunch.id,
+        'date': lunch.date,
+        'status': lunch.status,
+        'actual_attendance': lunch.actual_attendance,
+        'location': {'id': lunch.location.id, 'name': lunch.location.name} if lunch.location else None,
+        'host': {'id': lunch.host.id, 'name': lunch.host.name} if lunch.host else None,
+    }
+
+
+def _load_lunches(lunch_date: date) -> tuple:
+    """This week's lunch and the recent lunches, in one query."""
+    recent_ids = select(Lunch.id).order_by(Lunch.date.desc(), Lunch.id.desc()).limit(RECENT_LUNCHES)
+    lunches = Lunch.query.options(
+        joinedload(Lunch.location), joinedload(Lunch.host)
+    ).filter(
+        or_(Lunch.date == lunch_date, Lunch.id.in_(recent_ids.scalar_subquery()))
+    ).order_by(Lunch.date.desc(), Lunch.id.desc()).all()
+
+    # This week's lunch is either one of the recent ones or sorts after all of them
+    current = next((lunch for lunch in reversed(lunches) if lunch.date == lunch_date), None)
+    return current, lunches[:RECENT_LUNCHES]
+
+
+def _load_stats() -> dict:
+    """All dashboard counts and averages in one SELECT."""
+    today = date.today()
+    now = datetime.utcnow()
+
+    avg_attendance = select(func.avg(Lunch.actual_attendance)).where(
+        Lunch.status == 'completed',
+        Lunch.actual_attendance.isnot(None),
+        Lunch.date >= today - timedelta(weeks=ATTENDANCE_WEEKS),
+    ).scalar_subquery()
+
+    pending_ratings = select(func.count(Rating.id)).join(Lunch, Rating.lunch_id == Lunch.id).where(
+        Rating.rating.is_(None),
+        Lunch.date >= today - timedelta(days=PENDING_RATING_DAYS),
+    ).scalar_subquery()
+
+    email_failures = select(func.count(EmailLog.id)).where(
+        EmailLog.status.in_(EMAIL_FAILURE_STATUSES),
+        EmailLog.sent_at >= now - timedelta(days=EMAIL_FAILURE_DAYS),
+    ).scalar_subquery()
+
+    row = db.session.execute(
+        select(
+            func.count().filter(Member.member_type == 'regular').label('total_members'),
+            func.count().filter(Member.member_type == 'guest').label('total_guests'),
+            func.count().filter(Member.member_type == 'inactive').label('total_inactive'),
+            avg_attendance.label('avg_attendance'),
+            pending_ratings.label('pending_ratings'),
+            email_failures.label('email_failures'),
+        ).select_from(Member)
+    ).one()
+
+    stats = row._asdict()
+    stats['avg_attendance'] = round(float(stats['avg_attendance']), 1) if stats['avg_attendance'] is not None else None
+    return stats
+
+
+def _build_dashboard(lunch_date: date) -> dict:
+    from app.services.email_jobs import get_hosting_queue
+
+    current_lunch, recent_lunches = _load_lunches(lunch_date)
+    hosting_queue = [
+        {'id': member.id, 'name': member.name, 'attendance_since_hosting': member.attendance_since_hosting}
+        for member in get_hosting_queue(limit=QUEUE_PREVIEW)
+    ]
+    return {
+        'current_lunch': _lunch_dict(current_lunch),
+        'recent_lunches': [_lunch_dict(lunch) for lunch in recent_lunches],
+        'hosting_queue': hosting_queue,
+        'stats': _load_stats(),
+    }
+
+
+def get_admin_dashboard(lunch_date: date) -> dict:
+    """
+    Everything on the admin dashboard, cached briefly.
+
+    Args:
+        lunch_date: This week's lunch date (see lunch_calendar.get_next_lunch_date)
+
+    Returns:
+        dict with 'current_lunch' (dict or None), 'recent_lunches', 'hosting_queue'
+        (lists of dicts) and 'stats' (total_members, total_guests, total_inactive,
+        avg_attendance, pending_ratings, email_failures)
+    """
+    from app.services.cache_service import get_version, local_cache
+
+    key = ('admin_dashboard', lunch_date, get_version('data'), int(time.time() // DASHBOARD_TTL_SECONDS))
+    return local_cache.get_or_set(key, lambda: _build_dashboard(lunch_date))
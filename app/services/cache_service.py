@@ -0,0 +1,280 @@
+"""
+Version stamps for cache invalidation.
+
+A version stamp is a counter stored in the settings table (key 'version:<name>')
+that is bumped in the same transaction as any write it covers. Readers compare
+stamps instead of re-querying the underlying rows, which makes it cheap to
+decide whether a cached page, fragment or ETag is still valid.
+
+Stamps:
+- 'data': any change to members, lunches, locations, attendance, ratings or photos
+- 'queue': changes to the hosting queue (attendance saves, reorders, member counters)
+- 'calendar': skip weeks added or removed (see app/services/lunch_calendar.py)
+- 'locations': changes to locations, lunches or ratings (see app/services/location_stats.py)
+
+Bumping is automatic: a session listener inspects each flush (and ORM bulk
+insert(Model)/update()/delete() statements) and bumps the matching stamps, so routes never
+have to remember to invalidate anything. The stamps bumped in a transaction
+are kept in session.info until it commits, then passed to any callbacks
+registered with on_commit() (e.g. to schedule a background refresh).
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy import text
+
+from app import db
+from app.db_routing import RoutingSession
+from app.models import Member, Lunch, Location, Attendance, Rating, Photo, PhotoTag, Setting, SkipWeek
+
+VERSION_KEY_PREFIX = 'version:'
+
+# Models whose changes bump the 'data' stamp (skip weeks move "next lunch" dates)
+DATA_MODELS = (Member, Lunch, Location, Attendance, Rating, Photo, PhotoTag, SkipWeek)
+
+# Columns that change on login/housekeeping and don't affect any rendered page
+IGNORED_ATTRIBUTES = {
+    Member: {'magic_link_token', 'magic_link_expires', 'updated_at'},
+}
+
+# Member columns that determine (or are displayed in) the hosting lineup
+QUEUE_MEMBER_COLUMNS = {
+    'name', 'member_type', 'attendance_since_hosting', 'total_hosting_count', 'queue_position',
+}
+
+# Models whose inserts/deletes/bulk updates always bump the 'queue' stamp
+# (skip weeks shift the lineup's estimated hosting dates)
+QUEUE_MODELS = (Member, Attendance, SkipWeek)
+
+# Models whose changes bump the 'calendar' stamp
+CALENDAR_MODELS = (SkipWeek,)
+
+# Models whose changes bump the 'locations' stamp (location statistics and scores)
+LOCATION_MODELS = (Location, Lunch, Rating)
+
+
+def _version_key(name: str) -> str:
+    return f'{VERSION_KEY_PREFIX}{name}'
+
+
+def get_versions(*names) -> dict:
+    """
+    Get several version stamps in one query.
+
+    Returns:
+        dict of name -> (version: int, updated_at: datetime or None)
+    """
+    keys = [_version_key(name) for name in names]
+    rows = Setting.query.filter(Setting.key.in_(keys)).all()
+    found = {row.key: row for row in rows}
+
+    versions = {}
+    for name, key in zip(names, keys):
+        row = found.get(key)
+        if row and row.value and row.value.isdigit():
+            versions[name] = (int(row.value), row.updated_at)
+        else:
+            versions[name] = (0, None)
+    return versions
+
+
+def get_version(name: str) -> int:
+    """Get a single version stamp (0 if it has never been bumped)."""
+    return get_versions(name)[name][0]
+
+
+def bump_version(name: str, connection=None):
+    """
+    Increment a version stamp.
+
+    Pass the current transaction's connection so the bump commits (or rolls
+    back) together with the write it describes.
+    """
+    if connection is None:
+        connection = db.session.connection()
+        _record_committed_stamps(db.session, [name])
+    key = _version_key(name)
+    now = datetime.utcnow()
+
+    updated = connection.execute(
+        text(
+            "UPDATE settings SET value = CAST(CAST(value AS INTEGER) + 1 AS VARCHAR(500)), "
+            "updated_at = :now WHERE key = :key"
+        ),
+        {'key': key, 'now': now}
+    )
+    if updated.rowcount == 0:
+        connection.execute(
+            text("INSERT INTO settings (key, value, updated_at) VALUES (:key, '1', :now)"),
+            {'key': key, 'now': now}
+        )
+
+
+def set_version(name: str, value: int, connection=None):
+    """
+    Store a value under a version stamp's key, e.g. the stamp a derived
+    table was last rebuilt from (compare it with the source stamp later).
+    """
+    connection = connection or db.session.connection()
+    key = _version_key(name)
+    now = datetime.utcnow()
+
+    updated = connection.execute(
+        text("UPDATE settings SET value = :value, updated_at = :now WHERE key = :key"),
+        {'key': key, 'value': str(value), 'now': now}
+    )
+    if updated.rowcount == 0:
+        connection.execute(
+            text("INSERT INTO settings (key, value, updated_at) VALUES (:key, :value, :now)"),
+            {'key': key, 'value': str(value), 'now': now}
+        )
+
+
+def _changed_columns(obj) -> set:
+    """Get the column keys of a dirty object that actually changed (minus ignored ones)."""
+    ignored = IGNORED_ATTRIBUTES.get(type(obj), set())
+    state = sa.inspect(obj)
+    return {
+        attr.key for attr in state.mapper.column_attrs
+        if attr.key not in ignored and state.attrs[attr.key].history.has_changes()
+    }
+
+
+def get_stamps_for_flush(session) -> set:
+    """Work out which stamps a pending flush affects."""
+    stamps = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, DATA_MODELS):
+            stamps.add('data')
+        if isinstance(obj, QUEUE_MODELS):
+            stamps.add('queue')
+        if isinstance(obj, CALENDAR_MODELS):
+            stamps.add('calendar')
+        if isinstance(obj, LOCATION_MODELS):
+            stamps.add('locations')
+    for obj in session.dirty:
+        if not isinstance(obj, DATA_MODELS):
+            continue
+        changed = _changed_columns(obj)
+        if changed:
+            stamps.add('data')
+        if isinstance(obj, CALENDAR_MODELS) and changed:
+            stamps.add('calendar')
+        if isinstance(obj, LOCATION_MODELS) and changed:
+            stamps.add('locations')
+        if isinstance(obj, Attendance) and changed:
+            stamps.add('queue')
+        if isinstance(obj, Member) and changed & QUEUE_MEMBER_COLUMNS:
+            stamps.add('queue')
+    return stamps
+
+
+def get_stamps_for_bulk(mapper_class) -> set:
+    """Work out which stamps an ORM bulk insert/update/delete on mapper_class affects."""
+    stamps = set()
+    if mapper_class is not None and issubclass(mapper_class, DATA_MODELS):
+        stamps.add('data')
+    if mapper_class is not None and issubclass(mapper_class, QUEUE_MODELS):
+        stamps.add('queue')
+    if mapper_class is not None and issubclass(mapper_class, CALENDAR_MODELS):
+        stamps.add('calendar')
+    if mapper_class is not None and issubclass(mapper_class, LOCATION_MODELS):
+        stamps.add('locations')
+    return stamps
+
+
+# stamp name -> callbacks run after a commit that bumped it
+_commit_callbacks = {}
+
+
+def on_commit(name: str, callback):
+    """
+    Call callback() after every commit that bumped the named stamp.
+
+    It runs once the transaction is over, so it must not use the session -
+    hand real work to a background thread.
+    """
+    _commit_callbacks.setdefault(name, []).append(callback)
+
+
+def _record_committed_stamps(session, stamps):
+    session.info.setdefault('committed_stamps', set()).update(stamps)
+
+
+@sa.event.listens_for(RoutingSession, 'before_flush')
+def _collect_flush_stamps(session, flush_context, instances):
+    # Attribute history is only available before the flush, so collect here
+    session.info.setdefault('pending_stamps', set()).update(get_stamps_for_flush(session))
+
+
+@sa.event.listens_for(RoutingSession, 'after_flush')
+def _bump_flush_stamps(session, flush_context):
+    stamps = session.info.pop('pending_stamps', set())
+    for name in sorted(stamps):
+        bump_version(name, session.connection())
+    _record_committed_stamps(session, stamps)
+
+
+@sa.event.listens_for(RoutingSession, 'do_orm_execute')
+def _bump_bulk_stamps(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    stamps = get_stamps_for_bulk(mapper.class_ if mapper is not None else None)
+    for name in sorted(stamps):
+        bump_version(name, orm_execute_state.session.connection())
+    _record_committed_stamps(orm_execute_state.session, stamps)
+
+
+@sa.event.listens_for(RoutingSession, 'after_soft_rollback')
+def _forget_committed_stamps(session, previous_transaction):
+    # The bumps were rolled back with everything else
+    session.info.pop('committed_stamps', None)
+
+
+@sa.event.listens_for(RoutingSession, 'after_commit')
+def _run_commit_callbacks(session):
+    for name in sorted(session.info.pop('committed_stamps', set())):
+        for callback in _commit_callbacks.get(name, ()):
+            callback()
+
+
+class LocalCache:
+    """
+    Small thread-safe LRU cache, local to each worker process.
+
+    Keys should embed the version stamp(s) they depend on, so invalidation is
+    just a stamp bump - stale entries are never read again and age out.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key, factory):
+        """Return the cached value for key, computing it with factory() on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        value = factory()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Global instance (rendered fragments and other stamp-keyed values)
+local_cache = LocalCache()
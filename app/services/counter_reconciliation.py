@@ -0,0 +1,180 @@
+"""
+Rebuild member hosting counters from lunch history.
+
+Member.attendance_since_hosting, total_hosting_count and last_hosted_date
+are updated incrementally whenever attendance is saved, so an edit that
+goes wrong (or a history import, which doesn't touch them) can leave them
+out of step with the attendance table. reconcile_counters() recomputes all
+three for every member in one query over attendance joined to completed
+lunches:
+
+- last_hosted_date: the latest lunch the member attended as host
+  (MAX(...) OVER (PARTITION BY member_id))
+- total_hosting_count: lunches attended as host
+- attendance_since_hosting: lunches attended, not as host, after that date
+  (all of them if they've never hosted)
+
+The results are diffed against the stored values and, with apply=True, the
+differences are written back in one executemany UPDATE.
+
+Members with no attendance rows at all are left alone - their counters came
+from the member CSV import, not from history.
+"""
+
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import bindparam, case, func, select, update
+
+from app import db
+from app.models import Member, Lunch, Attendance
+
+COUNTERS = ('attendance_since_hosting', 'total_hosting_count', 'last_hosted_date')
+
+
+def _history_counters():
+    """One SELECT: recomputed counters next to the stored ones, per member with history."""
+    attendance = Attendance.__table__
+    lunches = Lunch.__table__
+    members = Member.__table__
+
+    history = (
+        select(
+            attendance.c.member_id,
+            attendance.c.was_host,
+            lunches.c.date,
+            func.max(case((attendance.c.was_host, lunches.c.date))).over(
+                partition_by=attendance.c.member_id
+            ).label('last_hosted'),
+        )
+        .join(lunches, attendance.c.lunch_id == lunches.c.id)
+        .where(lunches.c.status == 'completed')
+        .subquery('history')
+    )
+
+    since_hosting = case(
+        (history.c.was_host, 0),
+        (history.c.last_hosted.is_(None), 1),
+        (history.c.date > history.c.last_hosted, 1),
+        else_=0,
+    )
+    counters = (
+        select(
+            history.c.member_id,
+            func.sum(since_hosting).label('attendance_since_hosting'),
+            func.sum(case((history.c.was_host, 1), else_=0)).label('total_hosting_count'),
+            func.max(history.c.last_hosted).label('last_hosted_date'),
+        )
+        .group_by(history.c.member_id)
+        .subquery('counters')
+    )
+
+    return db.session.execute(
+        select(
+            members.c.id,
+            members.c.name,
+            members.c.attendance_since_hosting,
+            members.c.total_hosting_count,
+            members.c.last_hosted_date,
+            counters.c.attendance_since_hosting.label('expected_since_hosting'),
+            counters.c.total_hosting_count.label('expected_hosting_count'),
+            counters.c.last_hosted_date.label('expected_last_hosted'),
+        )
+        .join(counters, counters.c.member_id == members.c.id)
+        .order_by(members.c.name)
+    ).all()
+
+
+def _as_date(value):
+    # last_hosted_date is a DateTime column; the counters work in lunch dates
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        # SQLite hands back MAX() over a DATE column as text
+        return datetime.fromisoformat(value).date()
+    return value
+
+
+def reconcile_counters(apply: bool = False) -> dict:
+    """
+    Compare member counters with the attendance history, optionally fixing them.
+
+    Args:
+        apply: Write the recomputed values for every member that differs
+
+    Returns:
+        dict with 'success', 'checked' (members with history), 'applied',
+        'drift' (list of {'member_id', 'name', 'changes': {counter: (stored, expected)}})
+        and 'message'
+    """
+    try:
+        rows = _history_counters()
+    except Exception as e:
+        current_app.logger.error(f"Counter reconciliation failed: {e}")
+        return {'success': False, 'checked': 0, 'applied': False, 'drift': [],
+                'message': f'Error reading attendance history: {e}'}
+
+    drift = []
+    updates = []
+    for row in rows:
+        expected = {
+            'attendance_since_hosting': int(row.expected_since_hosting or 0),
+            'total_hosting_count': int(row.expected_hosting_count or 0),
+            'last_hosted_date': _as_date(row.expected_last_hosted),
+        }
+        stored = {
+            'attendance_since_hosting': row.attendance_since_hosting or 0,
+            'total_hosting_count': row.total_hosting_count or 0,
+            'last_hosted_date': _as_date(row.last_hosted_date),
+        }
+        changes = {
+            counter: (stored[counter], expected[counter])
+            for counter in COUNTERS if stored[counter] != expected[counter]
+        }
+        if not changes:
+            continue
+        drift.append({'member_id': row.id, 'name': row.name, 'changes': changes})
+        last_hosted = expected['last_hosted_date']
+        updates.append({
+            'b_id': row.id,
+            'b_since_hosting': expected['attendance_since_hosting'],
+            'b_hosting_count': expected['total_hosting_count'],
+            'b_last_hosted': datetime.combine(last_hosted, datetime.min.time()) if last_hosted else None,
+        })
+
+    result = {'success': True, 'checked': len(rows), 'applied': False, 'drift': drift}
+    if not rows:
+        result['message'] = 'No attendance history to reconcile'
+        return result
+    if not drift:
+        result['message'] = f'All {len(rows)} members with attendance history have correct counters'
+        return result
+    if not apply:
+        result['message'] = f'{len(drift)} of {len(rows)} members have drifted counters (dry run, nothing changed)'
+        return result
+
+    from app.services.cache_service import bump_version
+
+    members = Member.__table__
+    try:
+        db.session.execute(
+            update(members).where(members.c.id == bindparam('b_id')).values(
+                attendance_since_hosting=bindparam('b_since_hosting'),
+                total_hosting_count=bindparam('b_hosting_count'),
+                last_hosted_date=bindparam('b_last_hosted'),
+                updated_at=datetime.utcnow(),
+            ),
+            updates
+        )
+        # Core UPDATEs aren't seen by the flush listener; bumped in the same transaction
+        bump_version('data')
+        bump_version('queue')
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Counter reconciliation update failed: {e}")
+        result.update(success=False, message=f'Error updating counters: {e}')
+        return result
+
+    result.update(applied=True, message=f'Fixed counters for {len(drift)} of {len(rows)} members')
+    return result
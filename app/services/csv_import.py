@@ -0,0 +1,436 @@
+"""
+Streaming CSV import for members and lunch history.
+
+Uploads are decoded incrementally (IMPORT_READ_BYTES at a time) and parsed
+row by row, so memory stays flat however large the file is. Rows are
+validated and applied in batches of IMPORT_BATCH_SIZE, each committed on its
+own:
+
+- Members: one SELECT for which emails already exist (for the added/updated
+  counts), then one INSERT ... ON CONFLICT (email) DO UPDATE per batch
+- History (one row per member per lunch): one SELECT for the members, one
+  for the lunches, one bulk INSERT for missing lunches, one
+  INSERT ... ON CONFLICT (lunch_id, member_id) DO UPDATE for attendance and
+  one executemany UPDATE for hosts/locations per batch; actual_attendance is
+  recounted for the touched lunches at the end
+
+Importing history doesn't recalculate member counters (attendance since
+hosting etc.) - those come from the member CSV, or run
+`flask reconcile-counters --apply` to rebuild them from the history.
+
+Both importers take an optional progress(stats) callback, called after every
+batch with the running totals.
+"""
+
+import codecs
+import csv
+import os
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import bindparam, func, select, tuple_, update
+
+from app import db
+from app.models import Member, Lunch, Location, Attendance
+
+DEFAULT_BATCH_SIZE = 500
+IMPORT_READ_BYTES = 64 * 1024
+
+# Errors kept for the report (all of them are counted)
+MAX_REPORTED_ERRORS = 100
+
+MEMBER_COLUMNS = ['name', 'email', 'member_type', 'attendance_since_hosting',
+                  'last_hosted_date', 'total_hosting_count', 'first_attended']
+
+MEMBER_TYPES = ('regular', 'guest', 'inactive')
+TRUE_VALUES = ('1', 'y', 'yes', 'true', 'x', 'host')
+
+
+class RowError(ValueError):
+    """A row that failed validation (reported, then skipped)."""
+
+
+def get_batch_size() -> int:
+    """Rows per batch (IMPORT_BATCH_SIZE, default 500)."""
+    try:
+        return max(1, int(os.environ.get('IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)))
+    except ValueError:
+        return DEFAULT_BATCH_SIZE
+
+
+def _dialect_insert():
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+# ============== READING ==============
+
+def iter_csv_lines(stream, chunk_size: int = IMPORT_READ_BYTES):
+    """
+    Decode a binary upload incrementally into lines for csv.reader.
+
+    Handles a UTF-8 BOM and multi-byte characters split across chunks.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        pending += decoder.decode(chunk or b'', final=not chunk)
+        # Only split on \n: the last piece may be incomplete until the next chunk
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            yield line + '\n'
+        if not chunk:
+            if pending:
+                yield pending
+            return
+
+
+def _iter_batches(reader, parse_row, batch_size: int, stats: dict):
+    """Validate rows with parse_row(row) and yield them in lists of batch_size."""
+    batch = []
+    for row in reader:
+        if not any(isinstance(value, str) and value.strip() for value in row.values()):
+            continue  # Blank line (or only commas)
+        stats['rows'] += 1
+        try:
+            batch.append(parse_row(row))
+        except RowError as e:
+            _add_error(stats, f"Row {reader.line_num}: {e}")
+            continue
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _add_error(stats: dict, message: str):
+    stats['error_count'] += 1
+    if len(stats['errors']) < MAX_REPORTED_ERRORS:
+        stats['errors'].append(message)
+
+
+def _parse_date(value: str, column: str, as_datetime: bool = False):
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise RowError(f"Invalid {column} format (use YYYY-MM-DD)")
+    return parsed if as_datetime else parsed.date()
+
+
+def _parse_int(value: str, column: str) -> int:
+    try:
+        return int((value or '').strip() or 0)
+    except ValueError:
+        raise RowError(f"Invalid {column} (must be a whole number)")
+
+
+def _open_reader(stream, required: set, stats: dict):
+    """DictReader over the stream, or None (with an error) if required columns are missing."""
+    reader = csv.DictReader(iter_csv_lines(stream))
+    header = {(name or '').strip() for name in (reader.fieldnames or [])}
+    missing = required - header
+    if missing:
+        stats['message'] = f"Missing column{'s' if len(missing) > 1 else ''}: {', '.join(sorted(missing))}"
+        return None
+    reader.fieldnames = [(name or '').strip() for name in reader.fieldnames]
+    return reader
+
+
+def _new_stats() -> dict:
+    return {
+        'success': False,
+        'rows': 0,
+        'batches': 0,
+        'added': 0,
+        'updated': 0,
+        'error_count': 0,
+        'errors': [],
+        'message': None,
+    }
+
+
+def _bump_stamps(*names):
+    # Core INSERT/UPDATE statements aren't seen by the flush listener
+    from app.services.cache_service import bump_version
+    for name in names:
+        bump_version(name)
+
+
+# ============== MEMBERS ==============
+
+def _parse_member_row(row: dict) -> dict:
+    email = (row.get('email') or '').strip().lower()
+    if not email:
+        raise RowError("Missing email")
+    name = (row.get('name') or '').strip()
+    if not name:
+        raise RowError("Missing name")
+
+    member_type = (row.get('member_type') or '').strip() or 'regular'
+    if member_type not in MEMBER_TYPES:
+        member_type = 'regular'
+
+    return {
+        'name': name,
+        'email': email,
+        'member_type': member_type,
+        'attendance_since_hosting': _parse_int(row.get('attendance_since_hosting'), 'attendance_since_hosting'),
+        'total_hosting_count': _parse_int(row.get('total_hosting_count'), 'total_hosting_count'),
+        'last_hosted_date': _parse_date(row.get('last_hosted_date'), 'last_hosted_date', as_datetime=True),
+        'first_attended': _parse_date(row.get('first_attended'), 'first_attended'),
+    }
+
+
+def _upsert_members(rows: list) -> tuple:
+    """Insert or update one batch of members. Returns (added, updated)."""
+    # The same email twice in one statement is an error on PostgreSQL - last row wins
+    by_email = {row['email']: row for row in rows}
+    existing = set(db.session.scalars(
+        select(Member.email).where(Member.email.in_(list(by_email)))
+    ))
+
+    now = datetime.utcnow()
+    values = [dict(row, created_at=now, updated_at=now) for row in by_email.values()]
+
+    insert = _dialect_insert()
+    statement = insert(Member.__table__).values(values)
+    updated_columns = [column for column in MEMBER_COLUMNS if column != 'email'] + ['updated_at']
+    statement = statement.on_conflict_do_update(
+        index_elements=[Member.__table__.c.email],
+        set_={column: statement.excluded[column] for column in updated_columns},
+    )
+    db.session.execute(statement)
+    return len(by_email) - len(existing), len(existing)
+
+
+def import_members_csv(stream, batch_size: int = None, progress=None) -> dict:
+    """
+    Import members from a CSV upload, matched on email.
+
+    Args:
+        stream: Binary file-like object (e.g. request.files['csv_file'].stream)
+        batch_size: Rows per INSERT (default: get_batch_size())
+        progress: Optional callback(stats) after each committed batch
+
+    Returns:
+        dict with 'success', 'rows', 'batches', 'added', 'updated',
+        'error_count', 'errors' (first MAX_REPORTED_ERRORS) and 'message'
+    """
+    stats = _new_stats()
+    reader = _open_reader(stream, {'name', 'email'}, stats)
+    if reader is None:
+        return stats
+
+    try:
+        for batch in _iter_batches(reader, _parse_member_row, batch_size or get_batch_size(), stats):
+            added, updated = _upsert_members(batch)
+            _bump_stamps('data', 'queue')
+            db.session.commit()
+
+            stats['added'] += added
+            stats['updated'] += updated
+            stats['batches'] += 1
+            if progress:
+                progress(stats)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Member import failed after {stats['batches']} batches: {e}")
+        stats['message'] = (f"Import stopped at row {reader.line_num}: {e} "
+                            f"({stats['added']} added, {stats['updated']} updated before that)")
+        return stats
+
+    stats['success'] = True
+    stats['message'] = f"Import complete: {stats['added']} added, {stats['updated']} updated"
+    if stats['error_count']:
+        stats['message'] += f", {stats['error_count']} errors"
+    return stats
+
+
+# ============== HISTORY ==============
+
+def _parse_history_row(row: dict) -> dict:
+    lunch_date = _parse_date(row.get('date'), 'date')
+    if not lunch_date:
+        raise RowError("Missing date")
+    email = (row.get('email') or '').strip().lower()
+    if not email:
+        raise RowError("Missing email")
+
+    return {
+        'date': lunch_date,
+        'email': email,
+        'was_host': (row.get('was_host') or '').strip().lower() in TRUE_VALUES,
+        'location': (row.get('location') or '').strip(),
+    }
+
+
+def _import_history_batch(rows: list, location_ids: dict, stats: dict) -> set:
+    """
+    Apply one batch of attendance rows.
+
+    Returns:
+        set of the lunch ids touched
+    """
+    emails = {row['email'] for row in rows}
+    member_ids = dict(db.session.execute(
+        select(Member.email, Member.id).where(Member.email.in_(list(emails)))
+    ).all())
+
+    valid = []
+    for row in rows:
+        if row['email'] not in member_ids:
+            _add_error(stats, f"{row['date']}: unknown member {row['email']} (import members first)")
+        elif row['location'] and row['location'].lower() not in location_ids:
+            _add_error(stats, f"{row['date']}: unknown location {row['location']}")
+        else:
+            valid.append(row)
+    if not valid:
+        return set()
+
+    # Lunches: existing ones by date (oldest row wins), missing ones in one INSERT
+    dates = {row['date'] for row in valid}
+    lunch_ids = {}
+    for lunch_id, lunch_date in db.session.execute(
+        select(Lunch.id, Lunch.date).where(Lunch.date.in_(list(dates))).order_by(Lunch.id)
+    ):
+        lunch_ids.setdefault(lunch_date, lunch_id)
+
+    missing = sorted(dates - set(lunch_ids))
+    if missing:
+        now = datetime.utcnow()
+        insert = _dialect_insert()
+        created = db.session.execute(
+            insert(Lunch.__table__).values([
+                {'date': lunch_date, 'status': 'completed', 'created_at': now, 'updated_at': now}
+                for lunch_date in missing
+            ]).returning(Lunch.__table__.c.id, Lunch.__table__.c.date)
+        ).all()
+        lunch_ids.update({lunch_date: lunch_id for lunch_id, lunch_date in created})
+
+    # Attendance: one row per member per lunch, re-imports just update was_host
+    attendance = {}
+    for row in valid:
+        key = (lunch_ids[row['date']], member_ids[row['email']])
+        attendance[key] = attendance.get(key, False) or row['was_host']
+
+    existing = db.session.execute(
+        select(func.count()).select_from(Attendance).where(
+            tuple_(Attendance.lunch_id, Attendance.member_id).in_(list(attendance))
+        )
+    ).scalar()
+
+    insert = _dialect_insert()
+    statement = insert(Attendance.__table__).values([
+        {'lunch_id': lunch_id, 'member_id': member_id, 'was_host': was_host, 'created_at': datetime.utcnow()}
+        for (lunch_id, member_id), was_host in attendance.items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[Attendance.__table__.c.lunch_id, Attendance.__table__.c.member_id],
+        set_={'was_host': statement.excluded.was_host},
+    )
+    db.session.execute(statement)
+    stats['added'] += len(attendance) - existing
+    stats['updated'] += existing
+
+    # Hosts and locations, one executemany UPDATE
+    lunch_updates = {}
+    for row in valid:
+        lunch_id = lunch_ids[row['date']]
+        entry = lunch_updates.setdefault(lunch_id, {'b_id': lunch_id, 'b_host_id': None, 'b_location_id': None})
+        if row['was_host']:
+            entry['b_host_id'] = member_ids[row['email']]
+        if row['location']:
+            entry['b_location_id'] = location_ids[row['location'].lower()]
+
+    lunches = Lunch.__table__
+    db.session.execute(
+        update(lunches).where(lunches.c.id == bindparam('b_id')).values(
+            host_id=func.coalesce(bindparam('b_host_id'), lunches.c.host_id),
+            location_id=func.coalesce(bindparam('b_location_id'), lunches.c.location_id),
+            updated_at=datetime.utcnow(),
+        ),
+        list(lunch_updates.values())
+    )
+    return set(lunch_ids.values())
+
+
+def _recount_attendance(lunch_ids: set):
+    """Set actual_attendance from the attendance rows (one UPDATE per 500 lunches)."""
+    lunches = Lunch.__table__
+    attendance_count = (
+        select(func.count()).select_from(Attendance.__table__)
+        .where(Attendance.__table__.c.lunch_id == lunches.c.id)
+        .scalar_subquery()
+    )
+    ids = sorted(lunch_ids)
+    for start in range(0, len(ids), DEFAULT_BATCH_SIZE):
+        db.session.execute(
+            update(lunches)
+            .where(lunches.c.id.in_(ids[start:start + DEFAULT_BATCH_SIZE]))
+            .values(actual_attendance=attendance_count)
+        )
+
+
+def import_history_csv(stream, batch_size: int = None, progress=None) -> dict:
+    """
+    Import past lunches and attendance, one CSV row per member per lunch.
+
+    Columns: date (YYYY-MM-DD), email, was_host (yes/1/true, optional),
+    location (an existing location's name, optional). Lunches are created
+    as 'completed' when there's none on that date; members must already exist.
+
+    Args:
+        stream: Binary file-like object
+        batch_size: Rows per batch (default: get_batch_size())
+        progress: Optional callback(stats) after each committed batch
+
+    Returns:
+        dict like import_members_csv(), where 'added'/'updated' count attendance
+        rows, plus 'lunches' (number of lunches touched)
+    """
+    stats = _new_stats()
+    stats['lunches'] = 0
+    reader = _open_reader(stream, {'date', 'email'}, stats)
+    if reader is None:
+        return stats
+
+    location_ids = {name.lower(): location_id for location_id, name in
+                    db.session.execute(select(Location.id, Location.name))}
+    touched = set()
+
+    try:
+        for batch in _iter_batches(reader, _parse_history_row, batch_size or get_batch_size(), stats):
+            touched |= _import_history_batch(batch, location_ids, stats)
+            _bump_stamps('data', 'queue', 'locations')
+            db.session.commit()
+
+            stats['lunches'] = len(touched)
+            stats['batches'] += 1
+            if progress:
+                progress(stats)
+
+        if touched:
+            _recount_attendance(touched)
+            _bump_stamps('data', 'locations')
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"History import failed after {stats['batches']} batches: {e}")
+        stats['message'] = (f"Import stopped at row {reader.line_num}: {e} "
+                            f"({stats['added']} attendance rows added before that)")
+        return stats
+
+    stats['success'] = True
+    stats['message'] = (f"History import complete: {stats['lunches']} lunches, "
+                        f"{stats['added']} attendance rows added, {stats['updated']} updated")
+    if stats['error_count']:
+        stats['message'] += f", {stats['error_count']} errors"
+    return stats
@@ -0,0 +1,297 @@
+"""
+Streaming data exports (CSV, or Parquet with pyarrow).
+
+Rows are read with a server-side cursor (yield_per) and written to a
+generator-backed Response a chunk at a time, so memory stays flat however
+big the table is. Every export supports column selection and a date range
+on the table's main date column.
+
+Presets are saved export settings - e.g. 'member_template', the CSV the
+member import (csv_import.py) reads back in.
+
+Token columns (magic links, rating and confirmation links) are never
+exported. Internal bookkeeping tables (settings, rate limits, staged email
+events, send keys, used magic links) have no export.
+"""
+
+import csv
+import io
+from datetime import date, datetime, timedelta
+
+import sqlalchemy as sa
+from sqlalchemy import select
+
+from app import db
+from app.models import (Member, Location, Lunch, Attendance, Rating, Photo, PhotoTag,
+                        EmailLog, JobRun, SkipWeek)
+
+YIELD_PER = 1000
+
+# Rows written to the response per CSV chunk / Parquet row group
+CHUNK_ROWS = 1000
+
+FORMATS = ('csv', 'parquet')
+
+# Never exported (they log people in or answer links on their behalf)
+SECRET_COLUMNS = {'magic_link_token', 'magic_link_expires', 'rating_token', 'confirmation_token'}
+
+# name -> (model, date column used by the date range filter)
+EXPORTS = {
+    'members': (Member, 'created_at'),
+    'locations': (Location, 'last_visited'),
+    'lunches': (Lunch, 'date'),
+    'attendance': (Attendance, 'created_at'),
+    'ratings': (Rating, 'created_at'),
+    'photos': (Photo, 'created_at'),
+    'photo_tags': (PhotoTag, 'created_at'),
+    'email_logs': (EmailLog, 'sent_at'),
+    'job_runs': (JobRun, 'started_at'),
+    'skip_weeks': (SkipWeek, 'date'),
+}
+
+PRESETS = {
+    'member_template': {
+        'export': 'members',
+        'columns': ['name', 'email', 'member_type', 'attendance_since_hosting',
+                    'last_hosted_date', 'total_hosting_count', 'first_attended'],
+        'order_by': 'name',
+        'filename': 'members_template.csv',
+        'dates_only': True,  # The importer reads YYYY-MM-DD
+        # Written when there are no members yet, as an example for data entry
+        'example_row': ['John Doe', 'john@example.com', 'regular', '3', '2024-11-15', '5', '2020-01-01'],
+    },
+}
+
+
+class ExportError(ValueError):
+    """Bad export request (unknown table, column, format or date)."""
+
+
+def get_export_columns(name: str) -> list:
+    """Columns that can be exported from an export table, in table order."""
+    model, _ = EXPORTS[name]
+    return [column.name for column in model.__table__.columns if column.name not in SECRET_COLUMNS]
+
+
+def _parse_date(value, label: str):
+    if not value or isinstance(value, date):
+        return value or None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"Invalid {label} date (use YYYY-MM-DD)")
+
+
+def build_export_query(name: str, columns: list = None, date_from=None, date_to=None, order_by: str = None):
+    """
+    Build the SELECT for an export.
+
+    Args:
+        name: Key of EXPORTS
+        columns: Column names (default: all exportable columns)
+        date_from / date_to: Inclusive date range (date or YYYY-MM-DD) on the table's date column
+        order_by: Column to sort by (default: primary key)
+
+    Returns:
+        tuple: (select statement, list of column names)
+
+    Raises:
+        ExportError: Unknown table, column or bad date
+    """
+    if name not in EXPORTS:
+        raise ExportError(f"Unknown export: {name}")
+    model, date_column = EXPORTS[name]
+    table = model.__table__
+
+    available = get_export_columns(name)
+    columns = [column for column in (columns or available) if column]
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise ExportError(f"Unknown column{'s' if len(unknown) > 1 else ''} for {name}: {', '.join(unknown)}")
+
+    statement = select(*[table.c[column] for column in columns])
+
+    date_from = _parse_date(date_from, 'from')
+    date_to = _parse_date(date_to, 'to')
+    filter_column = table.c[date_column]
+    if date_from:
+        statement = statement.where(filter_column >= date_from)
+    if date_to:
+        # Inclusive for both DATE and DATETIME columns
+        statement = statement.where(filter_column < date_to + timedelta(days=1))
+
+    sort = [table.c[order_by]] if order_by else []
+    statement = statement.order_by(*sort, *table.primary_key.columns)
+    return statement, columns
+
+
+def iter_export_rows(statement):
+    """Stream the rows of an export query (server-side cursor on PostgreSQL)."""
+    result = db.session.execute(statement.execution_options(yield_per=YIELD_PER))
+    for row in result:
+        yield row
+
+
+# ============== CSV ==============
+
+def _csv_value(value, dates_only: bool):
+    if value is None:
+        return ''
+    if dates_only and isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(columns: list, rows, dates_only: bool = False, example_row: list = None):
+    """Encode rows as CSV, yielding one string chunk per CHUNK_ROWS rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_value(value, dates_only) for value in row])
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if count == 0 and example_row:
+        writer.writerow(example_row)
+    yield buffer.getvalue()
+
+
+# ============== PARQUET ==============
+
+def parquet_available() -> bool:
+    """Whether pyarrow is installed (Parquet exports are optional)."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _arrow_type(column):
+    import pyarrow as pa
+
+    column_type = column.type
+    if isinstance(column_type, sa.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, sa.Integer):
+        return pa.int64()
+    if isinstance(column_type, sa.Numeric) and not isinstance(column_type, sa.Float):
+        return pa.decimal128(column_type.precision or 18, column_type.scale or 0)
+    if isinstance(column_type, sa.Float):
+        return pa.float64()
+    if isinstance(column_type, sa.DateTime):
+        return pa.timestamp('us')
+    if isinstance(column_type, sa.Date):
+        return pa.date32()
+    return pa.string()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes to the response as chunks."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def iter_parquet(name: str, columns: list, rows):
+    """Encode rows as Parquet, one row group (and response chunk) per CHUNK_ROWS rows."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = EXPORTS[name][0].__table__
+    schema = pa.schema([(column, _arrow_type(table.c[column])) for column in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+
+    def write_batch(batch):
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    batch = []
+    for row in rows:
+        batch.append(tuple(row))
+        if len(batch) >= CHUNK_ROWS:
+            write_batch(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write_batch(batch)
+    writer.close()
+    yield sink.drain()
+
+
+# ============== EXPORT ==============
+
+def prepare_export(name: str = None, preset: str = None, columns: list = None,
+                   date_from=None, date_to=None, file_format: str = 'csv') -> dict:
+    """
+    Validate an export request and set up its row stream.
+
+    Nothing is read until the returned 'chunks' generator is iterated, so
+    errors are raised here, before a response has started.
+
+    Args:
+        name: Key of EXPORTS (or use preset)
+        preset: Key of PRESETS; its settings are used for anything not passed
+        columns: Column names (default: all, or the preset's)
+        date_from / date_to: Inclusive date range on the table's date column
+        file_format: 'csv' or 'parquet' (requires pyarrow)
+
+    Returns:
+        dict with 'chunks' (generator of str/bytes), 'mimetype' and 'filename'
+
+    Raises:
+        ExportError: Invalid request
+    """
+    settings = {}
+    if preset:
+        if preset not in PRESETS:
+            raise ExportError(f"Unknown export preset: {preset}")
+        settings = PRESETS[preset]
+        name = settings['export']
+    if file_format not in FORMATS:
+        raise ExportError(f"Unknown format: {file_format}")
+    if file_format == 'parquet' and not parquet_available():
+        raise ExportError('Parquet exports require pyarrow (pip install pyarrow)')
+
+    statement, columns = build_export_query(
+        name, columns or settings.get('columns'), date_from, date_to, settings.get('order_by')
+    )
+    rows = iter_export_rows(statement)
+
+    stem = f"{name}_{date.today().isoformat()}"
+    if file_format == 'parquet':
+        return {
+            'chunks': iter_parquet(name, columns, rows),
+            'mimetype': 'application/vnd.apache.parquet',
+            'filename': f'{stem}.parquet',
+        }
+    return {
+        'chunks': iter_csv(columns, rows, settings.get('dates_only', False), settings.get('example_row')),
+        'mimetype': 'text/csv',
+        'filename': settings.get('filename', f'{stem}.csv'),
+    }
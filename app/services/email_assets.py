@@ -0,0 +1,219 @@
+"""
+Email image assets: optimization, R2 publishing and per-email byte budget.
+
+The images referenced by the email templates live in app/static/emails/. Served
+from there, every recipient's mail client downloads multi-megabyte originals
+from our Flask workers. `flask publish-email-assets` instead:
+- Resizes each image to 2x its displayed size and recompresses it
+  (JPEG/PNG only - Outlook and older clients can't show WebP)
+- Uploads it once to R2 under a content-hashed key (email-assets/<name>.<hash>.<ext>)
+  with immutable cache headers; unchanged images are skipped
+- Records the key and byte size in settings ('email_asset:<PARAM>')
+
+EmailService._get_image_urls() then points emails at the R2 copies, falling
+back to the /static/emails/ originals until they have been published. The
+lookup is cached per worker for EMAIL_ASSET_CACHE_SECONDS, so a bulk send
+reads the settings once rather than once per recipient (publishing runs in
+the release step, before new workers start).
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+
+from flask import current_app
+
+EMAIL_ASSET_FOLDER = 'email-assets'
+SETTING_PREFIX = 'email_asset:'
+
+# Template param -> source file in app/static/emails and the widest it is displayed (px)
+EMAIL_IMAGES = {
+    'AI_GUY_LOGO_URL': ('Ai_guy_transparent.png', 50),
+    'HEADER_IMAGE_URL': ('announcment_header.jpg', 600),
+    'LOCATION_BG_IMAGE_URL': ('announcment_Location_backgound.jpg', 552),
+    'INTEL_BG_IMAGE_URL': ('announcement_intel_report_background.jpg', 552),
+}
+
+# Total bytes (HTML + each distinct image) one email may make a client download
+DEFAULT_EMAIL_BYTE_BUDGET = 400_000
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# How long a worker reuses the resolved image URLs and sizes
+EMAIL_ASSET_CACHE_SECONDS = 300
+
+
+def _source_path(filename: str) -> str:
+    return os.path.join(current_app.static_folder, 'emails', filename)
+
+
+def optimize_email_image(path: str, display_width: int) -> tuple:
+    """
+    Resize an image to 2x its display width (for retina) and recompress it.
+
+    Returns:
+        (image bytes, content type)
+    """
+    from PIL import Image
+
+    with Image.open(path) as image:
+        max_width = display_width * 2
+        if image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image.save(buffer, 'PNG', optimize=True)
+            content_type = 'image/png'
+        else:
+            image.convert('RGB').save(buffer, 'JPEG', quality=75, optimize=True, progressive=True)
+            content_type = 'image/jpeg'
+    return buffer.getvalue(), content_type
+
+
+def publish_email_assets() -> dict:
+    """
+    Optimize the email images and upload any that changed to R2.
+
+    Returns:
+        dict with 'success', 'message' and 'assets' (param -> {'key', 'bytes', 'uploaded'})
+    """
+    from app.models import Setting
+    from app.services.storage_service import storage_service
+
+    client = storage_service.s3_client
+    if not client:
+        return {'success': False, 'message': 'R2 storage is not configured', 'assets': {}}
+
+    assets = {}
+    for param, (filename, display_width) in EMAIL_IMAGES.items():
+        data, content_type = optimize_email_image(_source_path(filename), display_width)
+        stem = os.path.splitext(filename)[0]
+        ext = '.png' if content_type == 'image/png' else '.jpg'
+        key = f"{EMAIL_ASSET_FOLDER}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+        current = get_published_assets().get(param)
+        uploaded = not (current and current['key'] == key)
+        if uploaded:
+            client.put_object(
+                Bucket=storage_service.bucket_name,
+                Key=key,
+                Body=data,
+                ContentType=content_type,
+                CacheControl=IMMUTABLE_CACHE_CONTROL,
+            )
+            Setting.set(f'{SETTING_PREFIX}{param}', json.dumps({'key': key, 'bytes': len(data)}))
+
+        assets[param] = {'key': key, 'bytes': len(data), 'uploaded': uploaded}
+
+    from app.services.cache_service import local_cache
+    local_cache.clear()
+    return {'success': True, 'message': f'{len(assets)} email assets published', 'assets': assets}
+
+
+def get_published_assets() -> dict:
+    """
+    Get the published email assets from settings.
+
+    Returns:
+        dict of param -> {'key', 'bytes'}
+    """
+    from app.models import Setting
+
+    rows = Setting.query.filter(Setting.key.like(f'{SETTING_PREFIX}%')).all()
+    published = {}
+    for row in rows:
+        try:
+            published[row.key[len(SETTING_PREFIX):]] = json.loads(row.value)
+        except (TypeError, ValueError):
+            continue
+    return published
+
+
+def get_email_image_assets() -> dict:
+    """
+    Get the URL and byte size of each email image.
+
+    Uses the R2 copy when published (and R2_PUBLIC_DOMAIN is set), otherwise
+    the original under APP_URL/static/emails/. Cached per worker for
+    EMAIL_ASSET_CACHE_SECONDS.
+
+    Returns:
+        dict of param -> {'url', 'bytes'}
+    """
+    from app.services.cache_service import local_cache
+
+    bucket = int(time.time() // EMAIL_ASSET_CACHE_SECONDS)
+    return local_cache.get_or_set(('email_image_assets', bucket), _resolve_email_image_assets)
+
+
+def _resolve_email_image_assets() -> dict:
+    app_url = os.environ.get('APP_URL', 'http://localhost:5000')
+    public_domain = os.environ.get('R2_PUBLIC_DOMAIN')
+    published = get_published_assets() if public_domain else {}
+
+    assets = {}
+    for param, (filename, _) in EMAIL_IMAGES.items():
+        if param in published:
+            assets[param] = {
+                'url': f"{public_domain.rstrip('/')}/{published[param]['key']}",
+                'bytes': published[param]['bytes'],
+            }
+        else:
+            path = _source_path(filename)
+            assets[param] = {
+                'url': f"{app_url}/static/emails/{filename}",
+                'bytes': os.path.getsize(path) if os.path.exists(path) else 0,
+            }
+    return assets
+
+
+def get_email_byte_budget() -> int:
+    """Per-email byte budget (EMAIL_BYTE_BUDGET env var, 0 disables the check)."""
+    try:
+        return int(os.environ.get('EMAIL_BYTE_BUDGET', DEFAULT_EMAIL_BYTE_BUDGET))
+    except ValueError:
+        return DEFAULT_EMAIL_BYTE_BUDGET
+
+
+def check_email_budget(html_content: str, image_assets: dict) -> dict:
+    """
+    Measure what a rendered email costs to open against the byte budget.
+
+    Each image counts once if its URL appears in the HTML.
+
+    Returns:
+        dict with 'bytes', 'budget' and 'within_budget'
+    """
+    total = len(html_content.encode('utf-8'))
+    for asset in image_assets.values():
+        if asset['url'] in html_content:
+            total += asset['bytes']
+
+    budget = get_email_byte_budget()
+    return {'bytes': total, 'budget': budget, 'within_budget': not budget or total <= budget}
+
+
+def warn_over_budget(template_file: str, budget: dict, image_assets: dict):
+    """
+    Log that an email is over the byte budget, once per template and asset set per worker.
+
+    Every send of an over-budget template is over it until the assets are
+    published, so warning on each one would flood the logs; publishing
+    changes the asset URLs, which warns again if it's still over.
+    """
+    from app.services.cache_service import local_cache
+
+    asset_set = tuple(sorted(asset['url'] for asset in image_assets.values()))
+
+    def warn():
+        current_app.logger.warning(
+            f"Email '{template_file}' is {budget['bytes']} bytes, over the "
+            f"{budget['budget']} byte budget - run `flask publish-email-assets`"
+        )
+        return True
+
+    local_cache.get_or_set(('email_budget_warning', template_file, asset_set), warn)
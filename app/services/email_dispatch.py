@@ -0,0 +1,172 @@
+"""
+Background email dispatch for latency-sensitive sends (magic links).
+
+The request only inserts a 'pending' email_logs row and hands the send to a
+small per-worker thread pool, so a slow or unavailable Brevo never holds up
+the response or ties up gunicorn threads.
+
+- Bounded: at most EMAIL_DISPATCH_WORKERS sends run at once, and at most
+  EMAIL_DISPATCH_MAX_PENDING are queued or running; beyond that the log row is
+  marked failed straight away instead of queueing without limit
+- If the pool can't take the send (e.g. it was shut down), it is sent
+  synchronously instead, once, so the committed token still gets its email
+- Each Brevo call times out after BREVO_TIMEOUT_SECONDS (email_service.py)
+- Only failures where Brevo can't have accepted the email (429, connection
+  refused/DNS/connect timeout) are retried, up to MAX_ATTEMPTS times with
+  exponential backoff. A read timeout or 5xx may have been sent already, so
+  it is not retried - a duplicate login email is worse than asking again
+
+The outcome is observable afterwards on the email_logs row (pending ->
+sent/failed, with the error and attempt count) in /admin/emails/logs.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app import db
+from app.models import EmailLog
+
+MAX_ATTEMPTS = 3
+BACKOFF_SECONDS = 2  # 2s, then 4s
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Create the pool lazily, so it is per worker process (after gunicorn forks)."""
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _slots = threading.BoundedSemaphore(_env_int('EMAIL_DISPATCH_MAX_PENDING', 50))
+            _executor = ThreadPoolExecutor(
+                max_workers=_env_int('EMAIL_DISPATCH_WORKERS', 2),
+                thread_name_prefix='email-dispatch'
+            )
+    return _executor
+
+
+def dispatch_email(
+    to_email: str,
+    to_name: str,
+    subject: str,
+    template_file: str,
+    params: dict,
+    email_type: str,
+    lunch_id: int = None
+) -> dict:
+    """
+    Queue an email for sending in the background.
+
+    Adds a 'pending' email log and commits the session (along with anything
+    else the caller has pending), then returns without waiting for Brevo.
+
+    Returns:
+        dict with 'queued' (bool), 'email_log_id' and, when it was sent
+        synchronously instead, 'sent' (bool)
+    """
+    email_log = EmailLog(
+        email_type=email_type,
+        recipient_email=to_email,
+        recipient_name=to_name,
+        subject=subject,
+        lunch_id=lunch_id,
+        status='pending'
+    )
+    db.session.add(email_log)
+    db.session.commit()
+
+    executor = _get_executor()
+    if not _slots.acquire(blocking=False):
+        email_log.status = 'failed'
+        email_log.error_message = 'Dispatch queue full - email not sent'
+        db.session.commit()
+        current_app.logger.error(f"Email dispatch queue full, dropped {email_type} to {to_email}")
+        return {'queued': False, 'email_log_id': email_log.id}
+
+    app = current_app._get_current_object()
+    send_kwargs = {
+        'to_email': to_email,
+        'to_name': to_name,
+        'subject': subject,
+        'template_file': template_file,
+        'params': dict(params),
+        'email_type': email_type,
+        'lunch_id': lunch_id,
+        'email_log_id': email_log.id,
+    }
+    try:
+        executor.submit(_send_with_retry, app, send_kwargs)
+    except Exception as e:
+        # Pool shut down (interpreter exiting) or can't start a thread
+        _slots.release()
+        current_app.logger.error(f"Email dispatch unavailable ({e}), sending {email_type} to {to_email} now")
+        return {'queued': False, 'email_log_id': email_log.id, 'sent': _send_now(send_kwargs)}
+
+    return {'queued': True, 'email_log_id': email_log.id}
+
+
+def _send_now(send_kwargs: dict) -> bool:
+    """Send once in the request, for when the pool can't take it. Returns whether it was sent."""
+    from app.services.email_service import email_service
+
+    try:
+        return email_service.send_email(**send_kwargs)['success']
+    except Exception as e:
+        db.session.rollback()
+        _update_log(send_kwargs['email_log_id'], 'failed', f"Send failed: {e}")
+        current_app.logger.error(f"{send_kwargs['email_type']} to {send_kwargs['to_email']} failed: {e}")
+        return False
+
+
+def _send_with_retry(app, send_kwargs: dict):
+    """Worker: send in an app context, retrying transient failures."""
+    from app.services.email_service import email_service
+
+    try:
+        with app.app_context():
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                try:
+                    result = email_service.send_email(**send_kwargs)
+                except Exception as e:
+                    db.session.rollback()
+                    # Can't tell whether it got as far as Brevo
+                    result = {'success': False, 'error': str(e), 'retryable': False}
+
+                if result['success'] or not result.get('retryable') or attempt == MAX_ATTEMPTS:
+                    break
+
+                # Keep the row visibly pending between attempts
+                _update_log(send_kwargs['email_log_id'], 'pending',
+                            f"Attempt {attempt} failed, retrying: {result['error']}")
+                time.sleep(BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+            if not result['success']:
+                _update_log(send_kwargs['email_log_id'], 'failed',
+                            f"Failed after {attempt} attempt{'s' if attempt != 1 else ''}: {result['error']}")
+                current_app.logger.error(
+                    f"Background {send_kwargs['email_type']} to {send_kwargs['to_email']} failed: {result['error']}"
+                )
+    finally:
+        _slots.release()
+
+
+def _update_log(email_log_id: int, status: str, error_message: str):
+    email_log = db.session.get(EmailLog, email_log_id)
+    if email_log:
+        email_log.status = status
+        email_log.error_message = error_message
+        db.session.commit()
@@ -0,0 +1,284 @@
+"""
+Brevo webhook event ingestion.
+
+A single announcement produces an event storm (delivered/opened/click for every
+recipient), so the webhook does as little as possible:
+1. Verify the shared secret
+2. Append the relevant events to the email_events staging table (one INSERT)
+
+Applying them is done in bulk by apply_staged_events(): events are collapsed
+to the furthest status per message and written with one
+UPDATE ... FROM (VALUES ...) per batch, matched on email_logs.brevo_message_id.
+Staging schedules it BREVO_EVENT_FLUSH_SECONDS later on a per-worker timer,
+so a burst of webhooks costs one flush and the last events of a burst don't
+wait for another webhook. The maintenance job also flushes (events left by a
+worker that exited before its timer fired), and `flask flush-email-events`
+runs it on demand.
+
+Statuses only move forward (sent -> delivered -> opened -> clicked -> bounced),
+so out-of-order or duplicate events are harmless.
+"""
+
+import hmac
+import json
+import os
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, insert, text
+
+from app import db
+from app.models import EmailEvent
+
+# Brevo event name -> EmailLog status (other events are ignored)
+EVENT_STATUS = {
+    'delivered': 'delivered',
+    'opened': 'opened',
+    'unique_opened': 'opened',
+    'proxy_open': 'opened',
+    'unique_proxy_open': 'opened',
+    'click': 'clicked',
+    'hard_bounce': 'bounced',
+    'blocked': 'bounced',
+    'invalid_email': 'bounced',
+    'error': 'bounced',
+}
+
+# Statuses can only advance; anything not listed (failed, dry_run) is never touched
+STATUS_RANK = {
+    'pending': 0,
+    'sent': 1,
+    'delivered': 2,
+    'opened': 3,
+    'clicked': 4,
+    'bounced': 5,
+}
+
+UPDATE_BATCH_SIZE = 500
+
+
+def _flush_interval() -> float:
+    try:
+        return max(0.0, float(os.environ.get('BREVO_EVENT_FLUSH_SECONDS', 10)))
+    except ValueError:
+        return 10.0
+
+
+# ============== WEBHOOK ==============
+
+def verify_webhook_request(request) -> bool:
+    """
+    Check the shared secret on a webhook request.
+
+    Brevo is configured to send BREVO_WEBHOOK_SECRET either as an
+    'Authorization: Bearer <secret>' header or a '?token=<secret>' query param.
+    Requests are always rejected if the secret isn't configured.
+    """
+    secret = os.environ.get('BREVO_WEBHOOK_SECRET')
+    if not secret:
+        return False
+
+    supplied = request.args.get('token', '')
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        supplied = auth_header[len('Bearer '):]
+
+    return hmac.compare_digest(supplied.encode('utf-8'), secret.encode('utf-8'))
+
+
+def _parse_event_time(event: dict):
+    if event.get('ts_event'):
+        try:
+            return datetime.utcfromtimestamp(int(event['ts_event']))
+        except (TypeError, ValueError, OverflowError):
+            pass
+    if event.get('date'):
+        try:
+            return datetime.strptime(event['date'][:19], '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            pass
+    return None
+
+
+def parse_brevo_events(payload) -> list:
+    """
+    Turn a Brevo webhook payload (one event or a list) into staging rows.
+
+    Returns:
+        List of dicts with 'brevo_message_id', 'event' and 'occurred_at',
+        skipping events we don't track
+    """
+    events = payload if isinstance(payload, list) else [payload]
+    rows = []
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        name = event.get('event')
+        message_id = event.get('message-id') or event.get('message_id')
+        if name not in EVENT_STATUS or not message_id:
+            continue
+        rows.append({
+            'brevo_message_id': str(message_id)[:100],
+            'event': name,
+            'occurred_at': _parse_event_time(event),
+            'received_at': datetime.utcnow(),
+        })
+    return rows
+
+
+def stage_events(rows: list) -> int:
+    """Append events to the staging table in a single INSERT. Returns the number staged."""
+    if not rows:
+        return 0
+    db.session.execute(insert(EmailEvent), rows)
+    db.session.commit()
+    return len(rows)
+
+
+# ============== FLUSHER ==============
+
+def _bulk_update_statuses(statuses: dict) -> int:
+    """
+    Apply message_id -> status with UPDATE ... FROM (VALUES ...) batches.
+
+    VALUES columns are referenced as column1..3, which both PostgreSQL and
+    SQLite (3.33+) name them by default.
+    """
+    rank_case = ' '.join(f"WHEN '{status}' THEN {rank}" for status, rank in STATUS_RANK.items())
+    updated = 0
+    items = list(statuses.items())
+
+    for start in range(0, len(items), UPDATE_BATCH_SIZE):
+        batch = items[start:start + UPDATE_BATCH_SIZE]
+        params = {'now': datetime.utcnow()}
+        values = []
+        for i, (message_id, status) in enumerate(batch):
+            values.append(f'(:m{i}, :s{i}, :r{i})')
+            params[f'm{i}'] = message_id
+            params[f's{i}'] = status
+            params[f'r{i}'] = STATUS_RANK[status]
+
+        result = db.session.execute(text(
+            f"UPDATE email_logs SET status = v.column2, updated_at = :now "
+            f"FROM (VALUES {', '.join(values)}) AS v "
+            f"WHERE email_logs.brevo_message_id = v.column1 "
+            f"AND (CASE email_logs.status {rank_case} ELSE 99 END) < v.column3"
+        ), params)
+        updated += result.rowcount
+
+    return updated
+
+
+def apply_staged_events(limit: int = 5000) -> dict:
+    """
+    Apply staged webhook events to email_logs and delete them.
+
+    Args:
+        limit: Max events to read per pass (loops until the table is drained)
+
+    Returns:
+        dict with 'success', 'message', 'events' and 'updated' keys
+    """
+    total_events = 0
+    total_updated = 0
+
+    while True:
+        rows = db.session.execute(text(
+            "SELECT id, brevo_message_id, event FROM email_events ORDER BY id LIMIT :limit"
+        ), {'limit': limit}).all()
+        if not rows:
+            break
+
+        # Collapse to the furthest status per message
+        statuses = {}
+        for _, message_id, event in rows:
+            status = EVENT_STATUS.get(event)
+            if status and STATUS_RANK[status] > STATUS_RANK.get(statuses.get(message_id), -1):
+                statuses[message_id] = status
+
+        total_updated += _bulk_update_statuses(statuses)
+        # Only the rows read above: a lower id committed since then is applied next pass
+        db.session.execute(
+            delete(EmailEvent.__table__).where(EmailEvent.__table__.c.id.in_([row[0] for row in rows]))
+        )
+        db.session.commit()
+        total_events += len(rows)
+
+        if len(rows) < limit:
+            break
+
+    return {
+        'success': True,
+        'message': f'Applied {total_events} events ({total_updated} email logs updated)',
+        'events': total_events,
+        'updated': total_updated,
+    }
+
+
+_flush_timer = None
+_flush_lock = threading.Lock()
+
+
+def _run_scheduled_flush(app):
+    global _flush_timer
+    with _flush_lock:
+        # Events staged from here on schedule another flush
+        _flush_timer = None
+    with app.app_context():
+        try:
+            apply_staged_events()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error applying Brevo events: {e}")
+        finally:
+            db.session.remove()
+
+
+def schedule_flush() -> bool:
+    """
+    Apply staged events after BREVO_EVENT_FLUSH_SECONDS, unless a flush is already pending.
+
+    Returns:
+        True if a flush was scheduled, False if one was already pending
+    """
+    global _flush_timer
+    app = current_app._get_current_object()
+    with _flush_lock:
+        if _flush_timer is not None:
+            return False
+        _flush_timer = threading.Timer(_flush_interval(), _run_scheduled_flush, args=(app,))
+        _flush_timer.daemon = True
+        _flush_timer.start()
+    return True
+
+
+# ============== REPLAY ==============
+
+def load_event_file(path: str) -> list:
+    """Load Brevo events from a JSON file (object or list) or JSON Lines file."""
+    with open(path, encoding='utf-8') as f:
+        content = f.read().strip()
+    if not content:
+        return []
+    if content[0] in '[{':
+        try:
+            payload = json.loads(content)
+            return payload if isinstance(payload, list) else [payload]
+        except ValueError:
+            pass  # JSON Lines starting with '{'
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def replay_event_file(path: str) -> dict:
+    """
+    Stage and apply the events in a fixture/export file, as if Brevo had sent them.
+
+    Returns:
+        dict with 'success', 'message', 'staged', 'events' and 'updated' keys
+    """
+    staged = stage_events(parse_brevo_events(load_event_file(path)))
+    result = apply_staged_events()
+    result['staged'] = staged
+    result['message'] = f"Staged {staged} events from {os.path.basename(path)}. {result['message']}"
+    return result
@@ -0,0 +1,100 @@
+"""
+Idempotency keys for email sends.
+
+Each lunch email has a deterministic key - "<email_type>:<lunch_id>:<recipient>"
+(the host reminder tier is part of the email type). Before sending,
+EmailService claims the key with a single
+
+    INSERT ... ON CONFLICT (key) DO UPDATE ... WHERE <retryable> RETURNING key
+
+so the duplicate check and the claim are one atomic round-trip: when two
+workers run the same job, exactly one gets the row back and sends.
+
+A key can be claimed again only if its last send failed, or if a claim was
+left behind (worker crashed mid-send) for longer than CLAIM_TIMEOUT_MINUTES.
+
+To send a lunch email again on purpose (e.g. a corrected announcement), the
+job is run with resend=True: its keys get a ":resend-<attempt>" suffix from
+new_resend_attempt(), so everyone is sent the email once more - and re-running
+that same attempt still doesn't double-send.
+"""
+
+import secrets
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+from app import db
+from app.models import EmailSendKey
+
+CLAIM_TIMEOUT_MINUTES = 15
+
+
+def make_idempotency_key(email_type: str, lunch_id: int, recipient_email: str, attempt: str = None) -> str:
+    """
+    Deterministic key for one lunch email to one recipient.
+
+    Args:
+        attempt: Resend attempt id (new_resend_attempt()) to scope the key to a deliberate resend
+    """
+    key = f'{email_type}:{lunch_id}:{recipient_email.strip().lower()}'
+    return f'{key}:resend-{attempt}' if attempt else key
+
+
+def new_resend_attempt() -> str:
+    """Id for one deliberate resend of a lunch email."""
+    return f"{datetime.utcnow():%Y%m%d%H%M%S}-{secrets.token_hex(3)}"
+
+
+def _dialect_insert():
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def claim_send(key: str) -> bool:
+    """
+    Atomically claim an idempotency key.
+
+    Commits immediately so other workers see the claim before we send.
+
+    Returns:
+        True if this caller owns the send, False if it was already sent or is in progress
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(minutes=CLAIM_TIMEOUT_MINUTES)
+    table = EmailSendKey.__table__
+
+    insert = _dialect_insert()
+    statement = insert(table).values(key=key, status='claimed', claimed_at=now)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.key],
+        set_={'status': 'claimed', 'claimed_at': now, 'email_log_id': None},
+        where=or_(
+            table.c.status == 'failed',
+            and_(table.c.status == 'claimed', table.c.claimed_at < stale_before),
+        ),
+    ).returning(table.c.key)
+
+    claimed = db.session.execute(statement).scalar() is not None
+    db.session.commit()
+    return claimed
+
+
+def finish_send(key: str, success: bool, email_log_id: int = None):
+    """Record the outcome of a claimed send (failed keys can be claimed again)."""
+    db.session.execute(
+        EmailSendKey.__table__.update()
+        .where(EmailSendKey.__table__.c.key == key)
+        .values(status='sent' if success else 'failed', email_log_id=email_log_id)
+    )
+    db.session.commit()
+
+
+def was_sent(key: str) -> bool:
+    """Read-only check used by dry runs, which never claim keys."""
+    return db.session.query(
+        EmailSendKey.query.filter_by(key=key, status='sent').exists()
+    ).scalar()
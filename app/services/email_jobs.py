@@ -8,7 +8,13 @@ Jobs:
 4. Tuesday 6pm - Rating request (conditional)
 
 Each job can be triggered manually from the admin dashboard or
-run automatically via cron.
+run automatically via cron (`flask run-email-job <name>`). Every run is
+recorded in the job_runs ledger (timings per phase, recipient counts,
+errors) - see record_job_run().
+
+run_email_job() runs the 'maintenance' job (database housekeeping, see
+run_maintenance()) before every email job, and it can be scheduled on its
+own as well.
 
 Host Reminder Logic:
 - In the Hole (3 weeks out): Send if NOT (confirmed AND has location)
@@ -16,40 +22,22 @@ Host Reminder Logic:
 - At Bat (this week): ALWAYS send (courtesy reminder)
 """
 
+import math
 import os
 import secrets
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
 from datetime import date, timedelta, datetime
+from functools import wraps
 from flask import current_app
 
 from app import db
-from app.models import Member, Lunch, Location, Attendance, EmailLog, Setting, Rating
-from app.services.email_service import email_service
-
-
-def get_next_tuesday(from_date: date = None) -> date:
-    """Get the next Tuesday from the given date."""
-    if from_date is None:
-        from_date = date.today()
-
-    days_until_tuesday = (1 - from_date.weekday()) % 7
-    if days_until_tuesday == 0 and from_date.weekday() != 1:
-        days_until_tuesday = 7
-
-    return from_date + timedelta(days=days_until_tuesday)
-
-
-def get_this_tuesday(from_date: date = None) -> date:
-    """Get this week's Tuesday (for rating requests on Tuesday)."""
-    if from_date is None:
-        from_date = date.today()
-
-    # If it's Tuesday, return today
-    if from_date.weekday() == 1:
-        return from_date
-
-    # Otherwise get the most recent Tuesday
-    days_since_tuesday = (from_date.weekday() - 1) % 7
-    return from_date - timedelta(days=days_since_tuesday)
+from app.models import Member, Lunch, Location, Attendance, Setting, Rating, JobRun
+from app.services.email_service import email_service, SEND_PHASES
+from app.services.email_idempotency import make_idempotency_key
+from app.services.lunch_schedule import get_upcoming_host_schedule
+from app.services.lunch_calendar import get_lunch_day_on_or_after, get_current_lunch_day, is_skip_week
 
 
 def get_hosting_queue(limit: int = 5) -> list:
@@ -99,42 +87,208 @@ def get_average_attendance(weeks: int = 4) -> int:
     return round(total / len(recent_lunches))
 
 
-# ============== JOB 1: Host Reminders (Thursday 9am) ==============
+# ============== Job Run Ledger ==============
+
+# Phases timed per run; send_email() reports the last three for each email
+JOB_PHASES = ('prefetch',) + SEND_PHASES
+
+# Errors kept per run (an outage would otherwise store one per recipient)
+MAX_RUN_ERRORS = 20
+
+_current_run = ContextVar('current_job_run', default=None)
+
+
+class JobRunRecorder:
+    """Accumulates phase timings, recipient counts and errors for one job run."""
+
+    def __init__(self, job_name: str, dry_run: bool = False):
+        self.job_name = job_name
+        self.dry_run = dry_run
+        self.started_at = datetime.utcnow()
+        self.timings = dict.fromkeys(JOB_PHASES, 0.0)
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.errors = []
+        self.result = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Add the wall time of the block to a phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - started
+
+    def add_timings(self, timings: dict):
+        for phase, seconds in timings.items():
+            self.timings[phase] += seconds
+
+    def add_email_result(self, email_result: dict):
+        """Count a send_email() result and add its timings."""
+        self.add_timings(email_result.get('timings', {}))
+        if email_result['skipped']:
+            self.skipped += 1
+        elif email_result['success']:
+            self.sent += 1
+        else:
+            self.failed += 1
+            self.add_error(email_result['error'])
+
+    def add_bulk_result(self, bulk_result: dict):
+        """Count a send_bulk_email() result and add its timings."""
+        self.add_timings(bulk_result.get('timings', {}))
+        self.sent += bulk_result['sent']
+        self.failed += bulk_result['failed']
+        self.skipped += bulk_result['skipped']
+        for error in bulk_result['errors']:
+            self.add_error(f"{error['email']}: {error['error']}")
+
+    def add_error(self, error):
+        if error and len(self.errors) < MAX_RUN_ERRORS:
+            self.errors.append(str(error))
+
+
+def _save_job_run(run: JobRunRecorder, duration: float):
+    """Write a finished run to job_runs (never raises - the ledger must not break a job)."""
+    result = run.result or {}
+    if result and not result.get('success'):
+        run.errors.insert(0, result.get('message') or 'Job failed')
+
+    try:
+        db.session.add(JobRun(
+            job_name=run.job_name,
+            dry_run=run.dry_run,
+            started_at=run.started_at,
+            finished_at=datetime.utcnow(),
+            duration_ms=round(duration * 1000),
+            success=bool(result.get('success')),
+            prefetch_ms=round(run.timings['prefetch'] * 1000),
+            render_ms=round(run.timings['render'] * 1000),
+            send_ms=round(run.timings['send'] * 1000),
+            log_write_ms=round(run.timings['log_write'] * 1000),
+            sent_count=run.sent,
+            failed_count=run.failed,
+            skipped_count=run.skipped,
+            message=result.get('message'),
+            error='\n'.join(run.errors) or None,
+        ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error recording job run for {run.job_name}: {e}")
+
 
-def get_upcoming_tuesdays() -> dict:
+@contextmanager
+def record_job_run(job_name: str, dry_run: bool = False):
     """
-    Get the next 3 Tuesdays for the 3-tier host reminder system.
+    Record a job invocation in the job_runs ledger.
 
-    Returns:
-        dict with 'at_bat' (this week), 'on_deck' (next week), 'in_hole' (3 weeks out)
+    Yields a JobRunRecorder; set its `result` to the job's result dict before
+    the block ends. A job run from inside another job shares the outer run.
     """
-    today = date.today()
+    active = _current_run.get()
+    if active:
+        yield active
+        return
+
+    run = JobRunRecorder(job_name, dry_run)
+    token = _current_run.set(run)
+    started = time.perf_counter()
+    try:
+        yield run
+    except Exception as e:
+        db.session.rollback()
+        run.errors.insert(0, f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_run.reset(token)
+        _save_job_run(run, time.perf_counter() - started)
 
-    # Get this coming Tuesday (At Bat)
-    days_until_tuesday = (1 - today.weekday()) % 7
-    if days_until_tuesday == 0 and today.weekday() != 1:
-        days_until_tuesday = 7
-    # If it's Tuesday or later in the week, At Bat is this Tuesday
-    # If it's earlier, At Bat is the upcoming Tuesday
-    at_bat_date = today + timedelta(days=days_until_tuesday)
 
-    return {
-        'at_bat': at_bat_date,
-        'on_deck': at_bat_date + timedelta(weeks=1),
-        'in_hole': at_bat_date + timedelta(weeks=2),
-    }
+def recorded_job(job_name: str):
+    """Decorator: run a job function (taking dry_run) inside record_job_run()."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(dry_run: bool = False, **kwargs) -> dict:
+            with record_job_run(job_name, dry_run) as run:
+                run.result = f(dry_run=dry_run, **kwargs)
+            return run.result
+        return wrapper
+    return decorator
 
 
-def was_reminder_already_sent(lunch_id: int, email_type: str, recipient_email: str) -> bool:
-    """Check if a specific reminder type was already sent for this lunch."""
-    existing = EmailLog.query.filter_by(
-        lunch_id=lunch_id,
-        email_type=email_type,
-        recipient_email=recipient_email,
-        status='sent'
-    ).first()
-    return existing is not None
+def job_phase(name: str):
+    """Time a block against the current job run (no-op outside a run)."""
+    run = _current_run.get()
+    return run.phase(name) if run else nullcontext()
+
+
+def record_email_result(email_result: dict, bulk: bool = False):
+    """Add a send_email() (or send_bulk_email() with bulk=True) result to the current run."""
+    run = _current_run.get()
+    if run and bulk:
+        run.add_bulk_result(email_result)
+    elif run:
+        run.add_email_result(email_result)
+
 
+def _percentile(sorted_values: list, pct: float) -> int:
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def get_job_run_stats(days: int = 90, recent: int = 10) -> dict:
+    """
+    Duration percentiles per job from the job_runs ledger.
+
+    Only live runs count towards the percentiles (dry runs skip the send phase).
+
+    Args:
+        days: How far back to look
+        recent: Number of most recent runs (live or dry) to return
+
+    Returns:
+        dict with 'jobs' (list of dicts with 'job_name', 'runs', 'p50_ms',
+        'p95_ms', 'phases' (average ms per JOB_PHASES phase) and 'last_run_at')
+        and 'recent' (JobRun rows, newest first)
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    rows = db.session.query(
+        JobRun.job_name, JobRun.duration_ms, JobRun.started_at,
+        JobRun.prefetch_ms, JobRun.render_ms, JobRun.send_ms, JobRun.log_write_ms
+    ).filter(
+        JobRun.started_at >= cutoff,
+        JobRun.dry_run.is_(False),
+        JobRun.duration_ms.isnot(None)
+    ).all()
+
+    by_job = {}
+    for row in rows:
+        by_job.setdefault(row.job_name, []).append(row)
+
+    jobs = []
+    for job_name, job_rows in sorted(by_job.items()):
+        durations = sorted(row.duration_ms for row in job_rows)
+        jobs.append({
+            'job_name': job_name,
+            'runs': len(job_rows),
+            'p50_ms': _percentile(durations, 50),
+            'p95_ms': _percentile(durations, 95),
+            'phases': {
+                phase: round(sum(getattr(row, f'{phase}_ms') for row in job_rows) / len(job_rows))
+                for phase in JOB_PHASES
+            },
+            'last_run_at': max(row.started_at for row in job_rows),
+        })
+
+    recent_runs = JobRun.query.order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(recent).all()
+    return {'jobs': jobs, 'recent': recent_runs}
+
+
+# ============== JOB 1: Host Reminders (Thursday 9am) ==============
 
 def send_host_reminder(
     host: Member,
@@ -169,12 +323,6 @@ def send_host_reminder(
         result['message'] = f"Skipped {reminder_tier} - already confirmed with location"
         return result
 
-    # Check if already sent this specific reminder
-    if was_reminder_already_sent(lunch.id, email_type, host.email):
-        result['skipped'] = True
-        result['message'] = f"Skipped {reminder_tier} - already sent"
-        return result
-
     # Generate confirmation token if not exists
     if not lunch.confirmation_token:
         lunch.confirmation_token = secrets.token_urlsafe(32)
@@ -203,10 +351,7 @@ def send_host_reminder(
         status_message = "Please confirm you'll be hosting and select a restaurant."
 
     # Get location name if set
-    location_name = None
-    if lunch.location_id:
-        location = Location.query.get(lunch.location_id)
-        location_name = location.name if location else None
+    location_name = lunch.location.name if lunch.location else None
 
     params = {
         'HOST_NAME': host.name,
@@ -228,10 +373,15 @@ def send_host_reminder(
         params=params,
         email_type=email_type,
         lunch_id=lunch.id,
-        dry_run=dry_run
+        dry_run=dry_run,
+        idempotency_key=make_idempotency_key(email_type, lunch.id, host.email)
     )
+    record_email_result(email_result)
 
-    if email_result['success']:
+    if email_result['skipped']:
+        result['skipped'] = True
+        result['message'] = f"Skipped {reminder_tier} - already sent"
+    elif email_result['success']:
         result['success'] = True
         result['message'] = f"{tier_label} reminder sent to {host.name}"
     else:
@@ -240,6 +390,7 @@ def send_host_reminder(
     return result
 
 
+@recorded_job('host_reminders')
 def send_host_reminders(dry_run: bool = False) -> dict:
     """
     Send host reminder emails to the next 3 hosts (At Bat, On Deck, In the Hole).
@@ -262,28 +413,21 @@ def send_host_reminders(dry_run: bool = False) -> dict:
     }
 
     try:
-        # Get the next 3 Tuesdays
-        tuesdays = get_upcoming_tuesdays()
-
-        # Get the hosting queue (need at least 3 hosts)
-        queue = get_hosting_queue(limit=3)
-        if len(queue) < 3:
-            result['message'] = f'Only {len(queue)} members in hosting queue, need at least 3'
+        # Next 3 Tuesdays with their lunches (created if missing) and queued hosts
+        with job_phase('prefetch'):
+            schedule = get_upcoming_host_schedule(weeks=3, create_missing=True)
+
+        # Need at least 3 hosts in the queue
+        hosts = [entry['host'] for entry in schedule if entry['host']]
+        if len(hosts) < 3:
+            result['message'] = f'Only {len(hosts)} members in hosting queue, need at least 3'
             return result
 
-        # Map positions to tiers
-        tier_mapping = [
-            ('at_bat', tuesdays['at_bat'], queue[0]),
-            ('on_deck', tuesdays['on_deck'], queue[1]),
-            ('in_hole', tuesdays['in_hole'], queue[2]),
-        ]
-
         sent_count = 0
         skipped_count = 0
 
-        for tier, lunch_date, host in tier_mapping:
-            # Get or create lunch record for this date
-            lunch = get_or_create_lunch(lunch_date)
+        for entry in schedule:
+            tier, lunch_date, host, lunch = entry['tier'], entry['lunch_date'], entry['host'], entry['lunch']
 
             # Ensure host is assigned
             if not lunch.host_id:
@@ -321,7 +465,7 @@ def send_host_confirmation_email(dry_run: bool = False) -> dict:
 # ============== JOB 2: Secretary Status Email (Friday 9am) ==============
 
 def get_host_status_for_lunch(lunch: Lunch, host: Member) -> dict:
-    """Get the confirmation status for a host/lunch pair."""
+    """Get the confirmation status for a host/lunch pair (lunch.location is preloaded by lunch_schedule)."""
     if not lunch or not host:
         return {
             'host_name': 'Unknown',
@@ -334,7 +478,7 @@ def get_host_status_for_lunch(lunch: Lunch, host: Member) -> dict:
             'location_address': None,
         }
 
-    location = Location.query.get(lunch.location_id) if lunch.location_id else None
+    location = lunch.location
 
     return {
         'host_name': host.name,
@@ -348,6 +492,7 @@ def get_host_status_for_lunch(lunch: Lunch, host: Member) -> dict:
     }
 
 
+@recorded_job('secretary_reminder')
 def send_secretary_reminder(dry_run: bool = False) -> dict:
     """
     Send consolidated secretary status email for all 3 upcoming hosts.
@@ -377,32 +522,26 @@ def send_secretary_reminder(dry_run: bool = False) -> dict:
             result['message'] = 'Secretary member not found or has no email.'
             return result
 
-        # Get the next 3 Tuesdays and hosting queue
-        tuesdays = get_upcoming_tuesdays()
-        queue = get_hosting_queue(limit=3)
+        # Next 3 Tuesdays with their lunches and queued hosts (one lunch query)
+        with job_phase('prefetch'):
+            schedule = get_upcoming_host_schedule(weeks=3)
 
-        if len(queue) < 3:
-            result['message'] = f'Only {len(queue)} members in hosting queue, need at least 3'
+        hosts = [entry['host'] for entry in schedule if entry['host']]
+        if len(hosts) < 3:
+            result['message'] = f'Only {len(hosts)} members in hosting queue, need at least 3'
             return result
 
         # Build status for each tier
-        tiers = [
-            ('at_bat', 'AT BAT', tuesdays['at_bat'], queue[0]),
-            ('on_deck', 'ON DECK', tuesdays['on_deck'], queue[1]),
-            ('in_hole', 'IN THE HOLE', tuesdays['in_hole'], queue[2]),
-        ]
-
         host_statuses = []
         at_bat_status = None
 
-        for tier_key, tier_label, lunch_date, host in tiers:
-            lunch = Lunch.query.filter_by(date=lunch_date).first()
-            status = get_host_status_for_lunch(lunch, host)
-            status['tier'] = tier_key
-            status['tier_label'] = tier_label
+        for entry in schedule:
+            status = get_host_status_for_lunch(entry['lunch'], entry['host'])
+            status['tier'] = entry['tier']
+            status['tier_label'] = entry['tier_label'].upper()
             host_statuses.append(status)
 
-            if tier_key == 'at_bat':
+            if entry['tier'] == 'at_bat':
                 at_bat_status = status
 
         result['host_statuses'] = host_statuses
@@ -410,6 +549,9 @@ def send_secretary_reminder(dry_run: bool = False) -> dict:
         # Determine urgency level
         at_bat_ready = at_bat_status['host_confirmed'] and at_bat_status['location_selected']
 
+        with job_phase('prefetch'):
+            expected_attendance = get_average_attendance()
+
         # Build email params
         params = {
             'SECRETARY_NAME': secretary.name,
@@ -432,7 +574,7 @@ def send_secretary_reminder(dry_run: bool = False) -> dict:
             'IN_HOLE_CONFIRMED': 'yes' if host_statuses[2]['host_confirmed'] else 'no',
             'IN_HOLE_LOCATION': host_statuses[2]['location_name'] or 'Not selected',
 
-            'EXPECTED_ATTENDANCE': str(get_average_attendance()),
+            'EXPECTED_ATTENDANCE': str(expected_attendance),
         }
 
         # Subject line varies based on urgency
@@ -452,6 +594,7 @@ def send_secretary_reminder(dry_run: bool = False) -> dict:
             lunch_id=None,  # Not specific to one lunch
             dry_run=dry_run
         )
+        record_email_result(email_result)
 
         if email_result['success']:
             result['success'] = True
@@ -468,41 +611,54 @@ def send_secretary_reminder(dry_run: bool = False) -> dict:
 
 # ============== JOB 3: Group Announcement (Monday 9am) ==============
 
-def send_group_announcement(dry_run: bool = False) -> dict:
+@recorded_job('announcement')
+def send_group_announcement(dry_run: bool = False, resend: bool = False) -> dict:
     """
     Send group announcement email to all active members.
 
     Called: Monday 9am
     Purpose: Announce location details for Tuesday lunch
 
+    Args:
+        dry_run: If True, don't actually send
+        resend: Send again to members who already received this week's announcement
+
     Returns:
-        dict with 'success', 'sent_count', 'failed_count', 'message'
+        dict with 'success', 'sent_count', 'failed_count', 'skipped_count'
+        (already sent), 'message'
     """
     result = {
         'success': False,
         'sent_count': 0,
         'failed_count': 0,
+        'skipped_count': 0,
         'message': None
     }
 
     try:
-        # Get next Tuesday (should be tomorrow)
-        next_tuesday = get_next_tuesday()
-        lunch = Lunch.query.filter_by(date=next_tuesday).first()
+        with job_phase('prefetch'):
+            # This week's lunch day (should be tomorrow)
+            next_tuesday = get_lunch_day_on_or_after(date.today())
+            if is_skip_week(next_tuesday):
+                result['success'] = True
+                result['message'] = 'No lunch this week (skip week) - no announcement sent'
+                return result
 
-        if not lunch:
-            result['message'] = 'No lunch record found for Tuesday'
-            return result
+            lunch = Lunch.query.filter_by(date=next_tuesday).first()
 
-        if not lunch.location_id:
-            result['message'] = 'No location set for Tuesday lunch'
-            return result
+            if not lunch:
+                result['message'] = 'No lunch record found for Tuesday'
+                return result
 
-        location = Location.query.get(lunch.location_id)
-        host = Member.query.get(lunch.host_id) if lunch.host_id else None
+            if not lunch.location_id:
+                result['message'] = 'No location set for Tuesday lunch'
+                return result
 
-        # Get all active members
-        members = Member.query.filter_by(member_type='regular').all()
+            location = Location.query.get(lunch.location_id)
+            host = Member.query.get(lunch.host_id) if lunch.host_id else None
+
+            # Get all active members
+            members = Member.query.filter_by(member_type='regular').all()
         if not members:
             result['message'] = 'No active members found'
             return result
@@ -538,13 +694,19 @@ def send_group_announcement(dry_run: bool = False) -> dict:
             params=params,
             email_type='announcement',
             lunch_id=lunch.id,
-            dry_run=dry_run
+            dry_run=dry_run,
+            resend=resend
         )
+        record_email_result(bulk_result, bulk=True)
 
         result['sent_count'] = bulk_result['sent']
         result['failed_count'] = bulk_result['failed']
+        result['skipped_count'] = bulk_result['skipped']
         result['success'] = bulk_result['sent'] > 0
-        result['message'] = f"Announcement sent to {bulk_result['sent']} members, {bulk_result['failed']} failed"
+        result['message'] = (
+            f"Announcement sent to {bulk_result['sent']} members, {bulk_result['failed']} failed"
+            + (f", {bulk_result['skipped']} skipped (already received it)" if bulk_result['skipped'] else '')
+        )
 
     except Exception as e:
         result['message'] = f"Error: {str(e)}"
@@ -555,40 +717,55 @@ def send_group_announcement(dry_run: bool = False) -> dict:
 
 # ============== JOB 4: Rating Request (Tuesday 6pm) ==============
 
-def send_rating_requests(dry_run: bool = False) -> dict:
+@recorded_job('rating_request')
+def send_rating_requests(dry_run: bool = False, resend: bool = False) -> dict:
     """
     Send rating request emails to members who attended today's lunch.
 
     Called: Tuesday 6pm
     Purpose: Request ratings from attendees after lunch
 
+    Args:
+        dry_run: If True, don't actually send
+        resend: Send again to attendees who already received a request for this lunch
+
     Returns:
-        dict with 'success', 'sent_count', 'failed_count', 'message'
+        dict with 'success', 'sent_count', 'failed_count', 'skipped_count'
+        (already sent), 'message'
     """
+    from app.services.email_idempotency import new_resend_attempt
+
     result = {
         'success': False,
         'sent_count': 0,
         'failed_count': 0,
+        'skipped_count': 0,
         'message': None
     }
 
     try:
-        # Get today's lunch (should be Tuesday)
-        today = get_this_tuesday()
-        lunch = Lunch.query.filter_by(date=today).first()
+        with job_phase('prefetch'):
+            # Get today's lunch (should be Tuesday)
+            today = get_current_lunch_day()
+            if is_skip_week(today):
+                result['success'] = True
+                result['message'] = 'No lunch this week (skip week) - no rating requests sent'
+                return result
 
-        if not lunch:
-            result['message'] = 'No lunch record found for today'
-            return result
+            lunch = Lunch.query.filter_by(date=today).first()
 
-        # Check if attendance has been logged
-        attendances = Attendance.query.filter_by(lunch_id=lunch.id).all()
-        if not attendances:
-            result['message'] = 'Attendance not logged yet - skipping rating requests'
-            return result
+            if not lunch:
+                result['message'] = 'No lunch record found for today'
+                return result
+
+            # Check if attendance has been logged
+            attendances = Attendance.query.filter_by(lunch_id=lunch.id).all()
+            if not attendances:
+                result['message'] = 'Attendance not logged yet - skipping rating requests'
+                return result
 
-        location = Location.query.get(lunch.location_id) if lunch.location_id else None
-        host = Member.query.get(lunch.host_id) if lunch.host_id else None
+            location = Location.query.get(lunch.location_id) if lunch.location_id else None
+            host = Member.query.get(lunch.host_id) if lunch.host_id else None
 
         if not location:
             result['message'] = 'No location set for this lunch'
@@ -599,6 +776,8 @@ def send_rating_requests(dry_run: bool = False) -> dict:
         # Send to each attendee
         sent = 0
         failed = 0
+        skipped = 0
+        attempt = new_resend_attempt() if resend else None
 
         for attendance in attendances:
             member = attendance.member
@@ -606,17 +785,22 @@ def send_rating_requests(dry_run: bool = False) -> dict:
                 continue
 
             # Check if rating already exists for this member/lunch
-            existing_rating = Rating.query.filter_by(
-                lunch_id=lunch.id,
-                member_id=member.id
-            ).first()
+            with job_phase('prefetch'):
+                existing_rating = Rating.query.filter_by(
+                    lunch_id=lunch.id,
+                    member_id=member.id
+                ).first()
 
             if existing_rating and existing_rating.rating is not None:
                 # Already rated, skip
                 continue
 
-            # Generate unique rating token
-            rating_token = secrets.token_urlsafe(32)
+            # Reuse an existing token: if this request was already sent, the send is
+            # skipped and the link in the earlier email must keep working
+            if existing_rating and existing_rating.rating_token:
+                rating_token = existing_rating.rating_token
+            else:
+                rating_token = secrets.token_urlsafe(32)
 
             # Create or update rating record with token (rating is NULL until submitted)
             if existing_rating:
@@ -658,18 +842,26 @@ def send_rating_requests(dry_run: bool = False) -> dict:
                 params=params,
                 email_type='rating_request',
                 lunch_id=lunch.id,
-                dry_run=dry_run
+                dry_run=dry_run,
+                idempotency_key=make_idempotency_key('rating_request', lunch.id, member.email, attempt)
             )
+            record_email_result(email_result)
 
-            if email_result['success']:
+            if email_result['skipped']:
+                skipped += 1
+            elif email_result['success']:
                 sent += 1
             else:
                 failed += 1
 
         result['sent_count'] = sent
         result['failed_count'] = failed
+        result['skipped_count'] = skipped
         result['success'] = sent > 0
-        result['message'] = f"Rating requests sent to {sent} attendees, {failed} failed"
+        result['message'] = (
+            f"Rating requests sent to {sent} attendees, {failed} failed"
+            + (f", {skipped} skipped (already received one)" if skipped else '')
+        )
 
     except Exception as e:
         result['message'] = f"Error: {str(e)}"
@@ -678,16 +870,79 @@ def send_rating_requests(dry_run: bool = False) -> dict:
     return result
 
 
+# ============== Maintenance ==============
+
+@recorded_job('maintenance')
+def run_maintenance(dry_run: bool = False) -> dict:
+    """
+    Database housekeeping that must not wait for a deploy.
+
+    - Pre-creates upcoming email_logs partitions (PostgreSQL), moving any rows
+      that landed in the default partition into them
+    - Sweeps used signed magic links that have expired (used_magic_links)
+    - Applies staged Brevo webhook events (normally flushed by the webhook
+      worker's timer; this catches any left by a worker that exited)
+
+    Args:
+        dry_run: If True, only report what would be done
+
+    Returns:
+        dict with 'success' and 'message'
+    """
+    from app.models import UsedMagicLink
+    from app.services.email_events import apply_staged_events
+    from app.services.email_log_retention import ensure_partitions
+
+    if dry_run:
+        return {'success': True, 'message': 'Dry run - maintenance skipped'}
+
+    messages = []
+    success = True
+    try:
+        partitions = ensure_partitions()
+        success = partitions['success']
+        messages.append(f"Email log partitions: {partitions['message']}")
+    except Exception as e:
+        db.session.rollback()
+        success = False
+        messages.append(f'Email log partitions: error {e}')
+        current_app.logger.error(f"Email log partition maintenance error: {e}")
+
+    try:
+        messages.append(f'Expired magic links removed: {UsedMagicLink.cleanup_expired()}')
+    except Exception as e:
+        db.session.rollback()
+        success = False
+        messages.append(f'Magic link cleanup: error {e}')
+        current_app.logger.error(f"Magic link cleanup error: {e}")
+
+    try:
+        messages.append(f"Brevo events: {apply_staged_events()['message']}")
+    except Exception as e:
+        db.session.rollback()
+        success = False
+        messages.append(f'Brevo events: error {e}')
+        current_app.logger.error(f"Error applying Brevo events: {e}")
+
+    return {'success': success, 'message': '. '.join(messages)}
+
+
 # ============== Manual Trigger Function ==============
 
-def run_email_job(job_name: str, dry_run: bool = False) -> dict:
+# Jobs that can deliberately send a lunch email again (see email_idempotency.py)
+RESENDABLE_JOBS = {'announcement', 'rating_request'}
+
+
+def run_email_job(job_name: str, dry_run: bool = False, resend: bool = False) -> dict:
     """
-    Run a specific email job by name.
+    Run a specific job by name, after the maintenance job.
 
     Args:
         job_name: One of 'host_confirmation', 'secretary_reminder',
-                  'announcement', 'rating_request'
+                  'announcement', 'rating_request', 'maintenance'
         dry_run: If True, don't actually send emails
+        resend: Send again to recipients who already received this lunch's
+            email (RESENDABLE_JOBS only)
 
     Returns:
         Job result dict
@@ -699,6 +954,7 @@ def run_email_job(job_name: str, dry_run: bool = False) -> dict:
         'secretary_status': send_secretary_reminder,  # Alias for clarity
         'announcement': send_group_announcement,
         'rating_request': send_rating_requests,
+        'maintenance': run_maintenance,
     }
 
     if job_name not in jobs:
@@ -707,4 +963,16 @@ def run_email_job(job_name: str, dry_run: bool = False) -> dict:
             'message': f"Unknown job: {job_name}. Valid jobs: {list(jobs.keys())}"
         }
 
+    if resend and job_name not in RESENDABLE_JOBS:
+        return {
+            'success': False,
+            'message': f"Job {job_name} can't be resent. Resendable jobs: {sorted(RESENDABLE_JOBS)}"
+        }
+
+    # Emails are about to be logged - make sure their month has a partition
+    if job_name != 'maintenance' and not dry_run:
+        run_maintenance()
+
+    if resend:
+        return jobs[job_name](dry_run=dry_run, resend=True)
     return jobs[job_name](dry_run=dry_run)
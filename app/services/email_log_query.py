@@ -0,0 +1,176 @@
+"""
+Email log queries: filters, keyset pagination and estimated counts.
+
+The log viewer pages with a keyset ("seek") cursor on (sent_at, id) instead of
+OFFSET, so every page is an index range scan no matter how deep it is, and
+counts come from planner statistics instead of a full COUNT(*).
+
+Each filter has a matching (column, sent_at, id) index on email_logs - for
+the recipient, (lower(recipient_email), sent_at, id) - so a filtered page is
+still a single index range scan.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import func, text, tuple_
+
+from app import db
+from app.models import EmailLog
+
+# Filters accepted from the query string -> EmailLog column
+FILTER_COLUMNS = {
+    'email_type': EmailLog.email_type,
+    'status': EmailLog.status,
+    'lunch_id': EmailLog.lunch_id,
+    # Addresses are stored as entered; parse_filters() lowercases the value
+    'recipient': func.lower(EmailLog.recipient_email),
+}
+
+# Fixed lists for the filter dropdowns (a DISTINCT over the whole log would be a full scan)
+EMAIL_TYPES = [
+    'host_reminder_in_hole', 'host_reminder_on_deck', 'host_reminder_at_bat',
+    'secretary_status', 'announcement', 'rating_request', 'magic_link',
+    'host_confirmation', 'secretary_reminder',
+]
+
+EMAIL_STATUSES = ['pending', 'sent', 'delivered', 'opened', 'clicked', 'bounced', 'failed', 'dry_run']
+
+
+def parse_filters(args) -> dict:
+    """Read the supported filters from request args, dropping empty values."""
+    filters = {}
+    for name in FILTER_COLUMNS:
+        value = (args.get(name) or '').strip()
+        if not value:
+            continue
+        if name == 'lunch_id':
+            if not value.isdigit():
+                continue
+            value = int(value)
+        elif name == 'recipient':
+            value = value.lower()
+        filters[name] = value
+    return filters
+
+
+def filtered_query(filters: dict):
+    """EmailLog query with the given filters applied."""
+    query = EmailLog.query
+    for name, value in filters.items():
+        query = query.filter(FILTER_COLUMNS[name] == value)
+    return query
+
+
+# ============== KEYSET PAGINATION ==============
+
+def encode_cursor(log: EmailLog) -> str:
+    """Opaque cursor for a row's position in (sent_at, id) order."""
+    raw = json.dumps([log.sent_at.isoformat() if log.sent_at else None, log.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Decode a cursor into (sent_at, id), or None if it's missing or invalid."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sent_at, log_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(sent_at), int(log_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def get_email_log_page(filters: dict = None, after: str = None, before: str = None, per_page: int = 50) -> dict:
+    """
+    Get one page of email logs, newest first.
+
+    Args:
+        filters: Filters from parse_filters()
+        after: Cursor of the last row on the previous page (go older)
+        before: Cursor of the first row on the next page (go newer)
+        per_page: Rows per page
+
+    Returns:
+        dict with 'items', 'next_cursor' (older) and 'prev_cursor' (newer);
+        cursors are None when there is nothing further in that direction
+    """
+    query = filtered_query(filters or {})
+    key = tuple_(EmailLog.sent_at, EmailLog.id)
+
+    after_pos = decode_cursor(after)
+    before_pos = decode_cursor(before) if not after_pos else None
+
+    if before_pos:
+        # Walk forward (ascending) from the cursor, then flip back to newest-first
+        rows = query.filter(key > tuple_(*before_pos)).order_by(
+            EmailLog.sent_at.asc(), EmailLog.id.asc()
+        ).limit(per_page + 1).all()
+        has_newer = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_older = True
+    else:
+        if after_pos:
+            query = query.filter(key < tuple_(*after_pos))
+        rows = query.order_by(EmailLog.sent_at.desc(), EmailLog.id.desc()).limit(per_page + 1).all()
+        has_older = len(rows) > per_page
+        items = rows[:per_page]
+        has_newer = after_pos is not None
+
+    return {
+        'items': items,
+        'next_cursor': encode_cursor(items[-1]) if items and has_older else None,
+        'prev_cursor': encode_cursor(items[0]) if items and has_newer else None,
+    }
+
+
+def get_recent_email_logs(limit: int = 20) -> list:
+    """The most recent email logs (first keyset page)."""
+    return get_email_log_page(per_page=limit)['items']
+
+
+# ============== COUNTS ==============
+
+def _is_postgres() -> bool:
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _estimate_postgres_count(query) -> int:
+    """Planner row estimate for a query (EXPLAIN, no execution)."""
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    plan = db.session.execute(text(f'EXPLAIN (FORMAT JSON) {statement}')).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_email_logs(filters: dict = None, exact: bool = False) -> dict:
+    """
+    Count email logs matching the filters.
+
+    On PostgreSQL, unless exact is requested, the unfiltered count comes from
+    pg_class.reltuples (summed over partitions) and filtered counts from the planner's row estimate -
+    both are O(1) regardless of table size. SQLite always counts exactly.
+
+    Returns:
+        dict with 'count' and 'estimated' (bool)
+    """
+    filters = filters or {}
+    if exact or not _is_postgres():
+        return {'count': filtered_query(filters).count(), 'estimated': False}
+
+    if not filters:
+        # Sum over the monthly partitions (the partitioned parent has no stats of its own)
+        reltuples = db.session.execute(text(
+            "SELECT SUM(GREATEST(c.reltuples, 0))::bigint FROM pg_class c "
+            "WHERE c.oid = 'email_logs'::regclass "
+            "OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = 'email_logs'::regclass)"
+        )).scalar()
+        # 0 until the partitions have been vacuumed/analyzed at least once
+        if reltuples and reltuples > 0:
+            return {'count': int(reltuples), 'estimated': True}
+        return {'count': filtered_query(filters).count(), 'estimated': False}
+
+    return {'count': _estimate_postgres_count(filtered_query(filters)), 'estimated': True}
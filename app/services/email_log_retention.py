@@ -0,0 +1,322 @@
+"""
+email_logs partition maintenance, retention and archival.
+
+On PostgreSQL, email_logs is range-partitioned by month on sent_at (see
+migration e5b07c4d2a61), one partition per month named email_logs_yYYYYmMM,
+plus email_logs_default for anything outside them.
+
+- ensure_partitions() pre-creates the next few months' partitions
+  (`flask create-email-log-partitions`, run in the release step and by the
+  maintenance job before every scheduled email job - see email_jobs.py).
+  Rows that landed in email_logs_default because their month had no
+  partition yet are moved into the new partition, since PostgreSQL refuses
+  to create a partition whose range the default partition already holds
+- prune_email_logs() archives months older than the retention window to
+  gzipped CSV (or Parquet, if pyarrow is installed) on R2 or local disk, then
+  detaches and drops their partitions, and deletes old rows left in the
+  default partition (`flask prune-email-logs`)
+
+On SQLite (development) there are no partitions; pruning archives the same
+months and deletes their rows instead.
+"""
+
+import csv
+import gzip
+import io
+import os
+import re
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import text
+
+from app import db
+
+PARTITION_PREFIX = 'email_logs_y'
+DEFAULT_PARTITION = 'email_logs_default'
+PARTITION_NAME = re.compile(r'^email_logs_y(\d{4})m(\d{2})$')
+
+DEFAULT_MONTHS_AHEAD = 3
+DEFAULT_KEEP_MONTHS = 12
+
+ARCHIVE_R2_FOLDER = 'archives/email_logs'
+
+ARCHIVE_COLUMNS = [
+    'id', 'email_type', 'recipient_email', 'recipient_name', 'subject', 'lunch_id',
+    'brevo_message_id', 'status', 'error_message', 'sent_at', 'updated_at',
+]
+
+
+def add_months(month_start: date, months: int) -> date:
+    """First day of the month `months` after month_start (negative goes back)."""
+    month_index = month_start.month - 1 + months
+    return date(month_start.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month_start: date) -> str:
+    return f'{PARTITION_PREFIX}{month_start.year}m{month_start.month:02d}'
+
+
+def is_partitioned() -> bool:
+    """Whether email_logs is a partitioned table (PostgreSQL after the migration)."""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    return bool(db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'email_logs'::regclass"
+    )).scalar())
+
+
+def list_partitions() -> list:
+    """
+    Monthly partitions of email_logs, oldest first.
+
+    Returns:
+        List of (month_start: date, table_name: str)
+    """
+    names = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'email_logs'::regclass"
+    )).scalars().all()
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+def default_partition_months() -> list:
+    """Months that have rows in the default partition, oldest first."""
+    months = db.session.execute(text(
+        f"SELECT DISTINCT CAST(date_trunc('month', sent_at) AS DATE) FROM {DEFAULT_PARTITION}"
+    )).scalars().all()
+    return sorted(months)
+
+
+def _create_partition(month: date) -> int:
+    """
+    Create one month's partition, moving its rows out of the default partition.
+
+    Runs in the caller's transaction. Returns the number of rows moved.
+    """
+    name = partition_name(month)
+    bounds = {'start': month, 'end': add_months(month, 1)}
+
+    # Hold off inserts that would land in the default partition until the partition exists
+    db.session.execute(text(f'LOCK TABLE {DEFAULT_PARTITION} IN SHARE ROW EXCLUSIVE MODE'))
+    db.session.execute(text(
+        'CREATE TEMPORARY TABLE email_logs_moving (LIKE email_logs) ON COMMIT DROP'
+    ))
+    moved = db.session.execute(text(
+        f"WITH moved AS ("
+        f"  DELETE FROM {DEFAULT_PARTITION} WHERE sent_at >= :start AND sent_at < :end RETURNING *"
+        f") INSERT INTO email_logs_moving SELECT * FROM moved"
+    ), bounds).rowcount
+
+    db.session.execute(text(
+        f"CREATE TABLE {name} PARTITION OF email_logs "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+    if moved:
+        db.session.execute(text('INSERT INTO email_logs SELECT * FROM email_logs_moving'))
+    return moved
+
+
+def ensure_partitions(months_ahead: int = DEFAULT_MONTHS_AHEAD) -> dict:
+    """
+    Create any missing monthly partitions from this month through months_ahead,
+    plus one for any month with rows stranded in the default partition.
+
+    Each partition is created in its own transaction; a failure is logged and
+    the remaining months are still attempted.
+
+    Returns:
+        dict with 'success', 'message', 'created' (table names) and 'moved'
+        (rows moved out of the default partition)
+    """
+    if not is_partitioned():
+        return {'success': True, 'message': 'email_logs is not partitioned - nothing to do',
+                'created': [], 'moved': 0}
+
+    existing = {name for _, name in list_partitions()}
+    this_month = date.today().replace(day=1)
+    months = {add_months(this_month, offset) for offset in range(months_ahead + 1)}
+    months.update(default_partition_months())
+
+    created = []
+    moved = 0
+    errors = []
+    for month in sorted(months):
+        name = partition_name(month)
+        if name in existing:
+            continue
+        try:
+            moved += _create_partition(month)
+            db.session.commit()
+            created.append(name)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error creating email_logs partition {name}: {e}")
+            errors.append(f'{name}: {e}')
+
+    message = f"Created {', '.join(created)}" if created else 'All partitions already exist'
+    if moved:
+        message += f' ({moved} rows moved out of {DEFAULT_PARTITION})'
+    if errors:
+        message += f". Failed: {'; '.join(errors)}"
+    return {'success': not errors, 'message': message, 'created': created, 'moved': moved}
+
+
+# ============== ARCHIVE ==============
+
+def _month_rows(month: date, table: str = 'email_logs'):
+    """Stream a month's rows (server-side cursor on PostgreSQL)."""
+    result = db.session.execute(
+        text(
+            f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM {table} "
+            f"WHERE sent_at >= :start AND sent_at < :end ORDER BY sent_at, id"
+        ).execution_options(stream_results=True, yield_per=1000),
+        {'start': month, 'end': add_months(month, 1)}
+    )
+    for row in result:
+        yield row
+
+
+def _encode_csv_gz(rows) -> bytes:
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as gz:
+        wrapper = io.TextIOWrapper(gz, encoding='utf-8', newline='')
+        writer = csv.writer(wrapper)
+        writer.writerow(ARCHIVE_COLUMNS)
+        for row in rows:
+            writer.writerow(['' if value is None else value for value in row])
+        wrapper.flush()
+        wrapper.detach()
+    return buffer.getvalue()
+
+
+def _encode_parquet(rows) -> bytes:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    records = [dict(zip(ARCHIVE_COLUMNS, row)) for row in rows]
+    table = pa.Table.from_pylist(records) if records else pa.table({c: [] for c in ARCHIVE_COLUMNS})
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression='zstd')
+    return buffer.getvalue()
+
+
+def archive_month(month: date, destination: str = 'local', file_format: str = 'csv', table: str = 'email_logs') -> str:
+    """
+    Write one month of email logs to an archive file.
+
+    Args:
+        month: First day of the month
+        destination: 'local' (EMAIL_LOG_ARCHIVE_DIR, default instance/archives) or 'r2'
+        file_format: 'csv' (gzipped) or 'parquet' (requires pyarrow)
+        table: Table to read (a single partition is cheaper than the parent)
+
+    Returns:
+        The archive's path or R2 key
+    """
+    rows = _month_rows(month, table)
+    if file_format == 'parquet':
+        data, extension, content_type = _encode_parquet(rows), 'parquet', 'application/vnd.apache.parquet'
+    else:
+        data, extension, content_type = _encode_csv_gz(rows), 'csv.gz', 'application/gzip'
+
+    filename = f'{partition_name(month)}.{extension}'
+
+    if destination == 'r2':
+        from app.services.storage_service import storage_service
+        if not storage_service.s3_client:
+            raise RuntimeError('R2 storage is not configured')
+        key = f'{ARCHIVE_R2_FOLDER}/{filename}'
+        storage_service.s3_client.put_object(
+            Bucket=storage_service.bucket_name, Key=key, Body=data, ContentType=content_type
+        )
+        return key
+
+    archive_dir = os.environ.get('EMAIL_LOG_ARCHIVE_DIR') or os.path.join(current_app.instance_path, 'archives')
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, filename)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+# ============== RETENTION ==============
+
+def prune_email_logs(keep_months: int = DEFAULT_KEEP_MONTHS, archive: str = 'local',
+                     file_format: str = 'csv', dry_run: bool = False) -> dict:
+    """
+    Archive and remove email logs older than the retention window.
+
+    Keeps the current month plus the previous keep_months - 1 months.
+
+    Args:
+        keep_months: Number of months to keep
+        archive: 'local', 'r2' or 'none' (drop without archiving)
+        file_format: 'csv' or 'parquet'
+        dry_run: Only report what would be removed
+
+    Returns:
+        dict with 'success', 'message' and 'months' (list of dicts with 'month', 'archive')
+    """
+    if file_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return {'success': False, 'message': 'Parquet archives require pyarrow (pip install pyarrow)', 'months': []}
+
+    cutoff = add_months(date.today().replace(day=1), -(keep_months - 1))
+    partitioned = is_partitioned()
+
+    if partitioned:
+        expired = [(month, name) for month, name in list_partitions() if month < cutoff]
+        # Old rows that never got a partition (ensure_partitions normally moves them out)
+        expired += [(month, DEFAULT_PARTITION) for month in default_partition_months() if month < cutoff]
+        expired.sort()
+    else:
+        oldest = db.session.execute(text('SELECT MIN(sent_at) FROM email_logs')).scalar()
+        if isinstance(oldest, str):
+            oldest = datetime.fromisoformat(oldest)
+        expired = []
+        month = oldest.date().replace(day=1) if oldest else cutoff
+        while month < cutoff:
+            has_rows = db.session.execute(
+                text('SELECT 1 FROM email_logs WHERE sent_at >= :start AND sent_at < :end LIMIT 1'),
+                {'start': month, 'end': add_months(month, 1)}
+            ).scalar()
+            if has_rows:
+                expired.append((month, None))
+            month = add_months(month, 1)
+
+    months = []
+    for month, table in expired:
+        entry = {'month': month.strftime('%Y-%m'), 'archive': None}
+        months.append(entry)
+        if dry_run:
+            continue
+
+        if archive != 'none':
+            entry['archive'] = archive_month(month, archive, file_format, table or 'email_logs')
+
+        if partitioned and table != DEFAULT_PARTITION:
+            db.session.execute(text(f'ALTER TABLE email_logs DETACH PARTITION {table}'))
+            db.session.execute(text(f'DROP TABLE {table}'))
+        else:
+            db.session.execute(
+                text(f"DELETE FROM {table or 'email_logs'} WHERE sent_at >= :start AND sent_at < :end"),
+                {'start': month, 'end': add_months(month, 1)}
+            )
+        db.session.commit()
+
+    action = 'Would remove' if dry_run else 'Removed'
+    labels = ', '.join(entry['month'] for entry in months) or 'nothing'
+    return {
+        'success': True,
+        'message': f"{action} {labels} (keeping {keep_months} months from {cutoff.strftime('%Y-%m')})",
+        'months': months,
+    }
@@ -9,14 +9,43 @@ This module handles all email sending functionality including:
 
 import os
 import re
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from flask import current_app, render_template, url_for
 import sib_api_v3_sdk
 from sib_api_v3_sdk.rest import ApiException
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError
 
 from app import db
 from app.models import EmailLog
 
+# Phases timed per send and reported in result['timings'] (seconds)
+SEND_PHASES = ('render', 'send', 'log_write')
+
+
+@contextmanager
+def _timed(timings: dict, phase: str):
+    """Add the wall time of the block to timings[phase]."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] += time.perf_counter() - started
+
+
+def _failed_before_sending(error: Exception) -> bool:
+    """
+    Whether a Brevo call failed before the request went out, so retrying can't duplicate the email.
+
+    True for connection failures (refused, DNS, connect timeout); False for
+    read timeouts and anything else, where Brevo may already have sent it.
+    """
+    if isinstance(error, MaxRetryError):
+        error = error.reason
+    # NewConnectionError and NameResolutionError are ConnectTimeoutErrors
+    return isinstance(error, ConnectTimeoutError)
+
 
 class EmailService:
     """Service for sending emails via Brevo."""
@@ -44,6 +73,14 @@ class EmailService:
             )
         return self._api_instance
 
+    @property
+    def request_timeout(self) -> float:
+        """Seconds to wait for Brevo before giving up (BREVO_TIMEOUT_SECONDS, default 10)."""
+        try:
+            return float(os.environ.get('BREVO_TIMEOUT_SECONDS', 10))
+        except ValueError:
+            return 10.0
+
     def _substitute_params(self, html_content: str, params: dict) -> str:
         """Replace {{ params.X }} placeholders with actual values."""
         for key, value in params.items():
@@ -60,14 +97,9 @@ class EmailService:
             return f.read()
 
     def _get_image_urls(self) -> dict:
-        """Get URLs for email images."""
-        app_url = os.environ.get('APP_URL', 'http://localhost:5000')
-        return {
-            'AI_GUY_LOGO_URL': f"{app_url}/static/emails/Ai_guy_transparent.png",
-            'HEADER_IMAGE_URL': f"{app_url}/static/emails/announcment_header.jpg",
-            'LOCATION_BG_IMAGE_URL': f"{app_url}/static/emails/announcment_Location_backgound.jpg",
-            'INTEL_BG_IMAGE_URL': f"{app_url}/static/emails/announcement_intel_report_background.jpg",
-        }
+        """Get URLs for email images (R2 copies once published, see email_assets.py)."""
+        from app.services.email_assets import get_email_image_assets
+        return {param: asset['url'] for param, asset in get_email_image_assets().items()}
 
     def send_email(
         self,
@@ -78,7 +110,9 @@ class EmailService:
         params: dict,
         email_type: str,
         lunch_id: int = None,
-        dry_run: bool = False
+        dry_run: bool = False,
+        idempotency_key: str = None,
+        email_log_id: int = None
     ) -> dict:
         """
         Send an email via Brevo.
@@ -92,38 +126,73 @@ class EmailService:
             email_type: Type for logging (host_confirmation, announcement, etc.)
             lunch_id: Optional lunch ID to link in logs
             dry_run: If True, don't actually send (for testing)
+            idempotency_key: Optional key (see email_idempotency.py); if it was
+                already sent or another worker is sending it, nothing is sent
+            email_log_id: Existing pending log row to update instead of
+                creating one (see email_dispatch.py)
 
         Returns:
-            dict with 'success', 'message_id', and 'error' keys
+            dict with 'success', 'skipped', 'message_id', 'error',
+            'retryable' (Brevo can't have accepted it: 429, or no connection -
+            see _failed_before_sending) and
+            'timings' (seconds per SEND_PHASES phase) keys
         """
-        # Add image URLs to params
-        params.update(self._get_image_urls())
-
-        # Read and process template
-        raw_html = self._read_template(template_file)
-        html_content = self._substitute_params(raw_html, params)
+        from app.services.email_assets import get_email_image_assets, check_email_budget, warn_over_budget
+        from app.services.email_idempotency import claim_send, finish_send, was_sent
 
+        timings = dict.fromkeys(SEND_PHASES, 0.0)
         result = {
             'success': False,
+            'skipped': False,
             'message_id': None,
-            'error': None
+            'error': None,
+            'retryable': False,
+            'timings': timings
         }
 
-        # Create email log entry
-        email_log = EmailLog(
-            email_type=email_type,
-            recipient_email=to_email,
-            recipient_name=to_name,
-            subject=subject,
-            lunch_id=lunch_id,
-            status='pending'
-        )
-        db.session.add(email_log)
+        # Claim the key before doing any work, so concurrent workers never both send
+        if idempotency_key:
+            with _timed(timings, 'log_write'):
+                already_sent = was_sent(idempotency_key) if dry_run else not claim_send(idempotency_key)
+            if already_sent:
+                result['skipped'] = True
+                return result
+
+        with _timed(timings, 'render'):
+            # Add image URLs to params
+            image_assets = get_email_image_assets()
+            params.update({param: asset['url'] for param, asset in image_assets.items()})
+
+            # Read and process template
+            raw_html = self._read_template(template_file)
+            html_content = self._substitute_params(raw_html, params)
+
+            # Byte budget: what opening this email downloads (HTML + images)
+            budget = check_email_budget(html_content, image_assets)
+
+        result['bytes'] = budget['bytes']
+        result['within_budget'] = budget['within_budget']
+        if not budget['within_budget']:
+            warn_over_budget(template_file, budget, image_assets)
+
+        # Create email log entry (or reuse the one created when the send was queued)
+        email_log = db.session.get(EmailLog, email_log_id) if email_log_id else None
+        if email_log is None:
+            email_log = EmailLog(
+                email_type=email_type,
+                recipient_email=to_email,
+                recipient_name=to_name,
+                subject=subject,
+                lunch_id=lunch_id,
+                status='pending'
+            )
+            db.session.add(email_log)
 
         if dry_run:
             email_log.status = 'dry_run'
             email_log.error_message = 'Dry run - email not sent'
-            db.session.commit()
+            with _timed(timings, 'log_write'):
+                db.session.commit()
             result['success'] = True
             result['message_id'] = 'dry_run'
             return result
@@ -141,12 +210,16 @@ class EmailService:
             )
 
             # Send via Brevo
-            api_response = self.api_instance.send_transac_email(send_smtp_email)
+            with _timed(timings, 'send'):
+                api_response = self.api_instance.send_transac_email(
+                    send_smtp_email, _request_timeout=self.request_timeout
+                )
 
             # Update log with success
             email_log.brevo_message_id = api_response.message_id
             email_log.status = 'sent'
-            db.session.commit()
+            with _timed(timings, 'log_write'):
+                db.session.commit()
 
             result['success'] = True
             result['message_id'] = api_response.message_id
@@ -155,19 +228,29 @@ class EmailService:
             # Log the error
             email_log.status = 'failed'
             email_log.error_message = str(e)
-            db.session.commit()
+            with _timed(timings, 'log_write'):
+                db.session.commit()
 
             result['error'] = str(e)
+            # Rate limited: rejected, not sent. A 5xx may have been accepted anyway
+            result['retryable'] = e.status == 429
             current_app.logger.error(f"Brevo API error: {e}")
 
         except Exception as e:
             email_log.status = 'failed'
             email_log.error_message = str(e)
-            db.session.commit()
+            with _timed(timings, 'log_write'):
+                db.session.commit()
 
             result['error'] = str(e)
+            # A read timeout may have been sent; only a failed connection is safe to retry
+            result['retryable'] = _failed_before_sending(e)
             current_app.logger.error(f"Email send error: {e}")
 
+        if idempotency_key:
+            with _timed(timings, 'log_write'):
+                finish_send(idempotency_key, result['success'], email_log.id)
+
         return result
 
     def send_bulk_email(
@@ -178,11 +261,16 @@ class EmailService:
         params: dict,
         email_type: str,
         lunch_id: int = None,
-        dry_run: bool = False
+        dry_run: bool = False,
+        resend: bool = False
     ) -> dict:
         """
         Send the same email to multiple recipients.
 
+        Lunch emails (lunch_id set) are idempotent per recipient, so re-running
+        a job only sends to recipients who haven't received it yet - they are
+        counted in 'skipped'. Pass resend=True to send it to everyone again.
+
         Args:
             recipients: List of dicts with 'email' and 'name' keys
             subject: Email subject
@@ -191,14 +279,23 @@ class EmailService:
             email_type: Type for logging
             lunch_id: Optional lunch ID
             dry_run: If True, don't actually send
+            resend: Send even to recipients who already received this lunch email
+                (the keys are scoped to this attempt instead)
 
         Returns:
-            dict with 'sent', 'failed', and 'errors' keys
+            dict with 'sent', 'skipped' (already sent), 'failed', 'errors' and
+            'timings' (summed over all sends) keys
         """
+        from app.services.email_idempotency import make_idempotency_key, new_resend_attempt
+
+        attempt = new_resend_attempt() if resend else None
+
         results = {
             'sent': 0,
+            'skipped': 0,
             'failed': 0,
-            'errors': []
+            'errors': [],
+            'timings': dict.fromkeys(SEND_PHASES, 0.0)
         }
 
         for recipient in recipients:
@@ -210,10 +307,18 @@ class EmailService:
                 params=params,
                 email_type=email_type,
                 lunch_id=lunch_id,
-                dry_run=dry_run
+                dry_run=dry_run,
+                idempotency_key=(
+                    make_idempotency_key(email_type, lunch_id, recipient['email'], attempt) if lunch_id else None
+                )
             )
 
-            if result['success']:
+            for phase, seconds in result['timings'].items():
+                results['timings'][phase] += seconds
+
+            if result['skipped']:
+                results['skipped'] += 1
+            elif result['success']:
                 results['sent'] += 1
             else:
                 results['failed'] += 1
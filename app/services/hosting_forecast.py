@@ -0,0 +1,353 @@
+"""
+Monte Carlo forecast of the hosting rotation.
+
+The lineup's "position N hosts on lunch N" estimate assumes everybody comes
+every week. In practice the queue reshuffles as members attend (or don't)
+and their attendance_since_hosting changes. simulate_rotation() replays the
+rotation rules week by week for many random trials:
+
+- Each regular member attends with their own probability, estimated from
+  the last HISTORY_LUNCHES completed lunches (smoothed, so new members
+  start near 50%)
+- The host is the first attending member in queue order (queue_position
+  override, then attendance_since_hosting DESC, then name) - hosting resets
+  their counter, as saving attendance does (a queue_position override stays
+  until the secretary clears it); every other attendee's counter goes up by one
+
+Each member then gets a distribution of the lunch they first host on: the
+10th/50th/90th percentiles become "likely between X and Y".
+
+With NumPy all trials run at once as (trials x members) arrays; without it
+a pure-Python loop runs FALLBACK_TRIALS trials instead. Either way it never
+runs on the request path: each worker keeps its latest forecast, keyed by
+the 'queue' and 'calendar' version stamps, and rebuilds it on a background
+thread after commits that bump them (attendance saves) or when a reader finds
+it out of date - pages show the previous forecast until the new one is ready.
+"""
+
+import random
+import threading
+from datetime import date
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Lunch, Attendance
+from app.services.cache_service import get_versions, on_commit
+
+HISTORY_LUNCHES = 26
+HORIZON_WEEKS = 52
+
+TRIALS = 2000
+FALLBACK_TRIALS = 200  # Pure-Python trials when NumPy isn't installed
+
+SEED = 20240101  # Fixed, so every worker shows the same forecast for the same inputs
+
+# Percentiles of the first-hosting lunch reported per member
+LOW_PERCENTILE = 10
+HIGH_PERCENTILE = 90
+
+
+# ============== INPUTS ==============
+
+def get_attendance_probabilities(member_ids: list) -> dict:
+    """
+    Estimate each member's chance of attending a lunch.
+
+    Uses the last HISTORY_LUNCHES completed lunches, counting only lunches
+    since the member's first attendance: (attended + 1) / (eligible + 2).
+
+    Returns:
+        dict of member_id -> probability
+    """
+    lunch_rows = db.session.execute(
+        select(Lunch.id, Lunch.date).where(Lunch.status == 'completed')
+        .order_by(Lunch.date.desc()).limit(HISTORY_LUNCHES)
+    ).all()
+    if not lunch_rows:
+        return {member_id: 0.5 for member_id in member_ids}
+
+    lunch_dates = {lunch_id: lunch_date for lunch_id, lunch_date in lunch_rows}
+    rows = db.session.execute(
+        select(Attendance.member_id, Attendance.lunch_id)
+        .where(Attendance.lunch_id.in_(list(lunch_dates)), Attendance.member_id.in_(member_ids))
+    ).all()
+    first_seen = dict(db.session.execute(
+        select(Attendance.member_id, func.min(Lunch.date))
+        .join(Lunch, Attendance.lunch_id == Lunch.id)
+        .where(Attendance.member_id.in_(member_ids))
+        .group_by(Attendance.member_id)
+    ).all())
+
+    attended = {}
+    for member_id, _ in rows:
+        attended[member_id] = attended.get(member_id, 0) + 1
+
+    probabilities = {}
+    for member_id in member_ids:
+        since = first_seen.get(member_id)
+        eligible = sum(1 for lunch_date in lunch_dates.values() if since is None or lunch_date >= since)
+        probabilities[member_id] = (attended.get(member_id, 0) + 1) / (eligible + 2)
+    return probabilities
+
+
+def _queue_state(queue: list) -> dict:
+    """Starting state for the simulation, in queue order."""
+    name_rank = {member.id: rank for rank, member in enumerate(sorted(queue, key=lambda m: m.name))}
+    # queue_position overrides as dense ranks; members without one share the last rank
+    overrides = sorted({member.queue_position for member in queue if member.queue_position is not None})
+    override_rank = {position: rank for rank, position in enumerate(overrides)}
+    return {
+        'ids': [member.id for member in queue],
+        'counts': [member.attendance_since_hosting or 0 for member in queue],
+        'priority': [override_rank.get(member.queue_position, len(overrides)) for member in queue],
+        'no_override': len(overrides),
+        'name_rank': [name_rank[member.id] for member in queue],
+    }
+
+
+# ============== SIMULATION ==============
+
+def _simulate_numpy(state: dict, probabilities: list, weeks: int, trials: int):
+    """
+    Run all trials at once.
+
+    Returns:
+        (trials x members) int array: week index each member first hosts, or -1
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(SEED)
+    members = len(state['ids'])
+    p = np.asarray(probabilities)
+
+    counts = np.tile(np.asarray(state['counts'], dtype=np.int64), (trials, 1))
+    priority = np.tile(np.asarray(state['priority'], dtype=np.int64), (trials, 1))
+
+    name_rank = np.asarray(state['name_rank'], dtype=np.int64)
+    count_span = int(counts.max(initial=0)) + weeks + 1
+    first_hosted = np.full((trials, members), -1, dtype=np.int64)
+    trial_index = np.arange(trials)
+    not_attending = np.iinfo(np.int64).max
+
+    for week in range(weeks):
+        attending = rng.random((trials, members)) < p
+        # One sortable key per member: override rank, then most attendance, then name
+        key = (priority * count_span + (count_span - counts)) * members + name_rank
+        host = np.where(attending, key, not_attending).argmin(axis=1)
+        has_host = attending.any(axis=1)
+
+        counts += attending
+        hosted = trial_index[has_host], host[has_host]
+        counts[hosted] = 0
+        first_unset = first_hosted[hosted] < 0
+        first_hosted[hosted[0][first_unset], hosted[1][first_unset]] = week
+
+    return first_hosted
+
+
+def _simulate_python(state: dict, probabilities: list, weeks: int, trials: int):
+    """Pure-Python fallback with the same rules. Returns a list of per-trial lists."""
+    rng = random.Random(SEED)
+    members = len(state['ids'])
+    results = []
+
+    for _ in range(trials):
+        counts = list(state['counts'])
+        priority = list(state['priority'])
+        first_hosted = [-1] * members
+        for week in range(weeks):
+            attending = [i for i in range(members) if rng.random() < probabilities[i]]
+            if not attending:
+                continue
+            host = min(attending, key=lambda i: (priority[i], -counts[i], state['name_rank'][i]))
+            for i in attending:
+                counts[i] += 1
+            counts[host] = 0
+            if first_hosted[host] < 0:
+                first_hosted[host] = week
+        results.append(first_hosted)
+    return results
+
+
+def _percentile(sorted_values: list, percent: int):
+    """Nearest-rank percentile of a sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-percent * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+def simulate_rotation(queue: list, weeks: int = HORIZON_WEEKS, trials: int = TRIALS) -> dict:
+    """
+    Simulate the hosting rotation.
+
+    Args:
+        queue: Regular members in current queue order (get_hosting_queue())
+        weeks: Lunches to simulate
+        trials: Monte Carlo trials (FALLBACK_TRIALS at most without NumPy)
+
+    Returns:
+        dict with 'engine' ('numpy' or 'python'), 'trials', 'weeks' and
+        'members': member_id -> {'attendance_probability', 'host_probability',
+        'low', 'median', 'high'} where low/median/high are lunch indexes
+        (0 = next lunch), None when that percentile is beyond the horizon
+    """
+    state = _queue_state(queue)
+    attendance = get_attendance_probabilities(state['ids']) if queue else {}
+    probabilities = [attendance[member_id] for member_id in state['ids']]
+
+    try:
+        import numpy  # noqa: F401
+        engine = 'numpy'
+    except ImportError:
+        engine = 'python'
+        trials = min(trials, FALLBACK_TRIALS)
+
+    if not queue:
+        per_member = []
+    elif engine == 'numpy':
+        first_hosted = _simulate_numpy(state, probabilities, weeks, trials)
+        per_member = [first_hosted[:, i].tolist() for i in range(len(queue))]
+    else:
+        first_hosted = _simulate_python(state, probabilities, weeks, trials)
+        per_member = [[trial[i] for trial in first_hosted] for i in range(len(queue))]
+
+    members = {}
+    for i, member_id in enumerate(state['ids']):
+        # Trials where they don't host within the horizon sort last
+        weeks_sorted = sorted(week if week >= 0 else weeks for week in per_member[i])
+
+        def pick(percent):
+            week = _percentile(weeks_sorted, percent)
+            return week if week < weeks else None
+
+        members[member_id] = {
+            'attendance_probability': round(probabilities[i], 3),
+            'host_probability': round(sum(1 for week in weeks_sorted if week < weeks) / trials, 3),
+            'low': pick(LOW_PERCENTILE),
+            'median': pick(50),
+            'high': pick(HIGH_PERCENTILE),
+        }
+
+    return {'engine': engine, 'trials': trials, 'weeks': weeks, 'members': members}
+
+
+# ============== FORECAST ==============
+
+def _build_forecast(weeks: int) -> dict:
+    from app.services.email_jobs import get_hosting_queue
+    from app.services.lunch_calendar import get_upcoming_lunch_dates
+
+    simulation = simulate_rotation(get_hosting_queue(limit=100), weeks=weeks)
+    lunch_dates = get_upcoming_lunch_dates(weeks)
+
+    def to_date(index):
+        return lunch_dates[index] if index is not None else None
+
+    simulation['members'] = {
+        member_id: dict(result,
+                        earliest=to_date(result['low']),
+                        likely=to_date(result['median']),
+                        latest=to_date(result['high']))
+        for member_id, result in simulation['members'].items()
+    }
+    return simulation
+
+
+_forecasts = {}  # weeks -> (key, forecast), this worker's latest
+_building = set()
+_forecast_lock = threading.Lock()
+
+
+def _forecast_key(weeks: int) -> tuple:
+    versions = get_versions('queue', 'calendar')
+    return (weeks, versions['queue'][0], versions['calendar'][0], date.today())
+
+
+def refresh_hosting_forecast(weeks: int = HORIZON_WEEKS) -> dict:
+    """Simulate the rotation now and keep the result for get_hosting_forecast()."""
+    # Read first: a change committed during the run leaves the forecast behind, not ahead
+    key = _forecast_key(weeks)
+    forecast = _build_forecast(weeks)
+    with _forecast_lock:
+        _forecasts[weeks] = (key, forecast)
+    return forecast
+
+
+def _run_background_refresh(app, weeks: int):
+    with app.app_context():
+        try:
+            refresh_hosting_forecast(weeks)
+        except Exception as e:
+            current_app.logger.error(f"Hosting forecast refresh failed: {e}")
+        finally:
+            with _forecast_lock:
+                _building.discard(weeks)
+            db.session.remove()
+
+
+def schedule_forecast_refresh(weeks: int = HORIZON_WEEKS) -> bool:
+    """
+    Rebuild the forecast on a background thread, unless one is already running.
+
+    Returns:
+        True if a rebuild was started, False if one was already running
+    """
+    app = current_app._get_current_object()
+    with _forecast_lock:
+        if weeks in _building:
+            return False
+        _building.add(weeks)
+    thread = threading.Thread(target=_run_background_refresh, args=(app, weeks), daemon=True)
+    thread.start()
+    return True
+
+
+def _schedule_after_commit():
+    if has_app_context():
+        schedule_forecast_refresh()
+
+
+on_commit('queue', _schedule_after_commit)
+on_commit('calendar', _schedule_after_commit)
+
+
+def get_forecast_token(weeks: int = HORIZON_WEEKS) -> str:
+    """
+    Identifies the forecast get_hosting_forecast() currently returns on this worker.
+
+    The forecast has no version stamp of its own (it is built in the
+    background), so cached fragments and ETags that show it include this.
+    """
+    with _forecast_lock:
+        latest = _forecasts.get(weeks)
+    if not latest:
+        return 'none'
+    _, queue_version, calendar_version, built_for = latest[0]
+    return f'{queue_version}.{calendar_version}.{built_for.isoformat()}'
+
+
+def get_hosting_forecast(weeks: int = HORIZON_WEEKS) -> dict:
+    """
+    The simulated rotation with lunch dates, without simulating on the request path.
+
+    If the queue or calendar changed since this worker's last forecast, a
+    rebuild is started in the background and the previous forecast is
+    returned (an empty one on a worker that hasn't built one yet).
+
+    Returns:
+        simulate_rotation() result where each member also has 'earliest',
+        'likely' and 'latest' (dates or None)
+    """
+    key = _forecast_key(weeks)
+    with _forecast_lock:
+        latest = _forecasts.get(weeks)
+    if latest and latest[0] == key:
+        return latest[1]
+
+    schedule_forecast_refresh(weeks)
+    if latest:
+        return latest[1]
+    return {'engine': None, 'trials': 0, 'weeks': weeks, 'members': {}}
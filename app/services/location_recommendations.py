@@ -0,0 +1,332 @@
+"""
+Restaurant recommendations for the host confirmation page.
+
+Every location gets a score between 0 and 1: a weighted sum of components
+that are each scaled to 0-1 (higher = more recommended):
+
+- rating: the group's average rating (from location_stats, or the
+  location's avg_group_rating when it has no ratings)
+- recency: weeks since the last visit, full marks after RECENCY_WEEKS
+- visit: visits on a log scale relative to the most visited location
+- price: price_level, cheaper is better for a group lunch
+- diversity: how rarely its cuisine came up in the last RECENT_LUNCHES lunches
+- google: Google rating, scaled from 3 stars (0) to 5 stars (1)
+
+Missing values score NEUTRAL so new locations aren't buried.
+
+Scores are precomputed into the location_scores table by
+refresh_location_scores(), which runs after every location_stats refresh
+(debounced after writes to locations, lunches and ratings - see
+location_stats.py), so the confirm page is one read of the score index and
+neither rating saves nor location edits rescore in the request. Rows are
+upserted on location_id, so refreshes from two workers can overlap safely.
+
+evaluate_recommendations() is an offline check of the weights: it replays
+the completed lunches in date order, ranks the locations with only what was
+known before each lunch, and reports how highly the host's actual pick was
+ranked - next to the old "most recently visited first" list as a baseline.
+"""
+
+import math
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import delete, func, select
+
+from app import db
+from app.models import Location, LocationScore, LocationStats, Lunch, Rating
+
+RECOMMENDATION_LIMIT = 10
+
+RECENCY_WEEKS = 12   # Weeks after a visit before a location is fully "due" again
+RECENT_LUNCHES = 8   # Lunches whose cuisines count against diversity
+NEUTRAL = 0.5        # Component score for missing data
+
+WEIGHTS = {
+    'rating': 0.30,
+    'recency': 0.25,
+    'diversity': 0.15,
+    'visit': 0.10,
+    'price': 0.10,
+    'google': 0.10,
+}
+
+# Shown on the confirm page for a location's strongest components
+REASONS = {
+    'rating': 'Group favourite',
+    'recency': 'Not visited lately',
+    'diversity': 'Something different',
+    'visit': 'Regular spot',
+    'price': 'Budget friendly',
+    'google': 'Well rated on Google',
+}
+REASON_THRESHOLD = 0.8
+MAX_REASONS = 2
+
+# Hit rates reported by the evaluation
+EVALUATION_CUTOFFS = (1, 3, 10)
+
+
+# ============== SCORING ==============
+
+def score_components(avg_rating, last_visited, visits: int, max_visits: int, price_level,
+                     cuisine_type, google_rating, recent_cuisines: list, today: date) -> dict:
+    """
+    Score components for one location, each 0-1.
+
+    Args:
+        avg_rating: Group average rating (1-5) or None
+        last_visited: Date of the last visit or None
+        visits / max_visits: This location's visit count and the highest one
+        price_level: 1-4 or None
+        cuisine_type: Cuisine or None
+        google_rating: 1-5 or None
+        recent_cuisines: Lowercased cuisines of the last RECENT_LUNCHES lunches
+        today: Date the recommendation is for
+    """
+    components = {}
+
+    components['rating'] = NEUTRAL if avg_rating is None else (float(avg_rating) - 1) / 4
+
+    if last_visited is None:
+        components['recency'] = 1.0
+    else:
+        weeks = max((today - last_visited).days, 0) / 7
+        components['recency'] = min(weeks / RECENCY_WEEKS, 1.0)
+
+    components['visit'] = math.log1p(visits or 0) / math.log1p(max_visits) if max_visits else 0.0
+
+    components['price'] = NEUTRAL if not price_level else min(max((4 - price_level) / 3, 0.0), 1.0)
+
+    if not cuisine_type:
+        components['diversity'] = NEUTRAL
+    else:
+        components['diversity'] = 1 / (1 + recent_cuisines.count(cuisine_type.strip().lower()))
+
+    if google_rating is None:
+        components['google'] = NEUTRAL
+    else:
+        components['google'] = min(max((float(google_rating) - 3) / 2, 0.0), 1.0)
+
+    return components
+
+
+def total_score(components: dict) -> float:
+    """Weighted sum of the components (0-1)."""
+    return sum(WEIGHTS[name] * value for name, value in components.items())
+
+
+def get_recent_cuisines() -> list:
+    """Lowercased cuisines of the last RECENT_LUNCHES completed lunches."""
+    rows = db.session.execute(
+        select(Location.cuisine_type).join(Lunch, Lunch.location_id == Location.id)
+        .where(Lunch.status == 'completed')
+        .order_by(Lunch.date.desc()).limit(RECENT_LUNCHES)
+    ).scalars()
+    return [cuisine.strip().lower() for cuisine in rows if cuisine]
+
+
+# ============== SCORE TABLE ==============
+
+def _dialect_insert():
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def refresh_location_scores() -> dict:
+    """
+    Recompute location_scores for every location.
+
+    One INSERT ... ON CONFLICT (location_id) DO UPDATE for all locations (plus
+    a DELETE of locations that are gone): a concurrent refresh waits on the
+    same rows instead of failing on the primary key, as DELETE + INSERT did.
+
+    Called after each location_stats refresh; errors are logged, not raised.
+
+    Returns:
+        dict with 'success', 'count' and 'message'
+    """
+    try:
+        today = date.today()
+        locations = Location.query.all()
+        stats = {row.location_id: row for row in LocationStats.query.all()}
+        recent_cuisines = get_recent_cuisines()
+        max_visits = max((row.visit_count for row in stats.values()), default=0)
+        now = datetime.utcnow()
+
+        rows = []
+        for location in locations:
+            location_stats = stats.get(location.id)
+            if location_stats and location_stats.rating_count:
+                avg_rating = location_stats.avg_rating
+            else:
+                avg_rating = location.avg_group_rating
+            components = score_components(
+                avg_rating,
+                location_stats.last_visited if location_stats else None,
+                location_stats.visit_count if location_stats else 0, max_visits,
+                location.price_level, location.cuisine_type, location.google_rating,
+                recent_cuisines, today,
+            )
+            rows.append({
+                'location_id': location.id,
+                'score': round(total_score(components), 4),
+                **{f'{name}_score': round(value, 4) for name, value in components.items()},
+                'refreshed_at': now,
+            })
+
+        scores = LocationScore.__table__
+        db.session.execute(delete(scores).where(scores.c.location_id.notin_([row['location_id'] for row in rows])))
+        if rows:
+            statement = _dialect_insert()(scores).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=[scores.c.location_id],
+                set_={column: statement.excluded[column] for column in rows[0] if column != 'location_id'},
+            )
+            db.session.execute(statement)
+        db.session.commit()
+        return {'success': True, 'count': len(rows), 'message': f'Scored {len(rows)} locations'}
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Location score refresh failed: {e}")
+        return {'success': False, 'count': 0, 'message': f'Error refreshing location scores: {e}'}
+
+
+def _reasons(score: LocationScore) -> list:
+    strongest = sorted(
+        WEIGHTS, key=lambda name: WEIGHTS[name] * getattr(score, f'{name}_score'), reverse=True
+    )
+    return [
+        REASONS[name] for name in strongest
+        if getattr(score, f'{name}_score') >= REASON_THRESHOLD
+    ][:MAX_REASONS]
+
+
+def get_recommended_locations(limit: int = RECOMMENDATION_LIMIT) -> list:
+    """
+    Best-scoring group-friendly locations, read from location_scores.
+
+    Scores the locations first if the table is empty (fresh install).
+
+    Returns:
+        list of dicts with 'location' (Location), 'stats' (LocationStats or
+        None), 'score' and 'reasons' (short labels)
+    """
+    def read():
+        return db.session.execute(
+            select(LocationScore, Location, LocationStats)
+            .join(Location, LocationScore.location_id == Location.id)
+            .outerjoin(LocationStats, LocationStats.location_id == Location.id)
+            .where(Location.group_friendly.is_(True))
+            .order_by(LocationScore.score.desc(), Location.name)
+            .limit(limit)
+        ).all()
+
+    rows = read()
+    if not rows and refresh_location_scores()['count']:
+        rows = read()
+
+    return [
+        {'location': location, 'stats': stats, 'score': score.score, 'reasons': _reasons(score)}
+        for score, location, stats in rows
+    ]
+
+
+# ============== EVALUATION ==============
+
+def _rank(scores: dict, pick) -> int:
+    """1-based rank of pick, ties sharing the best rank."""
+    return 1 + sum(1 for value in scores.values() if value > scores[pick])
+
+
+def evaluate_recommendations(last: int = None) -> dict:
+    """
+    Replay lunch history and measure how well the scores predict the hosts' picks.
+
+    Before each completed lunch, every group-friendly location (plus the one
+    actually picked) is ranked by total_score() using only the visits and
+    ratings of earlier lunches. The baseline ranks them most recently
+    visited first, as the confirm page used to.
+
+    Args:
+        last: Only report on the last N lunches (all earlier lunches still
+            build up the visit and rating history)
+
+    Returns:
+        dict with 'success', 'lunches' (number evaluated), 'recommended' and
+        'baseline' ({'hit@1', 'hit@3', 'hit@10', 'mrr'}) and 'message'
+    """
+    locations = {location.id: location for location in Location.query.all()}
+    lunches = db.session.execute(
+        select(Lunch.id, Lunch.date, Lunch.location_id)
+        .where(Lunch.status == 'completed', Lunch.location_id.isnot(None))
+        .order_by(Lunch.date, Lunch.id)
+    ).all()
+    lunch_ratings = {
+        lunch_id: (total, count)
+        for lunch_id, total, count in db.session.execute(
+            select(Rating.lunch_id, func.sum(Rating.rating), func.count(Rating.rating))
+            .where(Rating.rating.isnot(None))
+            .group_by(Rating.lunch_id)
+        ).all()
+    }
+
+    # History known before the lunch being ranked
+    visits = {location_id: 0 for location_id in locations}
+    last_visited = {}
+    rating_totals = {}
+    recent_cuisines = []
+
+    first_evaluated = len(lunches) - last if last else 0
+    ranks = {'recommended': [], 'baseline': []}
+
+    for index, (lunch_id, lunch_date, pick) in enumerate(lunches):
+        if index >= first_evaluated and pick in locations:
+            candidates = [location_id for location_id, location in locations.items()
+                          if location.group_friendly or location_id == pick]
+            max_visits = max(visits.values(), default=0)
+            scores = {}
+            for location_id in candidates:
+                location = locations[location_id]
+                total, count = rating_totals.get(location_id, (0, 0))
+                scores[location_id] = total_score(score_components(
+                    total / count if count else None, last_visited.get(location_id),
+                    visits[location_id], max_visits, location.price_level, location.cuisine_type,
+                    location.google_rating, recent_cuisines, lunch_date,
+                ))
+            ranks['recommended'].append(_rank(scores, pick))
+            recency = {location_id: last_visited.get(location_id, date.min).toordinal()
+                       for location_id in candidates}
+            ranks['baseline'].append(_rank(recency, pick))
+
+        location = locations.get(pick)
+        visits[pick] = visits.get(pick, 0) + 1
+        last_visited[pick] = lunch_date
+        if lunch_id in lunch_ratings:
+            total, count = rating_totals.get(pick, (0, 0))
+            lunch_total, lunch_count = lunch_ratings[lunch_id]
+            rating_totals[pick] = (total + lunch_total, count + lunch_count)
+        if location is not None and location.cuisine_type:
+            recent_cuisines = ([location.cuisine_type.strip().lower()] + recent_cuisines)[:RECENT_LUNCHES]
+
+    evaluated = len(ranks['recommended'])
+    result = {'success': True, 'lunches': evaluated}
+    for name, values in ranks.items():
+        metrics = {f'hit@{k}': round(sum(1 for rank in values if rank <= k) / evaluated, 3) if evaluated else None
+                   for k in EVALUATION_CUTOFFS}
+        metrics['mrr'] = round(sum(1 / rank for rank in values) / evaluated, 3) if evaluated else None
+        result[name] = metrics
+
+    if not evaluated:
+        result['message'] = 'No completed lunches with a location to evaluate'
+    else:
+        result['message'] = (
+            f"{evaluated} lunches: recommended hit@3 {result['recommended']['hit@3']:.0%} "
+            f"(MRR {result['recommended']['mrr']}), baseline hit@3 {result['baseline']['hit@3']:.0%} "
+            f"(MRR {result['baseline']['mrr']})"
+        )
+    return result
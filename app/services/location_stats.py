@@ -0,0 +1,191 @@
+"""
+Per-location visit and rating statistics, refreshed in the background.
+
+location_stats holds, for every location: completed visits, the last visit,
+total and average attendance per visit, the number of ratings with their
+average and 1-5 star histogram, and the number of comments. Pages read one
+row per location instead of aggregating lunches and ratings on each call.
+
+- PostgreSQL: a materialized view with a unique index on location_id, so
+  REFRESH MATERIALIZED VIEW CONCURRENTLY never blocks readers
+- Other databases (SQLite in development): a table, refreshed with
+  DELETE + INSERT ... SELECT of the same query in one transaction
+
+Refreshes are debounced. Every commit that bumps the 'locations' version
+stamp (writes to locations, lunches or ratings) schedules one refresh
+LOCATION_STATS_DEBOUNCE_SECONDS later on a per-worker timer, so a burst of
+writes costs a single refresh. The stamp each refresh was built from is
+stored as the 'location_stats' stamp; readers that find it behind schedule
+a refresh as well, which covers writes from processes that exited before
+their timer fired (CLI commands).
+
+Each refresh also rescores the host recommendations, which are built from
+these numbers (location_recommendations.refresh_location_scores).
+"""
+
+import os
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import text
+
+from app import db
+from app.models import LocationStats
+from app.services.cache_service import get_version, get_versions, on_commit, set_version
+
+COLUMNS = (
+    'location_id, visit_count, last_visited, total_attendance, avg_attendance, '
+    'rating_count, avg_rating, rating_1, rating_2, rating_3, rating_4, rating_5, comment_count'
+)
+
+# Also the materialized view's definition (see migration c4e9a1d7b352)
+STATS_QUERY = """
+    SELECT l.id AS location_id,
+           COALESCE(v.visit_count, 0) AS visit_count,
+           v.last_visited,
+           COALESCE(v.total_attendance, 0) AS total_attendance,
+           v.avg_attendance,
+           COALESCE(r.rating_count, 0) AS rating_count,
+           r.avg_rating,
+           COALESCE(r.rating_1, 0) AS rating_1,
+           COALESCE(r.rating_2, 0) AS rating_2,
+           COALESCE(r.rating_3, 0) AS rating_3,
+           COALESCE(r.rating_4, 0) AS rating_4,
+           COALESCE(r.rating_5, 0) AS rating_5,
+           COALESCE(r.comment_count, 0) AS comment_count
+    FROM locations l
+    LEFT JOIN (
+        SELECT location_id,
+               COUNT(*) AS visit_count,
+               MAX(date) AS last_visited,
+               SUM(actual_attendance) AS total_attendance,
+               AVG(actual_attendance) AS avg_attendance
+        FROM lunches
+        WHERE status = 'completed' AND location_id IS NOT NULL
+        GROUP BY location_id
+    ) v ON v.location_id = l.id
+    LEFT JOIN (
+        SELECT lu.location_id,
+               COUNT(ra.rating) AS rating_count,
+               AVG(ra.rating) AS avg_rating,
+               SUM(CASE WHEN ra.rating = 1 THEN 1 ELSE 0 END) AS rating_1,
+               SUM(CASE WHEN ra.rating = 2 THEN 1 ELSE 0 END) AS rating_2,
+               SUM(CASE WHEN ra.rating = 3 THEN 1 ELSE 0 END) AS rating_3,
+               SUM(CASE WHEN ra.rating = 4 THEN 1 ELSE 0 END) AS rating_4,
+               SUM(CASE WHEN ra.rating = 5 THEN 1 ELSE 0 END) AS rating_5,
+               SUM(CASE WHEN ra.comment IS NOT NULL AND ra.comment <> '' THEN 1 ELSE 0 END) AS comment_count
+        FROM ratings ra
+        JOIN lunches lu ON lu.id = ra.lunch_id
+        WHERE lu.location_id IS NOT NULL
+        GROUP BY lu.location_id
+    ) r ON r.location_id = l.id
+"""
+
+
+def _debounce_seconds() -> float:
+    try:
+        return max(0.0, float(os.environ.get('LOCATION_STATS_DEBOUNCE_SECONDS', 5)))
+    except ValueError:
+        return 5.0
+
+
+# ============== REFRESH ==============
+
+def refresh_location_stats() -> dict:
+    """
+    Rebuild location_stats now, then rescore the host recommendations.
+
+    Returns:
+        dict with 'success', 'version' (the 'locations' stamp it reflects) and 'message'
+    """
+    from app.services.location_recommendations import refresh_location_scores
+
+    try:
+        # Read first: a write committed during the refresh leaves the stats behind, not ahead
+        version = get_version('locations')
+        connection = db.session.connection()
+        if connection.dialect.name == 'postgresql':
+            db.session.execute(text('REFRESH MATERIALIZED VIEW CONCURRENTLY location_stats'))
+        else:
+            db.session.execute(text('DELETE FROM location_stats'))
+            db.session.execute(text(f'INSERT INTO location_stats ({COLUMNS}) {STATS_QUERY}'))
+        set_version('location_stats', version, connection)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Location stats refresh failed: {e}")
+        return {'success': False, 'version': None, 'message': f'Error refreshing location stats: {e}'}
+
+    scores = refresh_location_scores()
+    return {
+        'success': scores['success'],
+        'version': version,
+        'message': f"Location stats refreshed (version {version}); {scores['message'].lower()}",
+    }
+
+
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def _run_scheduled_refresh(app):
+    global _timer
+    with _timer_lock:
+        # Writes from here on schedule another refresh
+        _timer = None
+    with app.app_context():
+        try:
+            refresh_location_stats()
+        finally:
+            db.session.remove()
+
+
+def schedule_refresh() -> bool:
+    """
+    Refresh location_stats after LOCATION_STATS_DEBOUNCE_SECONDS, unless one is already pending.
+
+    Returns:
+        True if a refresh was scheduled, False if one was already pending
+    """
+    global _timer
+    app = current_app._get_current_object()
+    with _timer_lock:
+        if _timer is not None:
+            return False
+        _timer = threading.Timer(_debounce_seconds(), _run_scheduled_refresh, args=(app,))
+        _timer.daemon = True
+        _timer.start()
+    return True
+
+
+def _schedule_after_commit():
+    if has_app_context():
+        schedule_refresh()
+
+
+on_commit('locations', _schedule_after_commit)
+
+
+# ============== READ ==============
+
+def get_location_stats(location_ids: list = None) -> dict:
+    """
+    Statistics per location, from location_stats.
+
+    Schedules a refresh if the stats are behind the 'locations' stamp (the
+    rows returned are then the previous refresh's).
+
+    Args:
+        location_ids: Only these locations (default: all)
+
+    Returns:
+        dict of location_id -> LocationStats
+    """
+    versions = get_versions('locations', 'location_stats')
+    if versions['location_stats'][0] < versions['locations'][0]:
+        schedule_refresh()
+
+    query = LocationStats.query
+    if location_ids is not None:
+        query = query.filter(LocationStats.location_id.in_(location_ids))
+    return {stats.location_id: stats for stats in query.all()}
@@ -0,0 +1,186 @@
+"""
+Lunch calendar: which Tuesdays have a lunch.
+
+Lunches are weekly on LUNCH_WEEKDAY, except for skip weeks (holidays, venue
+closures) stored in the skip_weeks table. get_lunch_calendar() precomputes
+the next HORIZON_WEEKS lunch dates once per day per worker (keyed by the
+'calendar' version stamp, so adding or removing a skip week takes effect
+immediately), and everything else is answered from that. The stamp is read
+once per request, however many helpers a page calls:
+
+- get_next_lunch_date(): the lunch being planned (today if it's lunch day)
+- get_upcoming_lunch_dates(n): At Bat, On Deck, In the Hole...
+- estimate_lunch_date(position): when queue position N hosts, skips included
+- get_previous_lunch_date(): the last lunch before the next one
+- get_current_lunch_day(): this week's lunch day, even if it's skipped
+
+Routes and jobs should use these instead of doing weekday arithmetic.
+"""
+
+from datetime import date, datetime, timedelta
+
+from flask import g, has_request_context
+
+from app import db
+from app.models import Lunch, SkipWeek
+from app.services.cache_service import get_version, local_cache, on_commit
+
+LUNCH_WEEKDAY = 1  # Tuesday (date.weekday())
+
+# Lunch dates precomputed per day; covers the whole hosting queue (limit=100)
+HORIZON_WEEKS = 104
+
+
+# ============== CALENDAR ==============
+
+def get_lunch_day_on_or_after(from_date: date) -> date:
+    """The first lunch weekday on or after from_date (ignores skip weeks)."""
+    return from_date + timedelta(days=(LUNCH_WEEKDAY - from_date.weekday()) % 7)
+
+
+def get_current_lunch_day(from_date: date = None) -> date:
+    """This week's lunch weekday: today if it's lunch day, else the most recent one."""
+    from_date = from_date or date.today()
+    return from_date - timedelta(days=(from_date.weekday() - LUNCH_WEEKDAY) % 7)
+
+
+def _iter_lunch_dates(start: date, skip_dates, step: int = 1):
+    """Lunch dates from start (a lunch weekday) forwards (step=1) or backwards (step=-1)."""
+    current = start
+    while True:
+        if current not in skip_dates:
+            yield current
+        current += timedelta(weeks=step)
+
+
+def _build_calendar(today: date) -> dict:
+    skip_weeks = {row.date: row.reason for row in SkipWeek.query.all()}
+    dates = _iter_lunch_dates(get_lunch_day_on_or_after(today), skip_weeks)
+    return {
+        'today': today,
+        'lunch_dates': tuple(next(dates) for _ in range(HORIZON_WEEKS)),
+        'skip_weeks': skip_weeks,
+    }
+
+
+def _calendar_version() -> int:
+    """The 'calendar' stamp, read once per request (every call outside one)."""
+    if not has_request_context():
+        return get_version('calendar')
+    if '_calendar_version' not in g:
+        g._calendar_version = get_version('calendar')
+    return g._calendar_version
+
+
+def _forget_calendar_version():
+    # A skip week saved in this request: read the new stamp
+    if has_request_context():
+        g.pop('_calendar_version', None)
+
+
+on_commit('calendar', _forget_calendar_version)
+
+
+def get_lunch_calendar() -> dict:
+    """
+    Get the precomputed lunch calendar, cached per day and calendar version.
+
+    Returns:
+        dict with 'today', 'lunch_dates' (the next HORIZON_WEEKS lunch dates,
+        skip weeks removed) and 'skip_weeks' (date -> reason, all of them)
+    """
+    today = date.today()
+    key = ('lunch_calendar', today, _calendar_version())
+    return local_cache.get_or_set(key, lambda: _build_calendar(today))
+
+
+def get_next_lunch_date() -> date:
+    """The next lunch date (today if today is a lunch day that isn't skipped)."""
+    return get_lunch_calendar()['lunch_dates'][0]
+
+
+def get_upcoming_lunch_dates(count: int) -> list:
+    """The next `count` lunch dates, skip weeks removed."""
+    calendar = get_lunch_calendar()
+    lunch_dates = list(calendar['lunch_dates'][:count])
+    if len(lunch_dates) < count:
+        dates = _iter_lunch_dates(lunch_dates[-1] + timedelta(weeks=1), calendar['skip_weeks'])
+        lunch_dates.extend(next(dates) for _ in range(count - len(lunch_dates)))
+    return lunch_dates
+
+
+def estimate_lunch_date(position: int):
+    """
+    Estimate when hosting queue position N hosts, one host per lunch.
+
+    Args:
+        position: 1 = At Bat (the next lunch)
+
+    Returns:
+        date, or None for positions below 1
+    """
+    if position is None or position < 1:
+        return None
+    return get_upcoming_lunch_dates(position)[-1]
+
+
+def get_previous_lunch_date(before: date = None) -> date:
+    """The last lunch date before `before` (default: the next lunch date)."""
+    calendar = get_lunch_calendar()
+    before = before or calendar['lunch_dates'][0]
+    start = get_lunch_day_on_or_after(before) - timedelta(weeks=1)
+    return next(_iter_lunch_dates(start, calendar['skip_weeks'], step=-1))
+
+
+def is_skip_week(lunch_date: date) -> bool:
+    """Whether there's no lunch on this date."""
+    return lunch_date in get_lunch_calendar()['skip_weeks']
+
+
+# ============== SKIP WEEKS ==============
+
+def get_skip_weeks(from_date: date = None) -> list:
+    """Skip weeks on or after from_date (default: this week's lunch day), soonest first."""
+    from_date = from_date or get_current_lunch_day()
+    return SkipWeek.query.filter(SkipWeek.date >= from_date).order_by(SkipWeek.date).all()
+
+
+def add_skip_week(lunch_date: date, reason: str = None) -> dict:
+    """
+    Mark a lunch day as skipped.
+
+    A 'planned' lunch already created for that date is cancelled.
+
+    Returns:
+        dict with 'success' and 'message'
+    """
+    if lunch_date.weekday() != LUNCH_WEEKDAY:
+        return {'success': False, 'message': f"{lunch_date.strftime('%B %d, %Y')} is not a lunch day"}
+    if db.session.get(SkipWeek, lunch_date):
+        return {'success': False, 'message': f"{lunch_date.strftime('%B %d, %Y')} is already skipped"}
+
+    db.session.add(SkipWeek(date=lunch_date, reason=(reason or '').strip() or None))
+    Lunch.query.filter_by(date=lunch_date, status='planned').update(
+        {'status': 'cancelled', 'updated_at': datetime.utcnow()}, synchronize_session=False
+    )
+    db.session.commit()
+    return {'success': True, 'message': f"No lunch on {lunch_date.strftime('%B %d, %Y')}"}
+
+
+def remove_skip_week(lunch_date: date) -> dict:
+    """
+    Put a skipped lunch day back on the calendar (re-plans a lunch cancelled by the skip).
+
+    Returns:
+        dict with 'success' and 'message'
+    """
+    skip_week = db.session.get(SkipWeek, lunch_date)
+    if not skip_week:
+        return {'success': False, 'message': f"{lunch_date.strftime('%B %d, %Y')} is not skipped"}
+
+    db.session.delete(skip_week)
+    Lunch.query.filter_by(date=lunch_date, status='cancelled').update(
+        {'status': 'planned', 'updated_at': datetime.utcnow()}, synchronize_session=False
+    )
+    db.session.commit()
+    return {'success': True, 'message': f"Lunch on {lunch_date.strftime('%B %d, %Y')} is back on"}
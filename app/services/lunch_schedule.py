@@ -0,0 +1,100 @@
+"""
+Lunch schedule: upcoming lunches with their hosts and locations.
+
+The secretary dashboard and the host reminder / secretary status jobs all
+need the same picture of the next few lunches. Instead of a Lunch query,
+a Location lookup and a host lookup per week, get_lunches_for_dates() loads
+every requested lunch with its location and assigned host in one joined
+query keyed by date, and can create the missing weeks in one bulk INSERT.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import Lunch
+from app.services.lunch_calendar import get_upcoming_lunch_dates
+
+# Host tiers for the first three weeks (key, label)
+TIERS = [
+    ('at_bat', 'At Bat'),
+    ('on_deck', 'On Deck'),
+    ('in_hole', 'In the Hole'),
+]
+
+
+def get_lunches_for_dates(dates: list, create_missing: bool = False) -> dict:
+    """
+    Load the lunches on the given dates, with location and host, in one query.
+
+    Args:
+        dates: Lunch dates
+        create_missing: Create 'planned' lunches for dates that have none (one INSERT)
+
+    Returns:
+        dict of date -> Lunch (dates without a lunch are left out unless created)
+    """
+    dates = list(dict.fromkeys(dates))
+    lunches = Lunch.query.options(
+        joinedload(Lunch.location), joinedload(Lunch.host)
+    ).filter(Lunch.date.in_(dates)).order_by(Lunch.id).all()
+
+    by_date = {}
+    for lunch in lunches:
+        by_date.setdefault(lunch.date, lunch)  # Oldest row wins if a date was duplicated
+
+    missing = [lunch_date for lunch_date in dates if lunch_date not in by_date]
+    if create_missing and missing:
+        now = datetime.utcnow()
+        # ORM insert(Lunch): the stamp listener bumps 'data' and 'locations' before the commit
+        created = db.session.scalars(
+            insert(Lunch).returning(Lunch),
+            [{'date': lunch_date, 'status': 'planned', 'created_at': now, 'updated_at': now}
+             for lunch_date in missing]
+        ).all()
+        db.session.commit()
+        for lunch in created:
+            by_date[lunch.date] = lunch
+
+    return by_date
+
+
+def get_upcoming_host_schedule(weeks: int = 3, create_missing: bool = False) -> list:
+    """
+    The next `weeks` lunch dates (skip weeks left out) with their lunch, queued host and status.
+
+    Uses one query for the lunches (plus one for the hosting queue).
+
+    Args:
+        weeks: Number of lunches, starting with At Bat
+        create_missing: Create lunches for weeks that have none
+
+    Returns:
+        List of dicts (At Bat first) with 'tier', 'tier_label', 'lunch_date',
+        'lunch' (or None), 'host' (from the hosting queue, or None),
+        'host_confirmed', 'location' (or None) and 'location_selected'
+    """
+    from app.services.email_jobs import get_hosting_queue
+
+    dates = get_upcoming_lunch_dates(weeks)
+
+    lunches = get_lunches_for_dates(dates, create_missing=create_missing)
+    queue = get_hosting_queue(limit=weeks)
+
+    schedule = []
+    for i, lunch_date in enumerate(dates):
+        tier, tier_label = TIERS[i] if i < len(TIERS) else (f'week_{i + 1}', f'Week {i + 1}')
+        lunch = lunches.get(lunch_date)
+        schedule.append({
+            'tier': tier,
+            'tier_label': tier_label,
+            'lunch_date': lunch_date,
+            'lunch': lunch,
+            'host': queue[i] if i < len(queue) else None,
+            'host_confirmed': bool(lunch and lunch.host_confirmed),
+            'location': lunch.location if lunch else None,
+            'location_selected': bool(lunch and lunch.location_id),
+        })
+    return schedule
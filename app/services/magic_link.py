@@ -0,0 +1,112 @@
+"""
+Magic link tokens for member login.
+
+Two token modes, chosen with MAGIC_LINK_TOKEN_MODE:
+
+- 'db' (default): a random token stored on the member
+  (magic_link_token/magic_link_expires), looked up on the unique token
+  column when the link is used and then cleared.
+- 'signed': an itsdangerous signed, timestamped token carrying the member id
+  and a random nonce. Issuing a link writes nothing to members; verifying it
+  checks the signature and age, loads the member by primary key and records
+  the nonce in used_magic_links so the link works only once.
+
+Signed tokens are recognised by shape, so links issued before a mode switch
+keep working until they expire.
+"""
+
+import os
+import secrets
+from datetime import datetime, timedelta
+
+from flask import current_app
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from app import db
+from app.models import Member, UsedMagicLink
+
+MAGIC_LINK_MINUTES = 15
+
+SIGNED_TOKEN_SALT = 'member-magic-link'
+
+
+def get_token_mode() -> str:
+    """'signed' or 'db' (MAGIC_LINK_TOKEN_MODE)."""
+    return 'signed' if os.environ.get('MAGIC_LINK_TOKEN_MODE', '').strip().lower() == 'signed' else 'db'
+
+
+def _serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=SIGNED_TOKEN_SALT)
+
+
+def issue_magic_link_token(member: Member) -> str:
+    """
+    Create a login token for a member.
+
+    In 'db' mode the token is set on the member; the caller commits it.
+    """
+    if get_token_mode() == 'signed':
+        return _serializer().dumps({'m': member.id, 'n': secrets.token_urlsafe(16)})
+
+    token = secrets.token_urlsafe(32)
+    member.magic_link_token = token
+    member.magic_link_expires = datetime.utcnow() + timedelta(minutes=MAGIC_LINK_MINUTES)
+    return token
+
+
+def verify_magic_link_token(token: str) -> tuple:
+    """
+    Check a login token and use it up.
+
+    Links of members made inactive after the link was sent are rejected in
+    both modes.
+
+    Returns:
+        tuple: (member or None, error or None) where error is 'invalid' or 'expired'
+    """
+    # secrets.token_urlsafe() never contains '.', signed tokens always do
+    if '.' in token:
+        member, error = _verify_signed_token(token)
+    else:
+        member, error = _verify_db_token(token)
+
+    if member is not None and member.member_type == 'inactive':
+        return None, 'invalid'
+    return member, error
+
+
+def _verify_signed_token(token: str) -> tuple:
+    try:
+        data, issued_at = _serializer().loads(token, max_age=MAGIC_LINK_MINUTES * 60, return_timestamp=True)
+        member_id, nonce = int(data['m']), str(data['n'])
+    except SignatureExpired:
+        return None, 'expired'
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None, 'invalid'
+
+    member = db.session.get(Member, member_id)
+    if not member:
+        return None, 'invalid'
+
+    expires_at = issued_at.replace(tzinfo=None) + timedelta(minutes=MAGIC_LINK_MINUTES)
+    if not UsedMagicLink.claim(nonce, expires_at):
+        return None, 'invalid'  # Already used
+
+    return member, None
+
+
+def _verify_db_token(token: str) -> tuple:
+    member = Member.query.filter_by(magic_link_token=token).first()
+    if not member:
+        return None, 'invalid'
+
+    expired = member.magic_link_expires and datetime.utcnow() > member.magic_link_expires
+
+    # Single-use: clear the token whether it's being used or has expired
+    member.magic_link_token = None
+    member.magic_link_expires = None
+    db.session.commit()
+
+    if expired:
+        return None, 'expired'
+    return member, None
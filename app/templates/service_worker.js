@@ -0,0 +1,258 @@
+/*
+ * Tuesday Lunch service worker (rendered by main.service_worker).
+ *
+ * - Precaches the static shell; the cache name carries the asset version,
+ *   so each deploy with changed assets replaces the old cache.
+ * - Member dashboard and lineup: stale-while-revalidate, keyed by the member
+ *   the server says the page belongs to (X-Member-Id). The page cache is
+ *   dropped on login, logout, a page from another member and whenever the
+ *   server stops serving the page (session expired -> login redirect).
+ * - Rating submissions made offline are queued in IndexedDB and replayed
+ *   via Background Sync (or when the page reports it is back online).
+ *   Ratings the server refuses for good (4xx) move to a rejected store and
+ *   are reported to the member by the next open page.
+ */
+
+const ASSET_VERSION = {{ asset_version|tojson }};
+const SHELL_CACHE = `tl-shell-${ASSET_VERSION}`;
+const PAGE_CACHE = 'tl-pages-v2';
+const MEMBER_KEY = '/__sw/member';
+const PRECACHE_URLS = {{ precache_urls|tojson }};
+const SWR_PATHS = ['/member/', '/member/lineup'];
+const RATING_PATH = /^\/member\/rate\/\d+$/;
+// Logging in or out as anyone: cached member pages must not outlive it
+const SESSION_PATHS = /^\/member\/(logout|auth\/.+|dev-login)$/;
+const SYNC_TAG = 'rating-sync';
+const DB_NAME = 'tl-offline';
+const STORE = 'ratings';
+const REJECTED_STORE = 'rejected-ratings';
+// 4xx responses that may succeed later (re-login, timeout, rate limit)
+const RETRYABLE_STATUSES = [401, 408, 429];
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then((cache) => cache.addAll(PRECACHE_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil(
+        caches.keys()
+            .then((keys) => Promise.all(
+                keys.filter((key) => (key.startsWith('tl-shell-') && key !== SHELL_CACHE)
+                    || (key.startsWith('tl-pages-') && key !== PAGE_CACHE))
+                    .map((key) => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (request.method === 'POST' && RATING_PATH.test(url.pathname)) {
+        event.respondWith(submitRating(request));
+        return;
+    }
+
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    // Drop cached member pages before the request reaches the server
+    if (SESSION_PATHS.test(url.pathname)) {
+        event.respondWith(caches.delete(PAGE_CACHE).then(() => fetch(request)));
+        return;
+    }
+
+    if (SWR_PATHS.includes(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event));
+        return;
+    }
+
+    if (url.pathname.startsWith('/static/') || url.pathname.startsWith('/assets/')) {
+        event.respondWith(cacheFirst(request));
+    }
+});
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request, { ignoreSearch: true });
+    return cached || fetch(request);
+}
+
+function pageKey(url, memberId) {
+    return `${url.pathname}?member=${encodeURIComponent(memberId)}`;
+}
+
+async function staleWhileRevalidate(event) {
+    const url = new URL(event.request.url);
+    const cache = await caches.open(PAGE_CACHE);
+    const current = await cache.match(MEMBER_KEY);
+    const memberId = current ? await current.text() : null;
+    const cached = memberId ? await cache.match(pageKey(url, memberId)) : null;
+
+    const network = fetch(event.request).then(async (response) => {
+        const owner = response.headers.get('X-Member-Id');
+        if (!response.ok || response.redirected || !owner) {
+            // Logged out or session expired: nothing cached may be shown again
+            if (response.type === 'opaqueredirect' || response.redirected
+                    || response.status === 401 || response.status === 403) {
+                await caches.delete(PAGE_CACHE);
+            }
+            return response;
+        }
+        const pages = owner === memberId ? cache : await resetPageCache(owner);
+        await pages.put(pageKey(url, owner), response.clone());
+        return response;
+    });
+
+    if (cached) {
+        event.waitUntil(network.catch(() => null));
+        return cached;
+    }
+    return network.catch(() => offlineResponse());
+}
+
+async function resetPageCache(memberId) {
+    // A different member on this device: forget the previous member's pages
+    await caches.delete(PAGE_CACHE);
+    const cache = await caches.open(PAGE_CACHE);
+    await cache.put(MEMBER_KEY, new Response(memberId));
+    return cache;
+}
+
+function offlineResponse() {
+    return new Response(
+        '<h1>Offline</h1><p>You are offline and this page has not been cached yet.</p>',
+        { status: 503, headers: { 'Content-Type': 'text/html' } }
+    );
+}
+
+// ============== OFFLINE RATING QUEUE ==============
+
+function openDb() {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open(DB_NAME, 2);
+        open.onupgradeneeded = () => {
+            for (const name of [STORE, REJECTED_STORE]) {
+                if (!open.result.objectStoreNames.contains(name)) {
+                    open.result.createObjectStore(name, { keyPath: 'id', autoIncrement: true });
+                }
+            }
+        };
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+async function withStore(mode, fn, storeName = STORE) {
+    const db = await openDb();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(storeName, mode);
+        const result = fn(tx.objectStore(storeName));
+        tx.oncomplete = () => resolve(result.result !== undefined ? result.result : result);
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+// Move a queued rating to the rejected store (one transaction)
+async function rejectRating(item, status) {
+    const db = await openDb();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction([STORE, REJECTED_STORE], 'readwrite');
+        tx.objectStore(STORE).delete(item.id);
+        tx.objectStore(REJECTED_STORE).add({
+            url: item.url, queuedAt: item.queuedAt, status: status, rejectedAt: Date.now(),
+        });
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+// Tell open pages about rejected ratings; forget them once a page has been told
+async function reportRejectedRatings() {
+    const rejected = await withStore('readonly', (store) => store.getAll(), REJECTED_STORE);
+    if (!rejected.length) {
+        return;
+    }
+    const pages = await self.clients.matchAll({ type: 'window' });
+    if (!pages.length) {
+        return;
+    }
+    const message = {
+        type: 'ratings-rejected',
+        ratings: rejected.map((item) => ({ url: item.url, status: item.status })),
+    };
+    pages.forEach((page) => page.postMessage(message));
+    await withStore('readwrite', (store) => store.clear(), REJECTED_STORE);
+}
+
+async function submitRating(request) {
+    const body = await request.clone().text();
+    try {
+        return await fetch(request);
+    } catch (err) {
+        await withStore('readwrite', (store) => store.add({
+            url: request.url,
+            body: body,
+            contentType: request.headers.get('Content-Type'),
+            queuedAt: Date.now(),
+        }));
+        if (self.registration.sync) {
+            await self.registration.sync.register(SYNC_TAG);
+        }
+        return new Response(
+            '<h1>Rating saved offline</h1><p>You are offline. Your rating will be sent automatically when you reconnect.</p>',
+            { status: 202, headers: { 'Content-Type': 'text/html' } }
+        );
+    }
+}
+
+async function replayRatings() {
+    const queued = await withStore('readonly', (store) => store.getAll());
+    for (const item of queued) {
+        const response = await fetch(item.url, {
+            method: 'POST',
+            body: item.body,
+            headers: { 'Content-Type': item.contentType, 'X-Rating-Replay': '1' },
+            credentials: 'same-origin',
+            redirect: 'manual',
+        });
+        // A 2xx means the rating was saved. Network errors throw and 5xx keep it
+        // queued (sync retries later). Other 4xx (not attended, invalid) will
+        // never succeed, so the rating is dropped and the member told. A login
+        // redirect means the session is gone, so the rest would fail too -
+        // retry after logging in.
+        if (response.type === 'opaqueredirect') {
+            break;
+        }
+        if (response.ok) {
+            await withStore('readwrite', (store) => store.delete(item.id));
+        } else if (response.status >= 400 && response.status < 500
+                   && !RETRYABLE_STATUSES.includes(response.status)) {
+            await rejectRating(item, response.status);
+        }
+    }
+    await reportRejectedRatings();
+}
+
+self.addEventListener('sync', (event) => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(replayRatings());
+    }
+});
+
+// Fallback for browsers without Background Sync (e.g. iOS Safari)
+self.addEventListener('message', (event) => {
+    if (event.data === 'replay-ratings') {
+        event.waitUntil(replayRatings().catch(() => null));
+    } else if (event.data === 'report-rejected-ratings') {
+        event.waitUntil(reportRejectedRatings().catch(() => null));
+    }
+});
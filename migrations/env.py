@@ -51,6 +51,32 @@ def get_metadata():
     return target_db.metadata
 
 
+def get_view_names():
+    """Tables marked info={'is_view': True}, which their own migrations manage."""
+    from app.models.location_stats import view_metadata
+    return {name for name, table in view_metadata.tables.items() if table.info.get('is_view')}
+
+
+def is_partition(name):
+    """email_logs monthly partitions, created at runtime by ensure_partitions()."""
+    from app.services.email_log_retention import DEFAULT_PARTITION, PARTITION_PREFIX
+    return name == DEFAULT_PARTITION or name.startswith(PARTITION_PREFIX)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Keep autogenerate from dropping or recreating views (a plain table on
+    # SQLite) and the email_logs partitions (reflected as tables on PostgreSQL)
+    view_names = get_view_names()
+    if type_ == 'table':
+        table_name = name
+    else:
+        table = getattr(object, 'table', None)
+        if table is None:
+            return True
+        table_name = table.name
+    return table_name not in view_names and not is_partition(table_name)
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +91,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +120,8 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
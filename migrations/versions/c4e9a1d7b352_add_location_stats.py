@@ -0,0 +1,105 @@
+"""Add location_stats (materialized view on PostgreSQL)
+
+Revision ID: c4e9a1d7b352
+Revises: b3f8d2a6c914
+Create Date: 2026-10-18 23:02:51.208417
+
+Per-location visit and rating statistics. On PostgreSQL this is a
+materialized view with a unique index on location_id, so it can be
+refreshed CONCURRENTLY. Elsewhere it is a table refreshed with the same
+query (app/services/location_stats.py). Either way it is populated here.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e9a1d7b352'
+down_revision = 'b3f8d2a6c914'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    'location_id, visit_count, last_visited, total_attendance, avg_attendance, '
+    'rating_count, avg_rating, rating_1, rating_2, rating_3, rating_4, rating_5, comment_count'
+)
+
+STATS_QUERY = """
+    SELECT l.id AS location_id,
+           COALESCE(v.visit_count, 0) AS visit_count,
+           v.last_visited,
+           COALESCE(v.total_attendance, 0) AS total_attendance,
+           v.avg_attendance,
+           COALESCE(r.rating_count, 0) AS rating_count,
+           r.avg_rating,
+           COALESCE(r.rating_1, 0) AS rating_1,
+           COALESCE(r.rating_2, 0) AS rating_2,
+           COALESCE(r.rating_3, 0) AS rating_3,
+           COALESCE(r.rating_4, 0) AS rating_4,
+           COALESCE(r.rating_5, 0) AS rating_5,
+           COALESCE(r.comment_count, 0) AS comment_count
+    FROM locations l
+    LEFT JOIN (
+        SELECT location_id,
+               COUNT(*) AS visit_count,
+               MAX(date) AS last_visited,
+               SUM(actual_attendance) AS total_attendance,
+               AVG(actual_attendance) AS avg_attendance
+        FROM lunches
+        WHERE status = 'completed' AND location_id IS NOT NULL
+        GROUP BY location_id
+    ) v ON v.location_id = l.id
+    LEFT JOIN (
+        SELECT lu.location_id,
+               COUNT(ra.rating) AS rating_count,
+               AVG(ra.rating) AS avg_rating,
+               SUM(CASE WHEN ra.rating = 1 THEN 1 ELSE 0 END) AS rating_1,
+               SUM(CASE WHEN ra.rating = 2 THEN 1 ELSE 0 END) AS rating_2,
+               SUM(CASE WHEN ra.rating = 3 THEN 1 ELSE 0 END) AS rating_3,
+               SUM(CASE WHEN ra.rating = 4 THEN 1 ELSE 0 END) AS rating_4,
+               SUM(CASE WHEN ra.rating = 5 THEN 1 ELSE 0 END) AS rating_5,
+               SUM(CASE WHEN ra.comment IS NOT NULL AND ra.comment <> '' THEN 1 ELSE 0 END) AS comment_count
+        FROM ratings ra
+        JOIN lunches lu ON lu.id = ra.lunch_id
+        WHERE lu.location_id IS NOT NULL
+        GROUP BY lu.location_id
+    ) r ON r.location_id = l.id
+"""
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute(f'CREATE MATERIALIZED VIEW location_stats AS {STATS_QUERY} WITH DATA')
+        # Required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+        op.execute('CREATE UNIQUE INDEX ix_location_stats_location_id ON location_stats (location_id)')
+        return
+
+    op.create_table('location_stats',
+    sa.Column('location_id', sa.Integer(), nullable=False),
+    sa.Column('visit_count', sa.Integer(), nullable=False),
+    sa.Column('last_visited', sa.Date(), nullable=True),
+    sa.Column('total_attendance', sa.Integer(), nullable=False),
+    sa.Column('avg_attendance', sa.Float(), nullable=True),
+    sa.Column('rating_count', sa.Integer(), nullable=False),
+    sa.Column('avg_rating', sa.Float(), nullable=True),
+    sa.Column('rating_1', sa.Integer(), nullable=False),
+    sa.Column('rating_2', sa.Integer(), nullable=False),
+    sa.Column('rating_3', sa.Integer(), nullable=False),
+    sa.Column('rating_4', sa.Integer(), nullable=False),
+    sa.Column('rating_5', sa.Integer(), nullable=False),
+    sa.Column('comment_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('location_id')
+    )
+    op.execute(f'INSERT INTO location_stats ({COLUMNS}) {STATS_QUERY}')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP MATERIALIZED VIEW location_stats')
+        return
+
+    op.drop_table('location_stats')
@@ -0,0 +1,37 @@
+"""Index email_logs on lower(recipient_email) for the recipient filter
+
+Revision ID: d6a3f9c2e815
+Revises: c4e9a1d7b352
+Create Date: 2026-10-19 09:14:32.406218
+
+The log viewer lowercases the recipient it filters on and compares it with
+lower(recipient_email), so addresses stored with capitals still match. This
+replaces the plain (recipient_email, sent_at, id) index with the matching
+expression index. On PostgreSQL it is created on the partitioned table and
+so on every partition.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a3f9c2e815'
+down_revision = 'c4e9a1d7b352'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('DROP INDEX IF EXISTS ix_email_logs_recipient_sent_at')
+    op.execute(
+        'CREATE INDEX ix_email_logs_recipient_lower_sent_at '
+        'ON email_logs (lower(recipient_email), sent_at, id)'
+    )
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_email_logs_recipient_lower_sent_at')
+    op.execute(
+        'CREATE INDEX ix_email_logs_recipient_sent_at '
+        'ON email_logs (recipient_email, sent_at, id)'
+    )
@@ -0,0 +1,150 @@
+"""Partition email_logs by month on sent_at (PostgreSQL only)
+
+Revision ID: e5b07c4d2a61
+Revises: c81d5e3a9f20
+Create Date: 2026-10-18 12:20:37.811946
+
+Rebuilds email_logs as a declaratively range-partitioned table with one
+partition per calendar month (email_logs_y2026m10, ...) plus a default
+partition as a safety net. Existing rows are copied across. The primary key
+becomes (id, sent_at) because PostgreSQL requires the partition key in it,
+so sent_at is now NOT NULL.
+
+Future partitions are pre-created by `flask create-email-log-partitions`
+(run in the release step). On SQLite only sent_at's NOT NULL is applied.
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b07c4d2a61'
+down_revision = 'c81d5e3a9f20'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+INDEXES = [
+    ('ix_email_logs_brevo_message_id', 'brevo_message_id'),
+    ('ix_email_logs_sent_at_id', 'sent_at, id'),
+    ('ix_email_logs_type_sent_at', 'email_type, sent_at, id'),
+    ('ix_email_logs_status_sent_at', 'status, sent_at, id'),
+    ('ix_email_logs_lunch_sent_at', 'lunch_id, sent_at, id'),
+    ('ix_email_logs_recipient_sent_at', 'recipient_email, sent_at, id'),
+]
+
+COLUMNS = (
+    'id, email_type, recipient_email, recipient_name, subject, lunch_id, '
+    'brevo_message_id, status, error_message, sent_at, updated_at'
+)
+
+
+def _add_months(month_start, months):
+    month_index = month_start.month - 1 + months
+    return date(month_start.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+def _drop_indexes():
+    for name, _ in INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def _create_indexes():
+    for name, columns in INDEXES:
+        op.execute(f'CREATE INDEX {name} ON email_logs ({columns})')
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        op.execute('UPDATE email_logs SET sent_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE sent_at IS NULL')
+        with op.batch_alter_table('email_logs', schema=None) as batch_op:
+            batch_op.alter_column('sent_at', existing_type=sa.DateTime(), nullable=False)
+        return
+
+    # Move the old table aside, keeping its id sequence for the new table
+    op.execute('ALTER TABLE email_logs RENAME TO email_logs_old')
+    op.execute('ALTER TABLE email_logs_old RENAME CONSTRAINT email_logs_pkey TO email_logs_old_pkey')
+    op.execute('ALTER SEQUENCE email_logs_id_seq OWNED BY NONE')
+    _drop_indexes()
+
+    op.execute("""
+        CREATE TABLE email_logs (
+            id INTEGER NOT NULL DEFAULT nextval('email_logs_id_seq'),
+            email_type VARCHAR(50) NOT NULL,
+            recipient_email VARCHAR(120) NOT NULL,
+            recipient_name VARCHAR(100),
+            subject VARCHAR(255) NOT NULL,
+            lunch_id INTEGER REFERENCES lunches (id),
+            brevo_message_id VARCHAR(100),
+            status VARCHAR(20),
+            error_message TEXT,
+            sent_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (id, sent_at)
+        ) PARTITION BY RANGE (sent_at)
+    """)
+    op.execute('ALTER SEQUENCE email_logs_id_seq OWNED BY email_logs.id')
+    op.execute('CREATE TABLE email_logs_default PARTITION OF email_logs DEFAULT')
+
+    # One partition per month from the oldest row through MONTHS_AHEAD months from now
+    oldest = bind.execute(sa.text('SELECT MIN(sent_at) FROM email_logs_old')).scalar()
+    this_month = date.today().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else this_month
+    last = _add_months(this_month, MONTHS_AHEAD)
+    while month <= last:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE email_logs_y{month.year}m{month.month:02d} PARTITION OF email_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+
+    op.execute(f"""
+        INSERT INTO email_logs ({COLUMNS})
+        SELECT id, email_type, recipient_email, recipient_name, subject, lunch_id,
+               brevo_message_id, status, error_message,
+               COALESCE(sent_at, updated_at, now() AT TIME ZONE 'utc'), updated_at
+        FROM email_logs_old
+    """)
+    op.execute('DROP TABLE email_logs_old')
+    _create_indexes()
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('email_logs', schema=None) as batch_op:
+            batch_op.alter_column('sent_at', existing_type=sa.DateTime(), nullable=True)
+        return
+
+    op.execute('ALTER TABLE email_logs RENAME TO email_logs_partitioned')
+    op.execute('ALTER TABLE email_logs_partitioned RENAME CONSTRAINT email_logs_pkey TO email_logs_partitioned_pkey')
+    op.execute('ALTER SEQUENCE email_logs_id_seq OWNED BY NONE')
+    _drop_indexes()
+
+    op.execute("""
+        CREATE TABLE email_logs (
+            id INTEGER NOT NULL DEFAULT nextval('email_logs_id_seq'),
+            email_type VARCHAR(50) NOT NULL,
+            recipient_email VARCHAR(120) NOT NULL,
+            recipient_name VARCHAR(100),
+            subject VARCHAR(255) NOT NULL,
+            lunch_id INTEGER REFERENCES lunches (id),
+            brevo_message_id VARCHAR(100),
+            status VARCHAR(20),
+            error_message TEXT,
+            sent_at TIMESTAMP WITHOUT TIME ZONE,
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT email_logs_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute('ALTER SEQUENCE email_logs_id_seq OWNED BY email_logs.id')
+    op.execute(f'INSERT INTO email_logs ({COLUMNS}) SELECT {COLUMNS} FROM email_logs_partitioned')
+    # Drops every partition with it
+    op.execute('DROP TABLE email_logs_partitioned')
+    _create_indexes()